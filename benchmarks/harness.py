@@ -0,0 +1,151 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import argparse
+import fnmatch
+import gc
+import json
+import platform
+import statistics
+
+
+# a benchmark is set up at a scale, returning the operation to time and the
+# number of units of work (nodes, matches, pages) it performs
+Setup = Callable[[float], Tuple[Callable[[], object], int]]
+
+
+class Suite:
+    """A named collection of benchmarks, run with a stable harness."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.benchmarks: Dict[str, Setup] = {}
+
+    def benchmark(self, name: str):
+        def register(setup: Setup) -> Setup:
+            if name in self.benchmarks:
+                raise ValueError(f"Duplicate benchmark: {name}")
+            self.benchmarks[name] = setup
+            return setup
+        return register
+
+    def select(self, patterns: Iterable[str] = ()) -> List[str]:
+        patterns = list(patterns)
+        return [
+            name for name in self.benchmarks
+            if not patterns or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+        ]
+
+    def run(self, patterns: Iterable[str] = (), scale: float = 1.0, repeat: int = 5) -> dict:
+        return {
+            'suite': self.name,
+            'environment': environment(),
+            'scale': scale,
+            'repeat': repeat,
+            'results': [
+                measure(name, self.benchmarks[name], scale, repeat)
+                for name in self.select(patterns)
+            ],
+        }
+
+
+def measure(name: str, setup: Setup, scale: float, repeat: int) -> dict:
+    """Time `repeat` runs after one warm up run, without garbage collection.
+
+    The minimum is the least noisy estimate; the median and standard
+    deviation show how noisy the machine was.
+    """
+    operation, units = setup(scale)
+    operation()
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = perf_counter()
+            operation()
+            timings.append(perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        'name': name,
+        'units': units,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'ns_per_unit': min(timings) / units * 1e9 if units else None,
+    }
+
+
+def package_version() -> Optional[str]:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # Python < 3.8
+        return None
+    try:
+        return version('python-testing-crawler')
+    except PackageNotFoundError:
+        return None
+
+
+def environment() -> dict:
+    return {
+        'package_version': package_version(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+    }
+
+
+def format_results(report: dict) -> str:
+    lines = [f"{'benchmark':<40} {'units':>8} {'min':>12} {'median':>12} {'ns/unit':>12}"]
+    for result in report['results']:
+        lines.append(
+            f"{result['name']:<40} {result['units']:>8} {result['min'] * 1000:>9.2f} ms"
+            f" {result['median'] * 1000:>9.2f} ms {result['ns_per_unit'] or 0:>12.0f}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(report: dict, baseline: dict) -> str:
+    """Compare minimum times with a previous report; ratios above 1 are slower."""
+    baseline_results = {result['name']: result for result in baseline['results']}
+    lines = [f"{'benchmark':<40} {'baseline':>12} {'now':>12} {'ratio':>8}"]
+    for result in report['results']:
+        previous = baseline_results.get(result['name'])
+        if previous is None or previous['units'] != result['units']:
+            continue
+        lines.append(
+            f"{result['name']:<40} {previous['min'] * 1000:>9.2f} ms {result['min'] * 1000:>9.2f} ms"
+            f" {result['min'] / previous['min']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(suite: Suite, argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=f"Run the {suite.name} benchmarks.")
+    parser.add_argument('patterns', nargs='*', help="only run benchmarks matching these glob patterns")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply the amount of work (default 1)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark (default 5)")
+    parser.add_argument('--json', metavar='PATH', help="also write the results to this file as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="compare with results previously written by --json")
+    parser.add_argument('--list', action='store_true', help="list the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(suite.select(args.patterns)))
+        return
+    report = suite.run(args.patterns, scale=args.scale, repeat=args.repeat)
+    print(format_results(report))
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n" + format_comparison(report, json.load(f)))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
@@ -0,0 +1,153 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""End-to-end crawl throughput over generated apps, fully offline.
+
+Run with `python -m benchmarks.macro [--framework flask django] [--json PATH]`.
+Each crawl runs in a fresh process, so peak memory is measured per mode.
+"""
+
+from time import perf_counter
+from typing import List, Optional
+import argparse
+import json
+import multiprocessing
+
+from python_testing_crawler import Crawler, ShardedCrawler
+from python_testing_crawler.utils import format_megabytes, peak_rss
+
+from .harness import environment
+from .synthetic import LATENCY_DISTRIBUTIONS, RULES, CLIENT_FACTORIES, SiteSpec, client_factory
+
+
+MODES = ('sequential', 'threads', 'processes')
+
+
+def run_mode(framework: str, spec: SiteSpec, mode: str, workers: int) -> dict:
+    factory = client_factory(framework, spec)
+    kwargs = dict(
+        initial_paths=['/'],
+        rules=RULES,
+        capture_exceptions=False,
+        output_summary=False,
+        # times parsing in every mode, summed over the processes of a sharded crawl
+        profile=True,
+    )
+    if mode == 'sequential':
+        workers = 1
+        crawler = Crawler(client=factory(), **kwargs)
+    elif mode == 'threads':
+        crawler = Crawler(client_factory=factory, workers=workers, **kwargs)
+    elif mode == 'processes':
+        crawler = ShardedCrawler(factory, processes=workers, **kwargs)
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+
+    start = perf_counter()
+    crawler.crawl()
+    seconds = perf_counter() - start
+
+    requests = sum(1 for node in crawler.graph.map.values() if node.requested)
+    if requests != spec.requests:
+        raise RuntimeError(f"Crawl made {requests} requests, expected {spec.requests}")
+    parse_seconds = crawler.profiler.totals['parsing']
+    return {
+        'framework': framework,
+        'mode': mode,
+        'workers': workers,
+        'requests': requests,
+        'seconds': seconds,
+        'requests_per_second': requests / seconds,
+        'peak_rss_bytes': peak_rss('self'),
+        'peak_child_rss_bytes': peak_rss('children') if mode == 'processes' else None,
+        # share of the workers' combined time spent parsing
+        'parse_seconds': parse_seconds,
+        'parse_share': parse_seconds / (seconds * workers),
+    }
+
+
+def run_mode_into(queue, *args):
+    try:
+        queue.put(('ok', run_mode(*args)))
+    except BaseException as e:
+        queue.put(('error', repr(e)))
+        raise
+
+
+def run_in_process(context, *args) -> dict:
+    # not a Pool, since sharded crawls start processes of their own
+    queue = context.Queue()
+    process = context.Process(target=run_mode_into, args=(queue, *args))
+    process.start()
+    outcome, value = queue.get()
+    process.join()
+    if outcome != 'ok':
+        raise RuntimeError(f"Benchmark {args} failed: {value}")
+    return value
+
+
+def run(frameworks: List[str], spec: SiteSpec, modes: List[str], workers: int) -> dict:
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for framework in frameworks:
+        for mode in modes:
+            # a fresh process each, for a clean peak memory reading
+            results.append(run_in_process(context, framework, spec, mode, workers))
+    return {
+        'suite': 'macro',
+        'environment': environment(),
+        'spec': spec.__dict__,
+        'results': results,
+    }
+
+
+def format_results(report: dict) -> str:
+    lines = [
+        f"{'framework':<10} {'mode':<11} {'workers':>7} {'requests':>8} {'seconds':>8}"
+        f" {'req/s':>9} {'peak RSS':>11} {'parsing':>8}"
+    ]
+    for result in report['results']:
+        peak = result['peak_child_rss_bytes'] or result['peak_rss_bytes']
+        lines.append(
+            f"{result['framework']:<10} {result['mode']:<11} {result['workers']:>7} {result['requests']:>8}"
+            f" {result['seconds']:>8.2f} {result['requests_per_second']:>9.1f} {format_megabytes(peak):>11}"
+            f" {result['parse_share']:>8.0%}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark crawling generated apps.")
+    parser.add_argument('--framework', nargs='+', default=['flask'], choices=sorted(CLIENT_FACTORIES))
+    parser.add_argument('--mode', nargs='+', default=list(MODES), choices=MODES)
+    parser.add_argument('--workers', type=int, default=4, help="threads or processes (default 4)")
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--links-per-page', type=int, default=10)
+    parser.add_argument('--forms-per-page', type=int, default=1)
+    parser.add_argument('--page-bytes', type=int, default=10000)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="mean response time (default 0)")
+    parser.add_argument('--latency-distribution', default='fixed', choices=LATENCY_DISTRIBUTIONS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="also write the results to this file as JSON")
+    args = parser.parse_args(argv)
+
+    spec = SiteSpec(
+        pages=args.pages,
+        links_per_page=args.links_per_page,
+        forms_per_page=args.forms_per_page,
+        page_bytes=args.page_bytes,
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        seed=args.seed,
+    )
+    report = run(args.framework, spec, args.mode, args.workers)
+    print(format_results(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == '__main__':
+    main()
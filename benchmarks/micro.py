@@ -0,0 +1,226 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Microbenchmarks of the crawler's hot paths.
+
+Run with `python -m benchmarks.micro [patterns...] [--json PATH]`.
+"""
+
+from types import SimpleNamespace
+
+from python_testing_crawler import Crawler, Rule, Request, Ignore, Allow
+from python_testing_crawler.clients import DummyClient, FlaskClientWrapper
+from python_testing_crawler.graph import CompactDirectedGraph, DirectedGraph, Node
+from python_testing_crawler.parsers import PARSERS
+from python_testing_crawler.rules import RuleSet
+from python_testing_crawler.constants import ANCHOR, AREA, FORM, LINK, HREF, SRC
+from python_testing_crawler.constants import GET, POST
+
+from .harness import Suite, main
+
+
+suite = Suite('micro')
+
+
+def scaled(count: int, scale: float) -> int:
+    return max(1, int(count * scale))
+
+
+def large_rule_set(sections: int):
+    """A rule set like a large app's: per-section requests, ignores and allowances."""
+    rules = [
+        Rule(ANCHOR, '/.*', GET, Request()),
+        Rule(FORM, '/.*', POST, Request()),
+    ]
+    for section in range(sections):
+        rules += [
+            Rule(ANCHOR, f'/section-{section}/.*', GET, Request()),
+            Rule(ANCHOR, f'/section-{section}/admin/.*', GET, Ignore()),
+            Rule(FORM, f'/section-{section}/delete/.*', POST, Ignore()),
+            Rule(ANCHOR, f'/section-{section}/missing/.*', GET, Allow([404])),
+        ]
+    return rules
+
+
+def section_paths(count: int, sections: int):
+    return [f'/section-{index % sections}/item/{index}' for index in range(count)]
+
+
+@suite.benchmark('rules.match.uncached')
+def rules_match_uncached(scale):
+    rules = large_rule_set(250)
+    nodes = [Node(path=path, source=ANCHOR) for path in section_paths(scaled(2000, scale), 250)]
+
+    def run():
+        rule_set = RuleSet(rules)
+        for node in nodes:
+            rule_set.match(node)
+    return run, len(nodes)
+
+
+@suite.benchmark('rules.match.cached')
+def rules_match_cached(scale):
+    rule_set = RuleSet(large_rule_set(250))
+    nodes = [Node(path=path, source=ANCHOR) for path in section_paths(1000, 250)]
+    for node in nodes:
+        rule_set.match(node)
+    repeats = scaled(20, scale)
+
+    def run():
+        for _ in range(repeats):
+            for node in nodes:
+                rule_set.match(node)
+    return run, len(nodes) * repeats
+
+
+def large_page(links: int, forms: int) -> bytes:
+    """An HTML page with navigation, a long list of links, forms and assets."""
+    parts = [
+        '<!doctype html><html><head><title>Large page</title>',
+        '<link href="/static/style.css" rel="stylesheet"><script src="/static/app.js"></script>',
+        '</head><body><nav class="menu"><ul>',
+    ]
+    parts += [f'<li><a href="/section-{i}/">Section {i}</a></li>' for i in range(20)]
+    parts.append('</ul></nav><main><table>')
+    parts += [
+        f'<tr><td><a href="/section-{i % 20}/item/{i}?page={i % 7}" class="item">Item {i}</a></td>'
+        f'<td>Some <em>description</em> of item {i}, with <img src="/img/{i}.png" alt=""></td></tr>'
+        for i in range(links)
+    ]
+    parts.append('</table>')
+    for i in range(forms):
+        parts.append(
+            f'<form action="/section-{i % 20}/edit/{i}" method="post">'
+            f'<input type="hidden" name="csrf" value="token-{i}">'
+            f'<input name="title" value="Item {i}"><textarea name="body">Body {i}</textarea>'
+            f'<select name="state"><option value="draft">Draft</option>'
+            f'<option value="live" selected>Live</option></select>'
+            f'<button type="submit">Save</button></form>'
+        )
+    parts.append('<map name="m"><area href="/map-target"></map></main></body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def page_response(links: int, forms: int):
+    return SimpleNamespace(data=large_page(links, forms), content_type='text/html; charset=utf-8')
+
+
+def register_extraction_benchmarks(parser_name: str):
+
+    @suite.benchmark(f'extract.links.{parser_name}')
+    def extract_links(scale):
+        response = page_response(scaled(2000, scale), 20)
+        wrapper = FlaskClientWrapper(None, parser=parser_name)
+
+        def run():
+            return list(wrapper.extract(response, (ANCHOR, AREA, LINK), (HREF, SRC)))
+        return run, 1
+
+    @suite.benchmark(f'extract.forms.{parser_name}')
+    def extract_forms(scale):
+        response = page_response(200, scaled(200, scale))
+        wrapper = FlaskClientWrapper(None, parser=parser_name)
+
+        def run():
+            return wrapper.extract_forms('/page', response, ignore_form_fields=['csrf'])
+        return run, 1
+
+
+for parser_name in PARSERS:
+    try:
+        FlaskClientWrapper(None, parser=parser_name)
+    except ValueError:  # optional dependency not installed
+        continue
+    register_extraction_benchmarks(parser_name)
+
+
+@suite.benchmark('node.create')
+def node_create(scale):
+    count = scaled(100000, scale)
+    paths = [f'/section-{i % 20}/item/{i}' for i in range(count)]
+    params = {'csrf': 'token', 'title': 'Item', 'state': 'live'}
+    ignore_form_fields = ['csrf']
+
+    def run():
+        for path in paths:
+            Node(path=path, method=POST, params=params, source=FORM, ignore_form_fields=ignore_form_fields)
+    return run, count
+
+
+def make_nodes(count: int):
+    return [Node(path=f'/section-{i % 20}/item/{i}', source=ANCHOR) for i in range(count)]
+
+
+def register_graph_insert_benchmark(name: str, graph_cls):
+
+    @suite.benchmark(name)
+    def graph_insert(scale):
+        nodes = make_nodes(scaled(100000, scale))
+
+        def run():
+            graph = graph_cls()
+            previous = None
+            for node in nodes:
+                node, _ = graph.add_node_if_absent(node)
+                if previous is not None:
+                    graph.add_edge(previous, node)
+                previous = node
+            graph.freeze()
+        return run, len(nodes)
+
+
+register_graph_insert_benchmark('graph.insert', DirectedGraph)
+register_graph_insert_benchmark('graph.insert.compact', CompactDirectedGraph)
+
+
+@suite.benchmark('graph.lookup')
+def graph_lookup(scale):
+    nodes = make_nodes(scaled(100000, scale))
+    graph = DirectedGraph()
+    for node in nodes:
+        graph.add_node(node)
+    ids = [node.id for node in nodes]
+    paths = [node.path for node in nodes]
+
+    def run():
+        for node_id in ids:
+            graph.get_node_by_id(node_id)
+        for path in paths:
+            graph.get_nodes_by_path(path)
+    return run, len(nodes) * 2
+
+
+@suite.benchmark('graph.path_pattern')
+def graph_path_pattern(scale):
+    nodes = make_nodes(scaled(100000, scale))
+    graph = DirectedGraph()
+    for node in nodes:
+        graph.add_node(node)
+    patterns = [f'/section-{section}/item/1.*' for section in range(20)]
+
+    def run():
+        for pattern in patterns:
+            graph.get_nodes_by_path_pattern(pattern)
+    return run, len(patterns)
+
+
+@suite.benchmark('crawler.should_process')
+def crawler_should_process(scale):
+    crawler = Crawler(
+        client=DummyClient(),
+        initial_paths=['/'],
+        rules=large_rule_set(250),
+        should_process_handlers=[lambda node: not node.path.endswith('/logout')],
+        output_summary=False,
+    )
+    nodes = [Node(path=path, source=ANCHOR) for path in section_paths(scaled(20000, scale), 250)]
+
+    def run():
+        for node in nodes:
+            crawler.should_process(node)
+    return run, len(nodes)
+
+
+if __name__ == '__main__':
+    main(suite)
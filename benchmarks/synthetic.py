@@ -0,0 +1,233 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Generated Flask and Django apps of any size, for benchmarking crawls.
+
+Every page `/page/<n>` links to `links_per_page` other pages and has
+`forms_per_page` forms posting to `/page/<n>/form/<m>`, whose response
+links back. All pages are reachable from `/`. Pages are padded to about
+`page_bytes`, and each request sleeps for a time drawn from the latency
+distribution. Everything is derived from `seed`, so a spec always
+generates the same site.
+"""
+
+from dataclasses import dataclass
+from functools import partial
+from random import Random
+import math
+import time
+
+from python_testing_crawler import Rule, Request
+from python_testing_crawler.constants import ANCHOR, FORM
+from python_testing_crawler.constants import GET, POST
+
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+RULES = [
+    Rule(ANCHOR, '/.*', GET, Request()),
+    Rule(FORM, '/.*', POST, Request()),
+]
+
+FILLER = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua. "
+)
+
+
+@dataclass(frozen=True)
+class SiteSpec:
+    pages: int = 1000
+    links_per_page: int = 10
+    forms_per_page: int = 1
+    page_bytes: int = 10000
+    latency_ms: float = 0.0  # mean
+    latency_distribution: str = 'fixed'
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.pages < 1:
+            raise ValueError("Need at least one page")
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {self.latency_distribution}")
+
+    @property
+    def requests(self) -> int:
+        """Requests a full crawl makes: the index, pages and form submissions."""
+        return 1 + self.pages + self.pages * self.forms_per_page
+
+
+class Site:
+    """Renders the pages of a spec, independent of any web framework."""
+
+    def __init__(self, spec: SiteSpec):
+        self.spec = spec
+
+    def links(self, page: int):
+        if not self.spec.links_per_page:
+            return []
+        # a chain through every page keeps them all reachable
+        rng = Random(f"{self.spec.seed}-links-{page}")
+        return [(page + 1) % self.spec.pages] + [
+            rng.randrange(self.spec.pages) for _ in range(self.spec.links_per_page - 1)
+        ]
+
+    def latency(self, key: str) -> float:
+        """Seconds to take over the response for `key`."""
+        mean = self.spec.latency_ms / 1000
+        if not mean:
+            return 0.0
+        rng = Random(f"{self.spec.seed}-latency-{key}")
+        distribution = self.spec.latency_distribution
+        if distribution == 'uniform':
+            return rng.uniform(0, 2 * mean)
+        if distribution == 'exponential':
+            return rng.expovariate(1 / mean)
+        if distribution == 'lognormal':
+            # a long tail; lognormvariate(0, 1) has a mean of exp(1 / 2)
+            return rng.lognormvariate(0, 1) * mean / math.exp(0.5)
+        return mean
+
+    def wait(self, key: str):
+        seconds = self.latency(key)
+        if seconds:
+            time.sleep(seconds)
+
+    def render(self, title: str, body: str) -> str:
+        html = (
+            f"<!doctype html><html><head><title>{title}</title></head><body>"
+            f"<h1>{title}</h1>{body}"
+        )
+        padding = max(0, self.spec.page_bytes - len(html) - len("</body></html>"))
+        paragraphs = FILLER * (padding // len(FILLER) + 1)
+        return f"{html}<p>{paragraphs[:padding]}</p></body></html>"
+
+    def index(self) -> str:
+        self.wait('index')
+        return self.render("Index", '<a href="/page/0">Start</a>')
+
+    def page(self, page: int) -> str:
+        self.wait(f'page-{page}')
+        links = "".join(
+            f'<li><a href="/page/{target}">Page {target}</a></li>'
+            for target in self.links(page)
+        )
+        forms = "".join(
+            f'<form action="/page/{page}/form/{form}" method="post">'
+            f'<input name="title" value="Page {page}"><textarea name="body">Form {form}</textarea>'
+            f'<button type="submit">Save</button></form>'
+            for form in range(self.spec.forms_per_page)
+        )
+        return self.render(f"Page {page}", f"<ul>{links}</ul>{forms}")
+
+    def form(self, page: int, form: int) -> str:
+        self.wait(f'form-{page}-{form}')
+        return self.render(f"Saved form {form}", f'<a href="/page/{page}">Back</a>')
+
+
+def create_flask_app(spec: SiteSpec):
+    import flask
+
+    site = Site(spec)
+    app = flask.Flask(__name__)
+    app.config['TESTING'] = True
+
+    def check_page(page: int):
+        if page >= spec.pages:
+            flask.abort(404)
+
+    @app.route('/')
+    def index():
+        return site.index()
+
+    @app.route('/page/<int:page>')
+    def page(page):
+        check_page(page)
+        return site.page(page)
+
+    @app.route('/page/<int:page>/form/<int:form>', methods=['POST'])
+    def form(page, form):
+        check_page(page)
+        return site.form(page, form)
+
+    return app
+
+
+def flask_client(spec: SiteSpec):
+    return create_flask_app(spec).test_client()
+
+
+def django_urlpatterns(spec: SiteSpec):
+    from django.http import Http404, HttpResponse
+    from django.urls import path
+    from django.views.decorators.http import require_GET, require_POST
+
+    site = Site(spec)
+
+    def check_page(page: int):
+        if page >= spec.pages:
+            raise Http404()
+
+    @require_GET
+    def index(request):
+        return HttpResponse(site.index())
+
+    @require_GET
+    def page(request, page):
+        check_page(page)
+        return HttpResponse(site.page(page))
+
+    @require_POST
+    def form(request, page, form):
+        check_page(page)
+        return HttpResponse(site.form(page, form))
+
+    return [
+        path('', index),
+        path('page/<int:page>', page),
+        path('page/<int:page>/form/<int:form>', form),
+    ]
+
+
+class DjangoUrlconf:
+
+    def __init__(self, spec: SiteSpec):
+        self.urlpatterns = django_urlpatterns(spec)
+
+
+def django_client(spec: SiteSpec):
+    """A Django test client for the site, configuring Django if need be.
+
+    Only one spec can be served per process, since Django's settings are
+    global.
+    """
+    import django
+    from django.conf import settings
+    from django.test import Client
+
+    if not settings.configured:
+        settings.configure(
+            DEBUG=False,
+            SECRET_KEY='benchmark',
+            ALLOWED_HOSTS=['testserver'],
+            ROOT_URLCONF=DjangoUrlconf(spec),
+            MIDDLEWARE=[],
+            INSTALLED_APPS=[],
+            DATABASES={},
+        )
+        django.setup()
+    return Client()
+
+
+CLIENT_FACTORIES = {
+    'flask': flask_client,
+    'django': django_client,
+}
+
+
+def client_factory(framework: str, spec: SiteSpec):
+    """A picklable factory of clients for the site, for any crawler mode."""
+    if framework not in CLIENT_FACTORIES:
+        raise ValueError(f"Unknown framework: {framework}")
+    return partial(CLIENT_FACTORIES[framework], spec)
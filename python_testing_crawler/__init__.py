@@ -1,2 +1,6 @@
 from .crawler import Crawler
-from .rules import Rule, Request, Ignore, Allow
+from .async_crawler import AsyncCrawler
+from .sharded import ShardedCrawler
+from .rules import Rule, Request, Ignore, Allow, MaxLatency, MaxResponseBytes, MaxQueries
+from .urls import Canonicalizer
+from .version import __version__
@@ -0,0 +1,119 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import asyncio
+
+from .crawler import Crawler
+from .graph import Node
+from .timings import start_timer
+from .events import Event
+
+
+class AsyncCrawler(Crawler):
+    """Crawls an ASGI application, keeping several requests in flight.
+
+    Takes an `AsgiClient` wrapping the application. Requests are awaited on
+    an event loop, whilst HTML extraction runs in a thread pool so parsing a
+    page does not stall requests in progress.
+    """
+
+    is_async = True
+
+    def __init__(
+        self,
+        client,
+        *,
+        concurrency: int = 10,
+        extraction_workers: Optional[int] = None,
+        **kwargs
+    ):
+        if concurrency < 1:
+            raise ValueError("Need a concurrency of at least one")
+        super().__init__(client, **kwargs)
+        self.concurrency = concurrency
+        self.extraction_workers = extraction_workers
+
+    def crawl(self):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.crawl_async())
+        finally:
+            loop.close()
+
+    async def crawl_async(self):
+        self.start_crawl()
+
+        # keep up to `concurrency` nodes in flight
+        pending: Dict[asyncio.Future, Node] = {}
+        with ThreadPoolExecutor(max_workers=self.extraction_workers) as executor:
+            try:
+                while pending or not self.frontier.empty():
+                    while not self.frontier.empty() and len(pending) < self.concurrency:
+                        next_node = self.frontier.get()
+                        future = asyncio.ensure_future(self.process_node_async(next_node, executor))
+                        pending[future] = next_node
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                        self.node_processed(pending.pop(future))
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                if pending:
+                    await asyncio.wait(pending)
+                raise
+            finally:
+                self.close_stores()
+
+        self.finish_crawl()
+
+    async def process_node_async(self, node, executor):
+        self.logger.info("Processing %s ...", node)
+        events = self.events
+
+        # determine if should proceed
+        if not self.should_process(node):
+            return
+
+        # record requested
+        node.requested = True
+
+        # make request and check the response
+        try:
+            if events.active:
+                events.emit(Event.REQUEST_STARTED, node)
+            response = None
+            timer = start_timer()
+            try:
+                response = await self.make_request(node)
+                self.record_request(node, response, timer)
+            finally:
+                if events.active:
+                    events.emit(Event.REQUEST_FINISHED, node, response)
+            self.check_response(node, response)
+        except (Exception if self.capture_exceptions else ()) as e:
+            self.capture_exception(node, e)
+            return
+        except Exception as e:
+            self.print_exception_request(e, node)
+            raise e
+
+        # bail if response not valid for extraction or don't want to extract
+        if not self.should_extract_from(node, response):
+            return
+
+        # extract onwards links and forms off the event loop
+        loop = asyncio.get_event_loop()
+        children = await loop.run_in_executor(executor, self.extract_children, node, response)
+        self.update_graph(node, children)
+
+    def extract_children(self, node, response):
+        if self.events.active:
+            self.events.emit(Event.EXTRACTION_STARTED, node)
+        children = list(self.extract_from(node, response))
+        if self.events.active:
+            self.events.emit(Event.EXTRACTION_FINISHED, node, children)
+        return children
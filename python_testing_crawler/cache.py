@@ -0,0 +1,70 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Iterable, List, Optional, Tuple
+import hashlib
+
+from .graph import Node
+
+
+# (source, method, path, params, ignore_form_fields), where a path of None
+# stands for the path of the page the node is extracted from
+NodeTemplate = Tuple[Optional[str], str, Optional[str], dict, frozenset]
+
+
+def make_template(node: Node) -> NodeTemplate:
+    return (node.source, node.method, node.path, node.params, node.ignore_form_fields)
+
+
+def make_node(template: NodeTemplate, path: str) -> Node:
+    (source, method, template_path, params, ignore_form_fields) = template
+    return Node(
+        source=source,
+        method=method,
+        path=path if template_path is None else template_path,
+        params=dict(params),
+        ignore_form_fields=ignore_form_fields,
+    )
+
+
+def content_hash(content) -> bytes:
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content).digest()
+
+
+class ExtractionCache:
+    """Bounded LRU cache from response body hash to extracted node templates."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: 'OrderedDict[bytes, List[NodeTemplate]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get_or_extract(
+        self,
+        content,
+        extract: Callable[[], Iterable[Node]],
+        key: Optional[bytes] = None,
+    ) -> List[NodeTemplate]:
+        if key is None:
+            key = content_hash(content)
+        with self.lock:
+            templates = self.entries.get(key)
+            if templates is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return templates
+            self.misses += 1
+
+        templates = [make_template(node) for node in extract()]
+        with self.lock:
+            self.entries[key] = templates
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return templates
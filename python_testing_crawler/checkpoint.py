@@ -0,0 +1,201 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from typing import Dict, Iterable, List, Set, Tuple
+import json
+import sqlite3
+
+from .graph import Node
+from .errors import FormattedTraceback, RestoredException
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    position INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    path TEXT,
+    method TEXT NOT NULL,
+    params TEXT NOT NULL,
+    source TEXT,
+    ignore_form_fields TEXT NOT NULL,
+    requested INTEGER NOT NULL,
+    status_code INTEGER,
+    depth INTEGER NOT NULL,
+    skipped TEXT,
+    wall_time REAL,
+    cpu_time REAL,
+    response_size INTEGER,
+    query_count INTEGER,
+    processed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS edges (
+    from_key TEXT NOT NULL,
+    to_key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS errors (
+    position INTEGER PRIMARY KEY,
+    node_key TEXT NOT NULL,
+    exc_repr TEXT NOT NULL,
+    traceback TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def node_key(node: Node) -> str:
+    return json.dumps(node.id)
+
+
+class CheckpointStore:
+    """Saves crawl progress to a SQLite file, so a crawl can be resumed.
+
+    Nodes are written as they are encountered and marked once processed;
+    the frontier is whichever nodes are not yet processed. Writes are
+    buffered and committed together by `flush`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        # params are serialized when recorded, since low memory crawls drop them once processed
+        self._nodes: Dict[str, Tuple[Node, str, bool]] = {}
+        self._edges: List[Tuple[str, str]] = []
+        self._errors: List[Tuple[str, str, str]] = []
+        self._requeued: Set[str] = set()
+        self.count = 0
+        self.error_count = 0
+
+    def close(self):
+        self.connection.close()
+
+    def has_checkpoint(self) -> bool:
+        return self.connection.execute("SELECT 1 FROM nodes LIMIT 1").fetchone() is not None
+
+    def clear(self):
+        with self.connection:
+            for table in ('nodes', 'edges', 'errors', 'meta'):
+                self.connection.execute(f"DELETE FROM {table}")
+        self.count = 0
+        self.error_count = 0
+
+    def add_nodes(self, nodes: Iterable[Node]):
+        for node in nodes:
+            key = node_key(node)
+            if key not in self._nodes:
+                self._nodes[key] = (node, json.dumps(node.params), False)
+
+    def record_processed(self, node: Node, children: Iterable[Node]):
+        key = node_key(node)
+        self._nodes[key] = (node, json.dumps(node.params), True)
+        self._requeued.discard(key)
+        for child_node in children:
+            child_key = node_key(child_node)
+            if child_key not in self._nodes:
+                self._nodes[child_key] = (child_node, json.dumps(child_node.params), False)
+            self._edges.append((key, child_key))
+        self.count += 1
+
+    def record_requeued(self, node: Node):
+        """Mark a processed node as pending again, having been skipped for a depth since lowered."""
+        key = node_key(node)
+        self._nodes[key] = (node, json.dumps(node.params), False)
+        self._requeued.add(key)
+
+    def record_error(self, node: Node, exc: Exception, tb):
+        self._errors.append((node_key(node), repr(exc), ''.join(tb.format())))
+
+    def flush(self):
+        with self.connection:
+            # insert new nodes in encounter order, then bring all up to date
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO nodes"
+                " (key, path, method, params, source, ignore_form_fields, requested, status_code, depth,"
+                " skipped, wall_time, cpu_time, response_size, query_count, processed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        key, node.path, node.method, params, node.source,
+                        json.dumps(sorted(node.ignore_form_fields)), node.requested,
+                        node.status_code, node.depth, node.skipped, node.wall_time, node.cpu_time,
+                        node.response_size, node.query_count, processed,
+                    )
+                    for key, (node, params, processed) in self._nodes.items()
+                )
+            )
+            self.connection.executemany(
+                "UPDATE nodes SET requested = ?, status_code = ?, depth = ?, skipped = ?, wall_time = ?,"
+                " cpu_time = ?, response_size = ?, query_count = ?, processed = MAX(processed, ?) WHERE key = ?",
+                (
+                    (
+                        node.requested, node.status_code, node.depth, node.skipped, node.wall_time,
+                        node.cpu_time, node.response_size, node.query_count, processed, key,
+                    )
+                    for key, (node, params, processed) in self._nodes.items()
+                )
+            )
+            self.connection.executemany(
+                "UPDATE nodes SET processed = 0 WHERE key = ?", ((key,) for key in self._requeued)
+            )
+            self.connection.executemany("INSERT INTO edges VALUES (?, ?)", self._edges)
+            self.connection.executemany(
+                "INSERT INTO errors (node_key, exc_repr, traceback) VALUES (?, ?, ?)", self._errors
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [('count', str(self.count)), ('error_count', str(self.error_count))],
+            )
+        self._nodes.clear()
+        self._edges.clear()
+        self._errors.clear()
+        self._requeued.clear()
+
+    def load(self):
+        """Return (nodes, pending nodes, edges, tracebacks) from the checkpoint."""
+        nodes: Dict[str, Node] = {}
+        pending = []
+        rows = self.connection.execute(
+            "SELECT key, path, method, params, source, ignore_form_fields, requested, status_code, depth,"
+            " skipped, wall_time, cpu_time, response_size, query_count, processed FROM nodes ORDER BY position"
+        )
+        for (
+            key, path, method, params, source, ignore_form_fields, requested, status_code, depth, skipped,
+            wall_time, cpu_time, response_size, query_count, processed,
+        ) in rows:
+            node = Node(
+                path=path,
+                method=method,
+                params=json.loads(params),
+                source=source,
+                requested=bool(requested),
+                status_code=status_code,
+                ignore_form_fields=json.loads(ignore_form_fields),
+                depth=depth,
+                skipped=skipped,
+                wall_time=wall_time,
+                cpu_time=cpu_time,
+                response_size=response_size,
+                query_count=query_count,
+            )
+            nodes[key] = node
+            if not processed:
+                pending.append(node)
+        edges = [
+            (nodes[from_key], nodes[to_key])
+            for (from_key, to_key) in self.connection.execute("SELECT from_key, to_key FROM edges ORDER BY rowid")
+        ]
+        tracebacks = [
+            (nodes[key], RestoredException(exc_repr), FormattedTraceback([tb]))
+            for (key, exc_repr, tb) in self.connection.execute(
+                "SELECT node_key, exc_repr, traceback FROM errors ORDER BY position"
+            )
+        ]
+        meta = dict(self.connection.execute("SELECT name, value FROM meta"))
+        self.count = int(meta.get('count', 0))
+        # errors beyond max_errors are counted, but not saved
+        self.error_count = int(meta.get('error_count', 0))
+        return list(nodes.values()), pending, edges, tracebacks
@@ -2,22 +2,41 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlencode, urljoin, urlsplit
+import asyncio
 import inspect
-from urllib.parse import urldefrag
 
-from bs4 import BeautifulSoup
-import soupsieve
-
-from .graph import Node
+from .parsers import compile_css_selectors, get_parser
 from .utils import acceptable_content_type
-from .constants import FORM, GET
+from .constants import GET, POST
 
 
 class DummyClient:
     pass
 
 
+def discard(chunks: Iterable[bytes]) -> int:
+    """Read and drop a body, returning its length."""
+    return sum(len(chunk) for chunk in chunks)
+
+
 class BaseClientWrapper:
+    """Adapts a test client to the crawler.
+
+    Wrappers with `supports_streaming` accept a `keep_content` callable in
+    `get` and `post`. It is called with the response before the body is read.
+    If it returns false, the body is read in chunks and dropped, and only its
+    length is kept, as `response.discarded_length`.
+
+    Wrappers that are `is_async` return coroutines from `get` and `post`,
+    and can only be crawled by `AsyncCrawler`.
+    """
+
+    is_async = False
+    supports_query_counting = False
+    supports_streaming = False
 
     def get_content(self, response):
         raise NotImplementedError
@@ -25,49 +44,51 @@ class BaseClientWrapper:
     def get_content_type(self, response):
         raise NotImplementedError
 
+    def get_header(self, response, name):
+        raise NotImplementedError
+
+    def get_content_length(self, response):
+        discarded_length = getattr(response, 'discarded_length', None)
+        if discarded_length is not None:
+            return discarded_length
+        return len(self.get_content(response))
+
+    def count_queries(self):
+        """Context manager giving a callable that returns the queries made so far."""
+        raise NotImplementedError
+
     def is_valid_for_extraction(self, response):
         return acceptable_content_type(self.get_content_type(response))
 
     def extract(self, response, element_names, attr_names):
-        soup = BeautifulSoup(self.get_content(response), "html.parser")
-        filtered_elements = (
-            element for element in soup.find_all() if (
-                (not element_names or element.name in element_names)
-                and not any(
-                    soupsieve.match(selector, element) for selector in self.ignore_css_selectors
-                )
-            )
+        nodes = self.parser.extract_nodes(
+            self.get_content(response), None, attr_names,
+            ignore_selector=self.ignore_selector, forms=False,
         )
-        for element in filtered_elements:
-            for attr_name in attr_names:
-                attr = element.get(attr_name)
-                if attr:
-                    defragged_attr = urldefrag(attr)[0]
-                    yield Node(source=element.name, path=defragged_attr)
+        for node in nodes:
+            if not element_names or node.source in element_names:
+                yield node
 
     def extract_forms(self, path, response, ignore_form_fields=None):
-        soup = BeautifulSoup(self.get_content(response), "html.parser")
-        form_elements = soup.find_all('form')
-        forms = [
-            Node(
-                source=FORM,
-                method=form_element.get('method', GET),
-                path=form_element.get('action', path),
-                params={
-                    input_element['name']: input_element.get('value', '')
-                    for input_element
-                    in form_element.find_all('input', {'name': True})
-                },
-                ignore_form_fields=ignore_form_fields
-            )
-            for form_element in form_elements
-            if not any(soupsieve.match(sel, form_element) for sel in self.ignore_css_selectors)
-        ]
-        return forms
+        return list(self.parser.extract_nodes(
+            self.get_content(response), path, (),
+            ignore_selector=self.ignore_selector,
+            ignore_form_fields=ignore_form_fields, links=False,
+        ))
+
+    def extract_nodes(self, path, response, attr_names, ignore_form_fields=None):
+        """Yield link and form nodes, in document order, from a single parse."""
+        return self.parser.extract_nodes(
+            self.get_content(response), path, attr_names,
+            ignore_selector=self.ignore_selector,
+            ignore_form_fields=ignore_form_fields,
+        )
 
 
 class DummyClientWrapper:
 
+    is_async = False
+
     def __init__(self, client=None, ignore_css_selectors=None):
         self.client = client
         self.ignore_css_selectors = ignore_css_selectors or []
@@ -75,15 +96,35 @@ class DummyClientWrapper:
 
 class FlaskClientWrapper(BaseClientWrapper):
 
-    def __init__(self, client, ignore_css_selectors=None):
+    supports_streaming = True
+
+    def __init__(self, client, ignore_css_selectors=None, parser=None):
         self.client = client
         self.ignore_css_selectors = ignore_css_selectors or []
-
-    def get(self, path, fields=None):
-        return self.client.get(path, query_string=fields or None)
-
-    def post(self, path, fields=None):
-        return self.client.post(path, data=fields or None)
+        self.ignore_selector = compile_css_selectors(self.ignore_css_selectors)
+        self.parser = get_parser(parser)
+
+    def get(self, path, fields=None, headers=None, keep_content: Callable = None):
+        if keep_content is None:
+            return self.client.get(path, query_string=fields or None, headers=headers)
+        response = self.client.get(path, query_string=fields or None, headers=headers, buffered=False)
+        return self.read_streamed(response, keep_content)
+
+    def post(self, path, fields=None, keep_content: Callable = None):
+        if keep_content is None:
+            return self.client.post(path, data=fields or None)
+        return self.read_streamed(self.client.post(path, data=fields or None, buffered=False), keep_content)
+
+    def read_streamed(self, response, keep_content: Callable):
+        try:
+            if keep_content(response):
+                response.get_data()
+            else:
+                response.discarded_length = discard(response.iter_encoded())
+        finally:
+            # ends the request, running any teardown
+            response.close()
+        return response
 
     def get_content(self, response):
         return response.data
@@ -91,15 +132,20 @@ class FlaskClientWrapper(BaseClientWrapper):
     def get_content_type(self, response):
         return response.content_type
 
+    def get_header(self, response, name):
+        return response.headers.get(name)
+
 
 class WebTestClientWrapper(BaseClientWrapper):
 
-    def __init__(self, webtest_app, ignore_css_selectors=None):
+    def __init__(self, webtest_app, ignore_css_selectors=None, parser=None):
         self.webtest_app = webtest_app
         self.ignore_css_selectors = ignore_css_selectors or []
+        self.ignore_selector = compile_css_selectors(self.ignore_css_selectors)
+        self.parser = get_parser(parser)
 
-    def get(self, path, fields=None):
-        return self.webtest_app.get(path, params=fields, expect_errors=True)
+    def get(self, path, fields=None, headers=None):
+        return self.webtest_app.get(path, params=fields, headers=headers, expect_errors=True)
 
     def post(self, path, fields=None):
         return self.webtest_app.post(path, params=fields, expect_errors=True)
@@ -110,40 +156,226 @@ class WebTestClientWrapper(BaseClientWrapper):
     def get_content_type(self, response):
         return response.content_type
 
+    def get_header(self, response, name):
+        return response.headers.get(name)
+
 
 class DjangoClientWrapper(BaseClientWrapper):
 
-    def __init__(self, client, ignore_css_selectors):
+    supports_query_counting = True
+    supports_streaming = True
+
+    def __init__(self, client, ignore_css_selectors, parser=None):
         self.client = client
         self.ignore_css_selectors = ignore_css_selectors or []
+        self.ignore_selector = compile_css_selectors(self.ignore_css_selectors)
+        self.parser = get_parser(parser)
+
+    def get(self, path, fields=None, headers=None, keep_content: Callable = None):
+        extra = {
+            'HTTP_' + name.upper().replace('-', '_'): value
+            for (name, value) in (headers or {}).items()
+        }
+        return self.read_streamed(self.client.get(path, data=fields, follow=True, **extra), keep_content)
+
+    def post(self, path, fields=None, keep_content: Callable = None):
+        return self.read_streamed(self.client.post(path, data=fields, follow=True), keep_content)
+
+    def read_streamed(self, response, keep_content: Optional[Callable]):
+        # only streaming responses, such as file downloads, are not already in memory
+        if keep_content is None or not response.streaming or keep_content(response):
+            return response
+        try:
+            response.discarded_length = discard(response.streaming_content)
+        finally:
+            response.close()
+        return response
 
-    def get(self, path, fields=None):
-        return self.client.get(path, data=fields, follow=True)
+    def get_content(self, response):
+        if response.streaming:
+            # streamed content can only be read once
+            if getattr(response, 'buffered_content', None) is None:
+                response.buffered_content = b''.join(response.streaming_content)
+            return response.buffered_content
+        return response.content
 
-    def post(self, path, fields=None):
-        return self.client.post(path, data=fields, follow=True)
+    def get_content_type(self, response):
+        return response.get('Content-Type')
+
+    def get_header(self, response, name):
+        return response.get(name)
+
+    @contextmanager
+    def count_queries(self):
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in connections
+            ]
+            yield lambda: sum(len(context) for context in contexts)
+
+
+class AsgiResponse:
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: List[Tuple[bytes, bytes]],
+        content: bytes,
+        discarded_length: Optional[int] = None,
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.discarded_length = discarded_length
+
+    def get_header(self, name: str) -> Optional[str]:
+        name_bytes = name.lower().encode('latin-1')
+        for (key, value) in self.headers:
+            if key.lower() == name_bytes:
+                return value.decode('latin-1')
+        return None
+
+    @property
+    def content_type(self) -> str:
+        return self.get_header('content-type') or ''
+
+
+class AsgiClient:
+    """A minimal client driving an ASGI application in-process.
+
+    Only the HTTP protocol is supported; lifespan events are not sent.
+    """
+
+    def __init__(self, app, base_url: str = 'http://testserver'):
+        self.app = app
+        self.base_url = base_url
+
+    async def get(self, path, fields=None, headers=None, keep_content: Callable = None):
+        return await self.request(GET, path, fields, headers, keep_content)
+
+    async def post(self, path, fields=None, keep_content: Callable = None):
+        return await self.request(POST, path, fields, keep_content=keep_content)
+
+    async def request(self, method, path, fields=None, headers=None, keep_content: Callable = None):
+        """Make a request; if `keep_content` is given and returns false for the
+        response before its body, the body is counted but not kept."""
+        url = urlsplit(urljoin(self.base_url, path))
+        query_string = url.query
+        body = b''
+        request_headers = [(b'host', url.netloc.encode('latin-1'))]
+        request_headers += [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for (name, value) in (headers or {}).items()
+        ]
+        if fields and method == GET:
+            query_string = '&'.join(filter(None, (query_string, urlencode(fields))))
+        elif fields:
+            body = urlencode(fields).encode('ascii')
+            request_headers += [
+                (b'content-type', b'application/x-www-form-urlencoded'),
+                (b'content-length', str(len(body)).encode('ascii')),
+            ]
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': url.scheme,
+            'path': unquote(url.path) or '/',
+            'raw_path': (url.path or '/').encode('latin-1'),
+            'query_string': query_string.encode('latin-1'),
+            'root_path': '',
+            'headers': request_headers,
+            'client': ('127.0.0.1', 50000),
+            'server': (url.hostname, url.port or (443 if url.scheme == 'https' else 80)),
+        }
+
+        request_sent = False
+        response_complete = asyncio.Event()
+        status_code = None
+        response_headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        keep = True
+        discarded_length = 0
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await response_complete.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status_code, response_headers, keep, discarded_length
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                response_headers = list(message.get('headers', []))
+                if keep_content is not None:
+                    keep = keep_content(AsgiResponse(status_code, response_headers, b''))
+            elif message['type'] == 'http.response.body':
+                if keep:
+                    chunks.append(message.get('body', b''))
+                else:
+                    discarded_length += len(message.get('body', b''))
+                if not message.get('more_body', False):
+                    response_complete.set()
+
+        await self.app(scope, receive, send)
+        response_complete.set()
+        if status_code is None:
+            raise RuntimeError(f"ASGI application did not start a response for {method} {path}")
+        if not keep:
+            return AsgiResponse(status_code, response_headers, b'', discarded_length)
+        return AsgiResponse(status_code, response_headers, b''.join(chunks))
+
+
+class AsgiClientWrapper(BaseClientWrapper):
+
+    is_async = True
+    supports_streaming = True
+
+    def __init__(self, client, ignore_css_selectors=None, parser=None):
+        self.client = client
+        self.ignore_css_selectors = ignore_css_selectors or []
+        self.ignore_selector = compile_css_selectors(self.ignore_css_selectors)
+        self.parser = get_parser(parser)
+
+    def get(self, path, fields=None, headers=None, keep_content: Callable = None):
+        return self.client.get(path, fields=fields or None, headers=headers, keep_content=keep_content)
+
+    def post(self, path, fields=None, keep_content: Callable = None):
+        return self.client.post(path, fields=fields or None, keep_content=keep_content)
 
     def get_content(self, response):
         return response.content
 
     def get_content_type(self, response):
-        return response.get('Content-Type')
+        return response.content_type
+
+    def get_header(self, response, name):
+        return response.get_header(name)
 
 
-def detect_and_wrap_client(client, ignore_css_selectors):
+def detect_and_wrap_client(client, ignore_css_selectors, parser=None):
     client_class_pairs = [
         (cls.__module__, cls.__name__) for cls in
         inspect.getmro(client.__class__)
     ]
     for client_class_pair in client_class_pairs:
         if client_class_pair == ('flask.testing', 'FlaskClient'):
-            return FlaskClientWrapper(client=client, ignore_css_selectors=ignore_css_selectors)
+            return FlaskClientWrapper(client=client, ignore_css_selectors=ignore_css_selectors, parser=parser)
         if client_class_pair == ('webtest.app', 'TestApp'):
-            return WebTestClientWrapper(webtest_app=client, ignore_css_selectors=ignore_css_selectors)
+            return WebTestClientWrapper(webtest_app=client, ignore_css_selectors=ignore_css_selectors, parser=parser)
         if client_class_pair == ('flask_webtest', 'TestApp'):
-            return WebTestClientWrapper(webtest_app=client, ignore_css_selectors=ignore_css_selectors)
+            return WebTestClientWrapper(webtest_app=client, ignore_css_selectors=ignore_css_selectors, parser=parser)
         if client_class_pair == ('django.test.client', 'Client'):
-            return DjangoClientWrapper(client=client, ignore_css_selectors=ignore_css_selectors)
+            return DjangoClientWrapper(client=client, ignore_css_selectors=ignore_css_selectors, parser=parser)
+        if client_class_pair == ('python_testing_crawler.clients', 'AsgiClient'):
+            return AsgiClientWrapper(client=client, ignore_css_selectors=ignore_css_selectors, parser=parser)
         if client_class_pair == ('python_testing_crawler.clients', 'DummyClient'):
             return DummyClientWrapper()
     else:
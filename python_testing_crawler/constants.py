@@ -8,6 +8,7 @@ ANCHOR = "a"
 AREA = "area"
 LINK = "link"
 FORM = "form"
+INPUT = "input"
 
 
 # HTML attributes
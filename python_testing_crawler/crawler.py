@@ -2,67 +2,142 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-from typing import Optional, Iterable, List, Callable
+from typing import Optional, Iterable, List, Callable, Dict, Union
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from copy import copy
-from queue import Queue
+from functools import partial
 from urllib.parse import urlparse
-from itertools import chain
+import threading
 import traceback
 import logging
 
 import soupsieve
 
-from .rules import Rule, Request, Ignore, Allow
-from .graph import DirectedGraph, Node
+from .rules import MaxQueries, Rule, RuleSet, Request
+from .graph import CompactDirectedGraph, DirectedGraph, Node
 from .clients import detect_and_wrap_client
-from .exn import HttpStatusError, TooManyRequestsError, UnexpectedResponseError
-from .utils import underlined
+from .checkpoint import CheckpointStore
+from .cache import ExtractionCache, NodeTemplate, content_hash, make_node, make_template
+from .incremental import CrawlCache, CrawlCacheEntry, extraction_settings
+from .parsers import BaseParser, get_parser
+from .urls import Canonicalizer
+from .routes import SKIPPED_BY_SAMPLING, RouteSampler, RouteTemplates
+from .frontier import SKIPPED_BY_DEPTH, Frontier, get_frontier
+from .timings import Timer, performance_summary, start_timer, stop_timer
+from .events import Event, EventDispatcher, PhaseProfiler
+from .results import ResultsWriter
+from .errors import ErrorAggregator
+from .exn import BudgetExceededError, HttpStatusError, TooManyRequestsError, UnexpectedResponseError
+from .utils import format_megabytes, peak_rss, underlined
 from .constants import HREF
 from .constants import GET, POST
 from .constants import USABLE_SCHEMES
 
 
 LOGGER_NAME = 'python-testing-crawler'
+LOW_MEMORY_MAX_ERRORS = 100
 logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
 
 
 class Crawler:
 
+    is_async = False  # whether clients are awaited, see AsyncCrawler
+
     def __init__(
         self,
-        client,
+        client=None,
         *,
+        client_factory: Callable = None,
+        workers: int = 1,
         initial_paths: Iterable[str] = None,
         rules: Iterable[Rule] = None,
         path_attrs: Iterable[str] = (HREF,),
         ignore_css_selectors: Iterable = None,
         ignore_form_fields: Iterable[str] = None,
+        parser: Union[str, BaseParser] = None,
+        canonicalizer: Optional[Canonicalizer] = None,
+        route_templates: Iterable[str] = None,
+        samples_per_template: Optional[int] = None,
+        frontier: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        extraction_cache_size: int = 256,
+        crawl_cache_path: Optional[str] = None,
         max_requests: Optional[int] = None,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_interval: int = 100,
+        resume: bool = False,
+        low_memory: bool = False,
+        compact_graph: bool = False,
+        track_edges: bool = True,
         capture_exceptions: bool = True,
+        max_errors: Optional[int] = None,
+        error_sample_size: int = 10,
         output_summary: bool = True,
+        performance_summary_size: int = 10,
+        listeners: Iterable = None,
+        profile: bool = False,
+        results_path: Optional[str] = None,
         should_process_handlers: Iterable[Callable] = None,
         check_response_handlers: Iterable[Callable] = None,
     ):
         # params
         self._client = client
+        self.client_factory = client_factory
+        self.workers = workers
         self.initial_paths = list(initial_paths or [])
         self.rules = list(rules or [])
+        self.rule_set = RuleSet(self.rules)
         self.path_attrs = tuple(path_attrs)
         self.ignore_css_selectors = list(ignore_css_selectors or [])
         self.ignore_form_fields = list(ignore_form_fields or [])
+        self.parser = get_parser(parser)
+        self.canonicalizer = canonicalizer
+        self.route_templates = RouteTemplates(route_templates or ())
+        self.sampler = RouteSampler(samples_per_template, self.route_templates) if samples_per_template is not None else None
+        self.extraction_cache = ExtractionCache(extraction_cache_size) if extraction_cache_size else None
+        self.max_depth = max_depth
+        self.crawl_cache_path = crawl_cache_path
+        self.crawl_cache: Optional[CrawlCache] = None
         self.max_requests = max_requests
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.resume = resume
+        self.low_memory = low_memory
         self.capture_exceptions = capture_exceptions
+        self.max_errors = LOW_MEMORY_MAX_ERRORS if max_errors is None and low_memory else max_errors
         self.output_summary = output_summary
+        self.performance_summary_size = performance_summary_size
 
         # data structures
-        self.queue: Queue = Queue()
-        self.graph = DirectedGraph()
-        self.tracebacks: List = []
+        self.frontier: Frontier = get_frontier(frontier, self.route_templates, synchronized=workers > 1)
+        graph_cls = CompactDirectedGraph if compact_graph or low_memory else DirectedGraph
+        self.graph = graph_cls(track_edges=track_edges)
+        self.tracebacks: List = []  # at most max_errors of them
+        self.error_count = 0
+        self.errors = ErrorAggregator(error_sample_size)  # every error, grouped by likely cause
+        self._retained_error_ids: set = set()
+        self.processed_count = 0
+        self.checkpoint_store: Optional[CheckpointStore] = None
+        self._checkpointed_tracebacks = 0
+        self._requeued: List[Node] = []  # enqueued again since the last node was processed
 
         # handler lists
         self.should_process_handlers = list(should_process_handlers or [])
         self.check_response_handlers = list(check_response_handlers or [])
 
+        # event listeners
+        self.events = EventDispatcher()
+        for listener in listeners or []:
+            self.events.listen(listener)
+        self.profiler: Optional[PhaseProfiler] = None
+        if profile:
+            self.profiler = PhaseProfiler()
+            self.profiler.register(self.events)
+        self.results_writer: Optional[ResultsWriter] = None
+        if results_path:
+            self.results_writer = ResultsWriter(results_path)
+            self.events.listen(self.results_writer)
+
         # check css selectors
         for selector in self.ignore_css_selectors:
             try:
@@ -70,14 +145,164 @@ class Crawler:
             except soupsieve.SelectorSyntaxError as e:
                 msg = f"Invalid CSS selector '{selector}' (see parent exception)"
                 raise ValueError(msg) from e
-
-        # detect client and construct wrapper
-        self.client = detect_and_wrap_client(self._client, ignore_css_selectors)
+        if self.ignore_css_selectors and not self.parser.supports_css_selectors:
+            raise ValueError(f"Parser '{self.parser.name}' does not support ignore_css_selectors")
+
+        if checkpoint_path and not track_edges:
+            raise ValueError("Checkpointing needs track_edges, to save newly found nodes")
+        if self.max_errors is not None and self.max_errors < 0:
+            raise ValueError("max_errors cannot be negative")
+
+        # check client or client factory
+        if (client is None) == (client_factory is None):
+            raise ValueError("Need exactly one of client or client_factory")
+        if workers < 1:
+            raise ValueError("Need at least one worker")
+        if workers > 1 and client_factory is None:
+            raise ValueError("Need a client_factory to crawl with multiple workers")
+
+        # detect client and construct wrapper, or defer to each worker thread
+        self._local = threading.local()
+        self._errors_lock = threading.Lock()
+        self._shared_client = self.wrap_client(client) if client is not None else None
 
         # get logger
         self.logger = logging.getLogger(LOGGER_NAME)
 
+    @property
+    def client(self):
+        if self._shared_client is not None:
+            return self._shared_client
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.wrap_client(self.client_factory())
+        return client
+
+    def wrap_client(self, client):
+        wrapper = detect_and_wrap_client(client, self.ignore_css_selectors, self.parser)
+        if wrapper.is_async and not self.is_async:
+            raise ValueError(f"{type(client).__name__} is asynchronous, so needs AsyncCrawler")
+        if self.is_async and not wrapper.is_async:
+            raise ValueError(f"{type(self).__name__} needs an asynchronous client, such as AsgiClient")
+        return wrapper
+
     def crawl(self):
+        self.start_crawl()
+
+        # main loop
+        try:
+            if self.workers > 1:
+                self.crawl_concurrently()
+            else:
+                while not self.frontier.empty():
+                    next_node = self.frontier.get()
+                    self.process_node(next_node)
+                    self.node_processed(next_node)
+        finally:
+            self.close_stores()
+
+        self.finish_crawl()
+
+    def start_crawl(self):
+        self.check_crawl()
+        self.logger.info("Starting crawl...")
+        if self.events.active:
+            self.events.emit(Event.CRAWL_STARTED)
+
+        # open the cache of pages from previous runs
+        if self.crawl_cache_path:
+            self.crawl_cache = CrawlCache(self.crawl_cache_path, extraction_settings(
+                self.path_attrs, self.ignore_css_selectors, self.ignore_form_fields, self.parser,
+            ))
+
+        # carry on from a checkpoint, if asked to and there is one
+        if self.checkpoint_path:
+            self.checkpoint_store = CheckpointStore(self.checkpoint_path)
+            if self.resume and self.checkpoint_store.has_checkpoint():
+                self.restore_checkpoint()
+                if self.results_writer is not None:
+                    self.results_writer.open(append=True)
+                return
+            self.checkpoint_store.clear()
+        if self.results_writer is not None:
+            self.results_writer.open()
+
+        # add initial entries
+        self.logger.info("Initial paths: %s", self.initial_paths)
+        for node in self.initial_nodes():
+            self.graph.add_node(node)
+            self.enqueue(node)
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.add_nodes(self.graph.map.values())
+            self.save_checkpoint()
+
+    def restore_checkpoint(self):
+        nodes, pending_nodes, edges, tracebacks = self.checkpoint_store.load()
+        for node in nodes:
+            self.graph.add_node(node)
+        for (from_node, to_node) in edges:
+            self.graph.add_edge(from_node, to_node)
+        self.tracebacks.extend(tracebacks)
+        self._checkpointed_tracebacks = len(self.tracebacks)
+        self.error_count = max(self.checkpoint_store.error_count, len(self.tracebacks))
+        self._retained_error_ids.update(node.id for (node, exc, tb) in self.tracebacks)
+        for (node, exc, tb) in self.tracebacks:
+            self.errors.add(node, exc, tb)
+        if self.sampler is not None:
+            for node in nodes:
+                if node.requested:
+                    self.sampler.sample(node)
+        for node in pending_nodes:
+            self.enqueue(node)
+        self.processed_count = self.checkpoint_store.count
+        self.logger.info(
+            "Resuming crawl from %s with %d node(s) pending", self.checkpoint_path, len(pending_nodes)
+        )
+
+    def save_checkpoint(self):
+        for (node, exc, tb) in self.tracebacks[self._checkpointed_tracebacks:]:
+            self.checkpoint_store.record_error(node, exc, tb)
+        self._checkpointed_tracebacks = len(self.tracebacks)
+        self.checkpoint_store.error_count = self.error_count
+        self.checkpoint_store.flush()
+
+    def close_stores(self):
+        if self.checkpoint_store is not None:
+            self.save_checkpoint()
+            self.checkpoint_store.close()
+            self.checkpoint_store = None
+        if self.crawl_cache is not None:
+            self.crawl_cache.close()
+        if self.results_writer is not None:
+            self.results_writer.close()
+
+    def node_processed(self, node):
+        self.processed_count += 1
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.record_processed(node, self.graph.adj.get(node.id, ()))
+            while self._requeued:
+                requeued_node = self._requeued.pop()
+                # unless it has already been processed again
+                if not requeued_node.requested and requeued_node.skipped is None:
+                    self.checkpoint_store.record_requeued(requeued_node)
+            if self.processed_count % self.checkpoint_interval == 0:
+                self.save_checkpoint()
+        if self.events.active:
+            self.events.emit(Event.NODE_PROCESSED, node)
+        if self.low_memory:
+            self.release_node(node)
+
+        if self.max_requests is not None and self.processed_count >= self.max_requests:
+            raise TooManyRequestsError(self.processed_count)
+
+    def release_node(self, node):
+        # the id is kept, so the node still deduplicates; the params of
+        # nodes with captured errors are kept for reporting, and those of
+        # nodes not requested, which may yet be if found by a shorter path
+        if node.requested and node.params and node.id not in self._retained_error_ids:
+            node.params = {}
+
+    def check_crawl(self):
         # check initial paths
         if not self.initial_paths:
             raise ValueError("Need some initial paths")
@@ -85,84 +310,178 @@ class Crawler:
         # check rules
         if not self.rules:
             raise ValueError("Need some rules!")
-
-        # add initial entries
-        self.logger.info("Starting crawl...")
-        self.logger.info(f"Initial paths: {self.initial_paths}")
-        for path in self.initial_paths:
-            node = Node(path=path, source=None)
-            self.graph.add_node(node)
-            self.queue.put(node)
-
-        # main loop
-        count = 0
-        while not self.queue.empty():
-            next_node = self.queue.get()
-            self.process_node(next_node)
-            count += 1
-
-            if count == self.max_requests:
-                raise TooManyRequestsError(count)
+        if self.rule_set.rules != self.rules:
+            self.rule_set = RuleSet(self.rules)
+        if (
+            self._shared_client is not None
+            and not self._shared_client.supports_query_counting
+            and any(isinstance(rule.action, MaxQueries) for rule in self.rules)
+        ):
+            raise ValueError("MaxQueries rules need a client that can count database queries")
+
+    def initial_nodes(self) -> List[Node]:
+        return self.canonical_nodes(None, [Node(path=path, source=None) for path in self.initial_paths])
+
+    def finish_crawl(self):
+        self.graph.freeze()
+        if self.events.active:
+            self.events.emit(Event.CRAWL_FINISHED)
 
         # handle any captured tracebacks
         if self.output_summary:
             print(underlined("Results of Testing Crawler") + "\n")
             print(f"Encountered {len(self.graph.encountered_paths)} endpoints.")
-            print(f"Visited {len(self.graph.visited_paths)} endpoints.\n")
-            if self.tracebacks:
-                print(underlined(f"Summary of {len(self.tracebacks)} error(s)"))
-                for (node, exc, tb) in self.tracebacks:
-                    print()
-                    self.print_exception_request(exc, node)
-                print("\n" + underlined("Full tracebacks") + "\n")
-                for (node, exc, tb) in self.tracebacks:
-                    self.print_exception_request(exc, node)
-                    print(''.join(tb.format()) + "\n")
+            print(f"Visited {len(self.graph.visited_paths)} endpoints.")
+            if self.sampler is not None:
+                skipped = sum(1 for node in self.graph.map.values() if node.skipped == SKIPPED_BY_SAMPLING)
+                print(f"Skipped {skipped} endpoints by sampling.")
+            if self.extraction_cache is not None:
+                print(
+                    f"Extraction cache: {self.extraction_cache.hits} hit(s), "
+                    f"{self.extraction_cache.misses} miss(es)."
+                )
+            if self.crawl_cache is not None:
+                print(
+                    f"Crawl cache: {self.crawl_cache.not_modified} not modified, "
+                    f"{self.crawl_cache.unchanged} unchanged, {self.crawl_cache.modified} modified."
+                )
+            peak = peak_rss()
+            if peak is not None:
+                print(f"Peak memory: {format_megabytes(peak)}.")
+            print()
+            if self.performance_summary_size:
+                lines = performance_summary(
+                    self.graph.map.values(), self.route_templates, self.performance_summary_size
+                )
+                if lines:
+                    print("\n".join(lines) + "\n")
+            if self.profiler is not None:
+                print("\n".join(self.profiler.summary()) + "\n")
+            if self.errors:
+                self.print_error_groups()
 
         # finally fail if captured tracebacks
-        if self.tracebacks:
-            assert False, f"Encountered {len(self.tracebacks)} exception(s) whilst crawling"
+        if self.error_count:
+            assert False, f"Encountered {self.error_count} exception(s) whilst crawling"
+
+    def print_error_groups(self):
+        groups = sorted(self.errors, key=lambda group: -group.count)
+        print(underlined(f"Summary of {self.error_count} error(s), in {len(groups)} group(s)"))
+        for (number, group) in enumerate(groups, 1):
+            print()
+            location = f" at {group.location}" if group.location else ""
+            detail = f" ({', '.join(str(value) for value in group.key[1])})" if group.key[1] else ""
+            print(f"[{number}] {group.count} x {group.key[0]}{detail}{location}")
+            for (node, message) in group.sample:
+                print(f"    {node.method} {node.path} => {message}")
+            if group.count > len(group.sample):
+                print(f"    ... and {group.count - len(group.sample)} more")
+        print("\n" + underlined("Full tracebacks, one per group") + "\n")
+        for (number, group) in enumerate(groups, 1):
+            print(f"[{number}] ", end="")
+            self.print_exception_request(group.exc, group.node)
+            print(''.join(group.tb.format()) + "\n")
+
+    def crawl_concurrently(self):
+        # keep at most one node per worker in flight, so that nothing is
+        # left queued inside the executor when failing fast
+        pending: Dict[Future, Node] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                while pending or not self.frontier.empty():
+                    while not self.frontier.empty() and len(pending) < self.workers:
+                        next_node = self.frontier.get()
+                        pending[executor.submit(self.process_node, next_node)] = next_node
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                        self.node_processed(pending.pop(future))
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
 
     def should_process(self, node):
+        events = self.events
+        if events.active:
+            events.emit(Event.RULES_STARTED, node)
+        try:
+            allowed = self.rules_allow_processing(node)
+        finally:
+            if events.active:
+                events.emit(Event.RULES_FINISHED, node)
+        if not allowed:
+            return False
+
+        # try registered handlers
+        if self.should_process_handlers:
+            if events.active:
+                events.emit(Event.HANDLERS_STARTED, node)
+            try:
+                allowed = self.handlers_allow_processing(node)
+            finally:
+                if events.active:
+                    events.emit(Event.HANDLERS_FINISHED, node)
+            if not allowed:
+                return False
+
+        return self.limits_allow_processing(node)
+
+    def rules_allow_processing(self, node):
         # follow only http schemes
         scheme = urlparse(node.path).scheme
         if scheme and scheme not in USABLE_SCHEMES:
-            self.logger.info(f"Invalid scheme '{scheme} prevented processing of {node}")
+            self.logger.info("Invalid scheme '%s' prevented processing of %s", scheme, node)
             return False
 
         # find matching rule
-        final_matching_rule = None
-        for rule in self.rules:
-            if isinstance(rule.action, (Request, Ignore)) and rule.match(node):
-                final_matching_rule = rule
+        final_matching_rule = self.rule_set.match(node).process
         if not final_matching_rule:
-            self.logger.info(f"Lack of matching Rule prevented processing of {node}")
+            self.logger.info("Lack of matching Rule prevented processing of %s", node)
             return False
         if not isinstance(final_matching_rule.action, Request):
-            self.logger.info(f"{final_matching_rule} prevented processing of {node}")
+            self.logger.info("%s prevented processing of %s", final_matching_rule, node)
             return False
+        return True
 
-        # try registered handlers
+    def handlers_allow_processing(self, node):
         for fn in self.should_process_handlers:
             if not fn(node):
-                self.logger.info(f"Handler {fn} prevented processing of {node}")
-                return
+                self.logger.info("Handler %s prevented processing of %s", fn, node)
+                return False
+        return True
+
+    def limits_allow_processing(self, node):
+        # go no deeper than asked
+        if self.max_depth is not None:
+            # depths are lowered under the lock, by lower_depth
+            with self.graph.lock:
+                too_deep = node.depth > self.max_depth
+                if too_deep:
+                    node.skipped = SKIPPED_BY_DEPTH
+            if too_deep:
+                self.logger.info("Depth %d prevented processing of %s", node.depth, node)
+                return False
+
+        # request only the first few nodes of each route template
+        if self.sampler is not None and not self.sampler.sample(node):
+            node.skipped = SKIPPED_BY_SAMPLING
+            self.logger.info("Sampling prevented processing of %s", node)
+            return False
 
         # ok
         return True
 
     def should_extract(self, node):
-        final_matching_rule = None
-        for rule in self.rules:
-            if isinstance(rule.action, Request) and rule.match(node):
-                final_matching_rule = rule
+        final_matching_rule = self.rule_set.match(node).request
         if final_matching_rule and final_matching_rule.action.only:
-            self.logger.info(f"{final_matching_rule} prevented extraction from {node}")
+            self.logger.info("%s prevented extraction from %s", final_matching_rule, node)
             return False
         return True
 
     def process_node(self, node):
-        self.logger.info(f"Processing {node} ...")
+        self.logger.info("Processing %s ...", node)
+        events = self.events
 
         # determine if should proceed
         if not self.should_process(node):
@@ -173,44 +492,179 @@ class Crawler:
 
         # make request and check the response
         try:
-            response = self.make_request(node)
+            if events.active:
+                events.emit(Event.REQUEST_STARTED, node)
+            response = None
+            timer = start_timer()
+            try:
+                response = self.make_request(node)
+                self.record_request(node, response, timer)
+            finally:
+                if events.active:
+                    events.emit(Event.REQUEST_FINISHED, node, response)
             self.check_response(node, response)
         except (Exception if self.capture_exceptions else ()) as e:
-            tb = traceback.TracebackException.from_exception(e)
-            self.tracebacks.append((node, e, tb))
+            self.capture_exception(node, e)
             return
         except Exception as e:
             self.print_exception_request(e, node)
             raise e
 
-        # bail if response not valid for extraction
-        if not self.client.is_valid_for_extraction(response):
-            self.logger.info(f"Response was not valid for extraction for {node}")
-            return
-
-        # bail if don't want to extract
-        if not self.should_extract(node):
+        # bail if response not valid for extraction or don't want to extract
+        if not self.should_extract_from(node, response):
             return
 
         # extract onwards links and forms
-        self.logger.info(f"Extracting from {node}")
-        link_nodes = self.client.extract(response, None, self.path_attrs)
-        form_nodes = [*self.client.extract_forms(
-            node.path, response, ignore_form_fields=self.ignore_form_fields
-        )]
-
-        # walk potentially new nodes
-        for potential_new_node in chain(link_nodes, form_nodes):
-            existing_child_node = self.graph.get_node_by_id(potential_new_node.id)
-            already_encountered = bool(existing_child_node)
-            child_node = existing_child_node or potential_new_node
+        if events.active:
+            events.emit(Event.EXTRACTION_STARTED, node)
+        children = list(self.extract_from(node, response))
+        if events.active:
+            events.emit(Event.EXTRACTION_FINISHED, node, children)
+        self.update_graph(node, children)
+
+    def capture_exception(self, node, exc):
+        tb = traceback.TracebackException.from_exception(exc)
+        with self._errors_lock:
+            self.error_count += 1
+            self.errors.add(node, exc, tb)
+            retain = self.max_errors is None or len(self.tracebacks) < self.max_errors
+            if retain:
+                self.tracebacks.append((node, exc, tb))
+                self._retained_error_ids.add(node.id)
+        if self.events.active:
+            self.events.emit(Event.ERROR_CAPTURED, node, exc, tb)
+
+    def should_extract_from(self, node, response):
+        if self.is_not_modified(node, response):
+            return self.should_extract(node)
+        if not self.client.is_valid_for_extraction(response):
+            self.logger.info("Response was not valid for extraction for %s", node)
+            return False
+        return self.should_extract(node)
 
-            if not already_encountered:
-                self.graph.add_node(child_node)
-                self.queue.put(child_node)
+    def is_not_modified(self, node, response):
+        return (
+            response.status_code == 304
+            and self.crawl_cache is not None
+            and self.crawl_cache.get(node) is not None
+        )
 
-            # record link to graph
-            self.graph.add_edge(node, child_node)
+    def extract_from(self, node, response):
+        self.logger.info("Extracting from %s", node)
+        if self.extraction_cache is None and self.crawl_cache is None:
+            return self.client.extract_nodes(
+                node.path, response, self.path_attrs, ignore_form_fields=self.ignore_form_fields
+            )
+        return [
+            make_node(template, node.path)
+            for template in self.extract_templates(node, response)
+        ]
+
+    def extract_templates(self, node, response) -> List[NodeTemplate]:
+        # reuse the nodes from the previous run if the page has not changed
+        if self.crawl_cache is None:
+            return self.extract_templates_from_content(self.client.get_content(response), response)
+        entry = self.crawl_cache.get(node)
+        if entry is not None and response.status_code == 304:
+            self.crawl_cache.record('not_modified')
+            return entry.children
+        content = self.client.get_content(response)
+        body_hash = content_hash(content)
+        if entry is not None and entry.body_hash == body_hash:
+            self.crawl_cache.record('unchanged')
+            templates = entry.children
+        else:
+            self.crawl_cache.record('modified')
+            templates = self.extract_templates_from_content(content, response, body_hash)
+        self.crawl_cache.put(node, CrawlCacheEntry(
+            etag=self.client.get_header(response, 'ETag'),
+            last_modified=self.client.get_header(response, 'Last-Modified'),
+            body_hash=body_hash,
+            children=templates,
+        ))
+        return templates
+
+    def extract_templates_from_content(self, content, response, body_hash=None) -> List[NodeTemplate]:
+        # identical bodies give identical nodes, except that forms without an
+        # action default to the path of the page they are on
+        def extract():
+            return self.client.extract_nodes(
+                None, response, self.path_attrs, ignore_form_fields=self.ignore_form_fields
+            )
+        if self.extraction_cache is None:
+            return [make_template(node) for node in extract()]
+        return self.extraction_cache.get_or_extract(content, extract, key=body_hash)
+
+    def canonical_nodes(self, node, potential_new_nodes):
+        if self.canonicalizer is None:
+            return potential_new_nodes
+        return [
+            self.canonicalizer.canonicalize_node(potential_new_node, node)
+            for potential_new_node in potential_new_nodes
+        ]
+
+    def prepare_children(self, node, potential_new_nodes):
+        children = self.canonical_nodes(node, potential_new_nodes)
+        for child_node in children:
+            child_node.depth = node.depth + 1
+        return children
+
+    def update_graph(self, node, potential_new_nodes):
+        if not self.events.active:
+            return self.add_children(node, potential_new_nodes)
+        self.events.emit(Event.GRAPH_UPDATE_STARTED, node)
+        self.add_children(node, potential_new_nodes)
+        self.events.emit(Event.GRAPH_UPDATE_FINISHED, node)
+
+    def enqueue(self, node):
+        self.frontier.put(node)
+        if self.events.active:
+            self.events.emit(Event.NODE_ENQUEUED, node)
+
+    def add_children(self, node, potential_new_nodes):
+        # hold the lock throughout, so the depths given to the children
+        # cannot be lowered until they are all in the graph
+        with self.graph.lock:
+            # walk potentially new nodes
+            for potential_new_node in self.prepare_children(node, potential_new_nodes):
+                child_node, added = self.graph.add_node_if_absent(potential_new_node)
+                if added:
+                    self.enqueue(child_node)
+                else:
+                    self.lower_depth(child_node, potential_new_node.depth)
+
+                # record link to graph
+                self.graph.add_edge(node, child_node)
+
+    def lower_depth(self, node, depth):
+        """Lower the depth of a node found again by a shorter path, and of the nodes found from it.
+
+        With concurrent crawling, a node may first be found by a longer path.
+        Nodes skipped for being too deep are enqueued again if now within
+        `max_depth`.
+        """
+        with self.graph.lock:
+            pending = [(node, depth)]
+            while pending:
+                (node, depth) = pending.pop()
+                if depth >= node.depth:
+                    continue
+                node.depth = depth
+                if node.skipped == SKIPPED_BY_DEPTH:
+                    if depth <= self.max_depth:
+                        node.skipped = None
+                        self.requeue(node)
+                elif node.requested:
+                    pending.extend((child_node, depth + 1) for child_node in self.children_to_lower(node))
+
+    def children_to_lower(self, node) -> Iterable[Node]:
+        """The children of a node whose depth has been lowered, to lower in turn."""
+        return self.graph.adj.get(node.id, ())
+
+    def requeue(self, node):
+        if self.checkpoint_store is not None:
+            self._requeued.append(node)
+        self.enqueue(node)
 
     def make_request(self, node):
         # decide client method
@@ -223,16 +677,43 @@ class Crawler:
 
         # determine additional input fields
         params = copy(node.params)
-        for rule in self.rules:
-            if isinstance(rule.action, Request) and rule.match(node):
-                params.update(rule.action.params)
+        for rule in self.rule_set.match(node).requests:
+            params.update(rule.action.params)
 
-        # make request
-        self.logger.info(
-            f"Requesting: {node.method} {node.path}"
-            + (f" with {params}" if params else "")
-        )
-        return fn(node.path, params)
+        # make request, conditionally if it was made in a previous run
+        if params:
+            self.logger.info("Requesting: %s %s with %s", node.method, node.path, params)
+        else:
+            self.logger.info("Requesting: %s %s", node.method, node.path)
+        kwargs = {}
+        if self.crawl_cache is not None and node.method == GET:
+            headers = self.crawl_cache.conditional_headers(node)
+            if headers:
+                kwargs['headers'] = headers
+        if self.client.supports_streaming and not self.check_response_handlers:
+            # handlers may read any body, so keep them all if there are some
+            kwargs['keep_content'] = partial(self.needs_content, node)
+        if self.rule_set.match(node).budget(MaxQueries) is None:
+            return fn(node.path, params, **kwargs)
+
+        # count database queries, only when there is a budget for them
+        if not self.client.supports_query_counting:
+            raise ValueError("MaxQueries rules need a client that can count database queries")
+        with self.client.count_queries() as query_count:
+            response = fn(node.path, params, **kwargs)
+        node.query_count = query_count()
+        return response
+
+    def needs_content(self, node, response):
+        """Whether the body of a response will be extracted from, judging by its headers."""
+        final_matching_rule = self.rule_set.match(node).request
+        if final_matching_rule and final_matching_rule.action.only:
+            return False
+        return self.client.is_valid_for_extraction(response)
+
+    def record_request(self, node, response, timer: Timer):
+        node.response_size = self.client.get_content_length(response)
+        node.wall_time, node.cpu_time = stop_timer(timer)
 
     def status_code_ok(self, node):
         if node.status_code is None:
@@ -243,30 +724,49 @@ class Crawler:
             return True
 
         # check allowances
-        allowances = (
-            rule for rule in self.rules
-            if isinstance(rule.action, Allow)
-        )
-        for allowance in allowances:
-            match = allowance.match(node)
-            if match and node.status_code in allowance.action.status_codes:
-                self.logger.info(f"{allowance} allowed HTTP {node.status_code} for {node}")
+        for allowance in self.rule_set.match(node).allowances:
+            if node.status_code in allowance.action.status_codes:
+                self.logger.info("%s allowed HTTP %d for %s", allowance, node.status_code, node)
                 return True
 
         # decide if failure
         return False
 
     def check_response(self, node, response):
-        # fail selected HTTP status codes
-        node.status_code = response.status_code
-        status_code_is_failure = not self.status_code_ok(node)
-        if status_code_is_failure:
-            raise HttpStatusError(response.status_code)
+        events = self.events
+        if events.active:
+            events.emit(Event.RULES_STARTED, node)
+        try:
+            # fail selected HTTP status codes
+            node.status_code = response.status_code
+            status_code_is_failure = not self.status_code_ok(node)
+            if status_code_is_failure:
+                raise HttpStatusError(response.status_code)
+
+            # fail responses over budget
+            self.check_budgets(node)
+        finally:
+            if events.active:
+                events.emit(Event.RULES_FINISHED, node)
 
         # try registered handlers
-        for fn in self.check_response_handlers:
-            if not fn(node, response):
-                raise UnexpectedResponseError(node, response, fn)
+        if not self.check_response_handlers:
+            return
+        if events.active:
+            events.emit(Event.HANDLERS_STARTED, node)
+        try:
+            for fn in self.check_response_handlers:
+                if not fn(node, response):
+                    raise UnexpectedResponseError(node, response, fn)
+        finally:
+            if events.active:
+                events.emit(Event.HANDLERS_FINISHED, node)
+
+    def check_budgets(self, node):
+        for rule in self.rule_set.match(node).final_budgets:
+            measured = rule.action.measure(node)
+            if measured is not None and measured > rule.action.limit:
+                raise BudgetExceededError(rule, measured)
 
     @classmethod
     def print_exception_request(cls, exc, node: Node):
@@ -0,0 +1,194 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from typing import Dict, Iterator, List, Optional, Tuple
+import os
+import pickle
+import re
+import sysconfig
+
+from .exn import BudgetExceededError, HttpStatusError, UnexpectedResponseError
+
+
+class RestoredException(Exception):
+    """Stands in for a captured exception that could not be carried over.
+
+    Used when an exception from another process or an earlier run cannot be
+    pickled; it keeps the original repr for reporting.
+    """
+
+    def __init__(self, exc_repr: str):
+        super().__init__(exc_repr)
+        self.exc_repr = exc_repr
+
+    def __repr__(self):
+        return self.exc_repr
+
+
+class FormattedTraceback:
+    """A pre-formatted stand-in for traceback.TracebackException."""
+
+    def __init__(self, lines: List[str]):
+        self.lines = list(lines)
+
+    def format(self) -> Iterator[str]:
+        return iter(self.lines)
+
+    def format_exception_only(self) -> Iterator[str]:
+        text = ''.join(self.lines).rstrip()
+        return iter([text.rsplit("\n", 1)[-1].strip() + "\n"] if text else [])
+
+
+def portable_exception(exc: BaseException) -> BaseException:
+    try:
+        pickle.loads(pickle.dumps(exc))
+    except Exception:
+        return RestoredException(repr(exc))
+    return exc
+
+
+def portable_traceback(tb) -> FormattedTraceback:
+    return FormattedTraceback(list(tb.format()))
+
+
+# frames in these directories are not the application's own
+LIBRARY_PATHS = tuple(sorted({
+    os.path.join(path, '') for path in (
+        *(sysconfig.get_paths().get(name) for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')),
+        os.path.dirname(os.path.abspath(__file__)),
+    )
+    if path
+}))
+
+FRAME_LINE = re.compile(r'^  File "(.*)", line (\d+), in (.*)$', re.MULTILINE)
+
+Frame = Tuple[str, int, str]
+
+
+def frames_of(tb) -> List[Frame]:
+    """(filename, line number, function) of each frame, outermost first."""
+    stack = getattr(tb, 'stack', None)
+    if stack is not None:
+        return [(frame.filename, frame.lineno, frame.name) for frame in stack]
+    # a pre-formatted traceback
+    return [
+        (match.group(1), int(match.group(2)), match.group(3))
+        for match in FRAME_LINE.finditer(''.join(tb.format()))
+    ]
+
+
+def is_application_frame(frame: Frame) -> bool:
+    filename = frame[0]
+    return not filename.startswith('<') and not os.path.abspath(filename).startswith(LIBRARY_PATHS)
+
+
+def exception_name(exc: BaseException) -> str:
+    if isinstance(exc, RestoredException):
+        return exc.exc_repr.split('(', 1)[0]
+    return type(exc).__qualname__
+
+
+def exception_detail(exc: BaseException) -> Tuple:
+    """What tells apart the failures the crawler raises itself, which all come from the same frames."""
+    if isinstance(exc, HttpStatusError):
+        return (exc.status_code,)
+    if isinstance(exc, BudgetExceededError):
+        return (exc.rule.action.__class__.__name__,)
+    if isinstance(exc, UnexpectedResponseError):
+        return (getattr(exc.fn, '__qualname__', repr(exc.fn)),)
+    return ()
+
+
+def fingerprint(exc: BaseException, tb, depth: int = 3) -> Tuple:
+    """Identify a bug by the exception type and the innermost `depth` application frames.
+
+    The message is left out, since it often names the failing page. Without
+    any application frames, as for crawler errors like `HttpStatusError`,
+    the innermost frames of all are used instead, along with the status
+    code, budget or handler that failed.
+    """
+    frames = frames_of(tb)
+    application_frames = [frame for frame in frames if is_application_frame(frame)]
+    return (exception_name(exc), exception_detail(exc), *(application_frames or frames)[-depth:])
+
+
+def exception_only(tb) -> str:
+    """The last line of a traceback, e.g. "ValueError: bad value"."""
+    return ''.join(tb.format_exception_only()).strip().rsplit("\n", 1)[-1]
+
+
+class ErrorGroup:
+    """Captured exceptions sharing a fingerprint, likely all the same bug.
+
+    Keeps the first exception and traceback in full, and up to
+    `sample_size` of the failing nodes with their exception messages.
+    """
+
+    def __init__(self, key: Tuple, node, exc: BaseException, tb, sample_size: int):
+        self.key = key
+        self.node = node
+        self.exc = exc
+        self.tb = tb
+        self.count = 0
+        self.sample: List[Tuple[object, str]] = []
+        self.sample_size = sample_size
+
+    @property
+    def location(self) -> Optional[str]:
+        frames = self.key[2:]
+        if not frames:
+            return None
+        (filename, lineno, name) = frames[-1]
+        return f"{filename}:{lineno} in {name}"
+
+    def add(self, node, tb):
+        self.count += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append((node, exception_only(tb)))
+
+    def merge(self, other: 'ErrorGroup'):
+        self.count += other.count
+        self.sample.extend(other.sample[:max(0, self.sample_size - len(self.sample))])
+
+    def portable(self) -> 'ErrorGroup':
+        """A copy that can be pickled, to send between processes."""
+        group = ErrorGroup(
+            self.key, self.node, portable_exception(self.exc), portable_traceback(self.tb), self.sample_size
+        )
+        group.count = self.count
+        group.sample = list(self.sample)
+        return group
+
+
+class ErrorAggregator:
+    """Groups captured exceptions by fingerprint, in order of first occurrence."""
+
+    def __init__(self, sample_size: int = 10):
+        self.sample_size = sample_size
+        self.groups: Dict[Tuple, ErrorGroup] = {}
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def __iter__(self) -> Iterator[ErrorGroup]:
+        return iter(list(self.groups.values()))
+
+    @property
+    def count(self) -> int:
+        return sum(group.count for group in self.groups.values())
+
+    def add(self, node, exc: BaseException, tb) -> ErrorGroup:
+        key = fingerprint(exc, tb)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = ErrorGroup(key, node, exc, tb, self.sample_size)
+        group.add(node, tb)
+        return group
+
+    def merge(self, group: ErrorGroup):
+        existing_group = self.groups.get(group.key)
+        if existing_group is None:
+            self.groups[group.key] = group
+        else:
+            existing_group.merge(group)
@@ -0,0 +1,148 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import defaultdict
+from enum import Enum
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+from .utils import underlined
+
+
+class Event(Enum):
+    """Events during a crawl, and the arguments listeners are called with."""
+
+    CRAWL_STARTED = 'crawl_started'  # ()
+    CRAWL_FINISHED = 'crawl_finished'  # ()
+    NODE_ENQUEUED = 'node_enqueued'  # (node)
+    RULES_STARTED = 'rules_started'  # (node)
+    RULES_FINISHED = 'rules_finished'  # (node)
+    HANDLERS_STARTED = 'handlers_started'  # (node)
+    HANDLERS_FINISHED = 'handlers_finished'  # (node)
+    REQUEST_STARTED = 'request_started'  # (node)
+    REQUEST_FINISHED = 'request_finished'  # (node, response), response is None if the request raised
+    EXTRACTION_STARTED = 'extraction_started'  # (node)
+    EXTRACTION_FINISHED = 'extraction_finished'  # (node, children)
+    GRAPH_UPDATE_STARTED = 'graph_update_started'  # (node)
+    GRAPH_UPDATE_FINISHED = 'graph_update_finished'  # (node)
+    ERROR_CAPTURED = 'error_captured'  # (node, exc, tb)
+    NODE_PROCESSED = 'node_processed'  # (node), whether or not it was requested
+
+
+class EventDispatcher:
+    """Calls the listeners registered for each event.
+
+    Callers check `active` before building arguments and calling `emit`,
+    so a crawl without listeners pays only for that attribute lookup.
+    """
+
+    def __init__(self):
+        self.listeners: Dict[Event, List[Callable]] = defaultdict(list)
+        self.active = False
+
+    def on(self, event: Event, fn: Callable):
+        self.listeners[event].append(fn)
+        self.active = True
+
+    def listen(self, listener):
+        """Register each method of `listener` named after an event."""
+        for event in Event:
+            fn = getattr(listener, event.value, None)
+            if fn is not None:
+                self.on(event, fn)
+
+    def emit(self, event: Event, *args):
+        for fn in self.listeners.get(event, ()):
+            fn(*args)
+
+
+PHASES = {
+    Event.RULES_STARTED: 'rules',
+    Event.RULES_FINISHED: 'rules',
+    Event.HANDLERS_STARTED: 'handlers',
+    Event.HANDLERS_FINISHED: 'handlers',
+    Event.REQUEST_STARTED: 'request',
+    Event.REQUEST_FINISHED: 'request',
+    Event.EXTRACTION_STARTED: 'parsing',
+    Event.EXTRACTION_FINISHED: 'parsing',
+    Event.GRAPH_UPDATE_STARTED: 'graph',
+    Event.GRAPH_UPDATE_FINISHED: 'graph',
+}
+
+
+class PhaseProfiler:
+    """Splits crawl time into rule evaluation, requests, parsing, graph updates and handlers.
+
+    Phases are timed per node, and summed over all nodes in progress at
+    once, so with concurrent crawls they can add up to more than the
+    crawl's wall clock time.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.crawl_seconds = 0.0
+        self._crawl_start = None
+        self._starts: Dict[Tuple[str, int], float] = {}
+        self._lock = Lock()
+
+    def register(self, events: EventDispatcher):
+        events.on(Event.CRAWL_STARTED, self.crawl_started)
+        events.on(Event.CRAWL_FINISHED, self.crawl_finished)
+        events.on(Event.ERROR_CAPTURED, self.error_captured)
+        for event, phase in PHASES.items():
+            if event.value.endswith('_started'):
+                events.on(event, self._starter(phase))
+            else:
+                events.on(event, self._finisher(phase))
+
+    def crawl_started(self):
+        self._crawl_start = perf_counter()
+
+    def crawl_finished(self):
+        self.crawl_seconds += perf_counter() - self._crawl_start
+
+    def error_captured(self, node, *args):
+        # phases a failure interrupted never finish
+        for phase in set(PHASES.values()):
+            self._starts.pop((phase, id(node)), None)
+
+    def _starter(self, phase: str):
+        def started(node, *args):
+            self._starts[(phase, id(node))] = perf_counter()
+        return started
+
+    def _finisher(self, phase: str):
+        def finished(node, *args):
+            start = self._starts.pop((phase, id(node)), None)
+            if start is not None:
+                elapsed = perf_counter() - start
+                with self._lock:
+                    self.totals[phase] += elapsed
+                    self.counts[phase] += 1
+        return finished
+
+    def merge(self, totals: Dict[str, float], counts: Dict[str, int]):
+        """Add in the phase times of another profiler, such as a shard process's."""
+        with self._lock:
+            for phase, seconds in totals.items():
+                self.totals[phase] += seconds
+            for phase, count in counts.items():
+                self.counts[phase] += count
+
+    def summary(self) -> List[str]:
+        lines = [underlined("Time by phase")]
+        total = self.crawl_seconds or sum(self.totals.values())
+        phases = sorted(set(PHASES.values()), key=lambda phase: -self.totals[phase])
+        for phase in phases:
+            seconds = self.totals[phase]
+            lines.append(
+                f"{phase:<10} {seconds:>9.3f} s {seconds / total if total else 0:>7.1%}"
+                f"  ({self.counts[phase]} time(s))"
+            )
+        other = max(0.0, self.crawl_seconds - sum(self.totals.values()))
+        lines.append(f"{'other':<10} {other:>9.3f} s {other / total if total else 0:>7.1%}")
+        lines.append(f"{'total':<10} {self.crawl_seconds:>9.3f} s")
+        return lines
@@ -5,6 +5,7 @@
 class HttpStatusError(Exception):
 
     def __init__(self, status_code: int):
+        super().__init__(status_code)
         self.status_code = status_code
 
 
@@ -20,3 +21,15 @@ class UnexpectedResponseError(Exception):
         self.node = node
         self.response = response
         self.fn = fn
+
+
+class BudgetExceededError(Exception):
+
+    def __init__(self, rule, measured: float):
+        super().__init__(rule, measured)
+        self.rule = rule
+        self.measured = measured
+
+    def __str__(self):
+        budget = self.rule.action
+        return f"{budget.__class__.__name__}: {self.measured:g} {budget.unit} exceeds {budget.limit:g} {budget.unit}"
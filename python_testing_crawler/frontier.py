@@ -0,0 +1,136 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import Counter, deque
+from itertools import count
+from threading import Lock
+from typing import Optional, Tuple
+import heapq
+
+from .graph import Node
+from .routes import RouteTemplates
+from .constants import GET
+
+
+SKIPPED_BY_DEPTH = 'depth'
+
+
+class Frontier:
+    """Nodes waiting to be processed, handed out in the strategy's order.
+
+    Frontiers are not thread-safe; see `SynchronizedFrontier`.
+    """
+
+    name: str
+
+    def __init__(self, route_templates: RouteTemplates):
+        self.route_templates = route_templates
+
+    def put(self, node: Node):
+        raise NotImplementedError()
+
+    def get(self) -> Node:
+        raise NotImplementedError()
+
+    def empty(self) -> bool:
+        return not len(self)
+
+    def __len__(self) -> int:
+        raise NotImplementedError()
+
+
+class BreadthFirstFrontier(Frontier):
+    """First in, first out; the crawler's default."""
+
+    name = 'bfs'
+
+    def __init__(self, route_templates: RouteTemplates):
+        super().__init__(route_templates)
+        self.nodes: deque = deque()
+
+    def put(self, node: Node):
+        self.nodes.append(node)
+
+    def get(self) -> Node:
+        return self.nodes.popleft()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
+class DepthFirstFrontier(BreadthFirstFrontier):
+    """Last in, first out."""
+
+    name = 'dfs'
+
+    def get(self) -> Node:
+        return self.nodes.pop()
+
+
+class BestFirstFrontier(Frontier):
+    """Prefers nodes of route templates seen least, then shallower, then GETs.
+
+    A node's priority is fixed when it is put, counting the nodes already
+    put with the same method and route template, so each template's first
+    node comes before any template's second. Ties are broken in put order.
+    """
+
+    name = 'best-first'
+
+    def __init__(self, route_templates: RouteTemplates):
+        super().__init__(route_templates)
+        self.heap: list = []
+        self.counter = count()
+        self.template_counts: Counter = Counter()
+
+    def priority(self, node: Node) -> Tuple[int, int, bool]:
+        key = (node.method, self.route_templates.template_of(node.path))
+        seen = self.template_counts[key]
+        self.template_counts[key] += 1
+        return (seen, node.depth, node.method != GET)
+
+    def put(self, node: Node):
+        heapq.heappush(self.heap, (self.priority(node), next(self.counter), node))
+
+    def get(self) -> Node:
+        return heapq.heappop(self.heap)[-1]
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class SynchronizedFrontier(Frontier):
+    """Wraps a frontier with a lock, for crawling with multiple threads."""
+
+    def __init__(self, frontier: Frontier):
+        self.frontier = frontier
+        self.name = frontier.name
+        self.lock = Lock()
+
+    def put(self, node: Node):
+        with self.lock:
+            self.frontier.put(node)
+
+    def get(self) -> Node:
+        with self.lock:
+            return self.frontier.get()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.frontier)
+
+
+FRONTIERS = {
+    frontier_class.name: frontier_class
+    for frontier_class in (BreadthFirstFrontier, DepthFirstFrontier, BestFirstFrontier)
+}
+
+
+def get_frontier(strategy: Optional[str], route_templates: RouteTemplates, synchronized: bool = False) -> Frontier:
+    if strategy is None:
+        strategy = BreadthFirstFrontier.name
+    if strategy not in FRONTIERS:
+        raise ValueError(f"Unknown frontier strategy: {strategy}")
+    frontier = FRONTIERS[strategy](route_templates)
+    return SynchronizedFrontier(frontier) if synchronized else frontier
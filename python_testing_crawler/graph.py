@@ -3,30 +3,69 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 import re
-from typing import Optional, Tuple, List, Set
-from dataclasses import dataclass, field
-from collections import defaultdict
+from array import array
+from bisect import bisect_left
+from sys import intern
+from typing import DefaultDict, Dict, FrozenSet, Iterable, Iterator, Mapping, Optional, Tuple, List, Set
+from collections import Counter, defaultdict
+from itertools import islice
+from threading import RLock
 
 from .constants import GET
 
 
-@dataclass
 class Node:
-    path: str
-    method: str = GET
-    params: dict = field(default_factory=dict)
-    source: Optional[str] = None
-    requested: bool = False
-    status_code: Optional[int] = None
-    ignore_form_fields: set = field(default_factory=set)
-
-    def __post_init__(self):
-        # force method to uppercase
-        self.method = self.method.upper()
+    """A link or form target encountered whilst crawling.
 
-    @property
-    def id(self) -> Tuple:
-        return (
+    The identity, `id`, is computed once at construction from the method,
+    path and params (less any `ignore_form_fields`) and stays fixed if the
+    params are later changed. Strings are interned and attributes slotted,
+    since large crawls hold very many nodes.
+    """
+
+    __slots__ = (
+        'path', 'method', 'params', 'source', '_requested', 'status_code',
+        'ignore_form_fields', 'depth', 'skipped', 'wall_time', 'cpu_time', 'response_size',
+        'query_count', 'id', '_graph',
+    )
+
+    FIELDS = (
+        'path', 'method', 'params', 'source', 'requested', 'status_code', 'ignore_form_fields', 'depth',
+        'skipped', 'wall_time', 'cpu_time', 'response_size', 'query_count',
+    )
+
+    def __init__(
+        self,
+        path: str,
+        method: str = GET,
+        params: Optional[dict] = None,
+        source: Optional[str] = None,
+        requested: bool = False,
+        status_code: Optional[int] = None,
+        ignore_form_fields: Optional[Iterable[str]] = None,
+        depth: int = 0,
+        skipped: Optional[str] = None,
+        wall_time: Optional[float] = None,
+        cpu_time: Optional[float] = None,
+        response_size: Optional[int] = None,
+        query_count: Optional[int] = None,
+    ):
+        self.path = intern(path) if path is not None else None
+        self.method = intern(method.upper())
+        self.params = {} if params is None else params
+        self.source = intern(source) if source is not None else None
+        self._requested = requested
+        self.status_code = status_code
+        self.ignore_form_fields = frozenset(ignore_form_fields) if ignore_form_fields else NO_FIELDS
+        self.depth = depth  # fewest links and forms followed from an initial path, as found so far
+        self.skipped = skipped  # why the node was deliberately not requested, if it was not
+        # seconds taken by the client call, and bytes in the response body
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.response_size = response_size
+        self.query_count = query_count  # database queries made, if counted for a MaxQueries budget
+        self._graph: Optional[DirectedGraph] = None
+        self.id: Tuple = (
             self.method,
             self.path,
             *(
@@ -35,39 +74,373 @@ class Node:
             )
         )
 
+    @property
+    def requested(self) -> bool:
+        return self._requested
+
+    @requested.setter
+    def requested(self, value: bool):
+        changed = value != self._requested
+        self._requested = value
+        # keep the owning graph's visited index up to date
+        if changed and self._graph is not None:
+            self._graph._requested_changed(self)
+
+    def _astuple(self):
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{self.__class__.__name__}({fields})"
+
+    def __getstate__(self):
+        # never drag the owning graph along
+        return {name: getattr(self, name) for name in self.__slots__ if name != '_graph'}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self._graph = None
+
+
+NO_FIELDS: FrozenSet[str] = frozenset()
+
 
 class DirectedGraph:
+    """Nodes by id, with secondary indexes, and the edges between them.
+
+    `adj` maps each node id to a list of child nodes, appended to on every
+    encounter, and is read-only outside the graph. Without `track_edges`, no edges are kept at all. Each node
+    also has a dense integer index, in order of first addition.
+    """
 
-    def __init__(self):
-        self.map = {}
-        self.adj = defaultdict(lambda: [])
+    def __init__(self, track_edges: bool = True):
+        self.map: Dict[Tuple, Node] = {}
+        self.track_edges = track_edges
+        self._children: DefaultDict[Tuple, List[Node]] = defaultdict(list)
+        self.adj: Mapping[Tuple, List[Node]] = self._children
+        self.lock = RLock()
+
+        # secondary indexes, maintained by add_node
+        self._positions: Dict[Tuple, int] = {}
+        self._nodes_by_position: List[Node] = []
+        self._nodes_by_path: Dict[Optional[str], List[Node]] = defaultdict(list)
+        self._nodes_by_source: Dict[Optional[str], List[Node]] = defaultdict(list)
+        # distinct paths, for prefix lookups; sorted on the first lookup after a change
+        self._sorted_paths: Optional[List[str]] = None
+        self._requested_counts: Counter = Counter()
+        self._encountered_paths: Set[str] = set()
+        self._visited_paths: Set[str] = set()
 
     @property
-    def encountered_paths(self) -> Set[str]:
-        return set(node.path for node in self.map.values())
+    def encountered_paths(self) -> FrozenSet[str]:
+        """Paths of all nodes, as a snapshot."""
+        with self.lock:
+            return frozenset(self._encountered_paths)
 
     @property
-    def visited_paths(self) -> Set[str]:
-        return set(node.path for node in self.map.values() if node.requested)
+    def visited_paths(self) -> FrozenSet[str]:
+        """Paths of requested nodes, as a snapshot."""
+        with self.lock:
+            return frozenset(self._visited_paths)
 
     def add_node(self, node: Node):
-        self.map[node.id] = node
-        self.adj[node.id] = []
+        with self.lock:
+            existing_node = self.map.get(node.id)
+            if existing_node is not None:
+                self._unindex(existing_node)
+            self.map[node.id] = node
+            self._clear_edges_from(node)
+            self._index(node)
+
+    def add_node_if_absent(self, node: Node) -> Tuple[Node, bool]:
+        """Add the node unless one with its id exists; return (graph node, added)."""
+        with self.lock:
+            existing_node = self.map.get(node.id)
+            if existing_node is not None:
+                return existing_node, False
+            self.add_node(node)
+            return node, True
+
+    def _clear_edges_from(self, node: Node):
+        if self.track_edges:
+            self._children[node.id] = []
 
     def add_edge(self, from_node: Node, to_node: Node):
-        self.adj[from_node.id].append(to_node)
+        if not self.track_edges:
+            return
+        with self.lock:
+            self._children[from_node.id].append(to_node)
+
+    def edges(self) -> Iterator[Tuple[Node, Node]]:
+        """Every edge, as (from node, to node), in order of the from nodes' addition."""
+        for from_node in self._nodes_by_position:
+            for to_node in self.adj.get(from_node.id, ()):
+                yield (from_node, to_node)
+
+    def freeze(self):
+        """Called once crawling is done; compact graphs then pack their edges."""
 
-    def get_node_by_id(self, id: tuple) -> Node:
+    def to_networkx(self):
+        """Copy the graph into a `networkx.DiGraph`, keyed by node id, with each `Node` as its "node" attribute."""
+        try:
+            import networkx
+        except ImportError as e:
+            raise ValueError("to_networkx requires networkx to be installed") from e
+        digraph = networkx.DiGraph()
+        with self.lock:
+            for node in self._nodes_by_position:
+                digraph.add_node(node.id, node=node)
+            digraph.add_edges_from((from_node.id, to_node.id) for (from_node, to_node) in self.edges())
+        return digraph
+
+    def index_of(self, id: tuple) -> int:
+        """The dense integer index of the node with this id."""
+        return self._positions[id]
+
+    def node_at(self, index: int) -> Node:
+        return self._nodes_by_position[index]
+
+    def get_node_by_id(self, id: tuple) -> Optional[Node]:
         return self.map.get(id)
 
     def get_nodes_by_path(self, path: str) -> List[Node]:
-        return [node for node in self.map.values() if node.path == path]
+        return list(self._nodes_by_path.get(path, ()))
 
     def get_nodes_by_path_pattern(self, pattern: str) -> List[Node]:
-        return [node for node in self.map.values() if re.match(pattern, node.path or "")]
+        regex = re.compile(pattern)
+        prefix = literal_prefix(pattern)
+        sorted_paths = self._paths_in_order()
+        start = bisect_left(sorted_paths, prefix)
+        nodes: List[Node] = []
+        for path in islice(sorted_paths, start, None):
+            if not path.startswith(prefix):
+                break
+            if regex.match(path):
+                nodes.extend(self._nodes_by_path.get(path, ()))
+        if None in self._nodes_by_path and regex.match(""):
+            nodes.extend(self._nodes_by_path[None])
+        return self._in_insertion_order(nodes)
+
+    def _paths_in_order(self) -> List[str]:
+        with self.lock:
+            if self._sorted_paths is None:
+                self._sorted_paths = sorted(path for path in self._nodes_by_path if path is not None)
+            return self._sorted_paths
 
     def get_nodes_by_source(self, source: str) -> List[Node]:
-        return [node for node in self.map.values() if node.source == source]
+        return list(self._nodes_by_source.get(source, ()))
 
     def get_nodes_by_source_pattern(self, source_pattern: str) -> List[Node]:
-        return [node for node in self.map.values() if re.match(source_pattern, node.source or "")]
+        regex = re.compile(source_pattern)
+        nodes = []
+        for source, source_nodes in self._nodes_by_source.items():
+            if regex.match(source or ""):
+                nodes.extend(source_nodes)
+        return self._in_insertion_order(nodes)
+
+    def _in_insertion_order(self, nodes: List[Node]) -> List[Node]:
+        return sorted(nodes, key=lambda node: self._positions[node.id])
+
+    def _index(self, node: Node):
+        node._graph = self
+        # a re-added node keeps its position, and so any edges to it
+        position = self._positions.get(node.id)
+        if position is None:
+            position = self._positions[node.id] = len(self._nodes_by_position)
+            self._nodes_by_position.append(node)
+        else:
+            self._nodes_by_position[position] = node
+        if node.path not in self._nodes_by_path:
+            self._sorted_paths = None
+        self._nodes_by_path[node.path].append(node)
+        self._nodes_by_source[node.source].append(node)
+        self._encountered_paths.add(node.path)
+        if node.requested:
+            self._requested_changed(node)
+
+    def _unindex(self, node: Node):
+        node._graph = None
+        path_nodes = self._nodes_by_path[node.path]
+        remove_identical(path_nodes, node)
+        if not path_nodes:
+            del self._nodes_by_path[node.path]
+            self._sorted_paths = None
+            self._encountered_paths.discard(node.path)
+        source_nodes = self._nodes_by_source[node.source]
+        remove_identical(source_nodes, node)
+        if not source_nodes:
+            del self._nodes_by_source[node.source]
+        if node.requested:
+            self._decrement_requested(node.path)
+
+    def _requested_changed(self, node: Node):
+        with self.lock:
+            if node.requested:
+                self._requested_counts[node.path] += 1
+                self._visited_paths.add(node.path)
+            else:
+                self._decrement_requested(node.path)
+
+    def _decrement_requested(self, path: str):
+        self._requested_counts[path] -= 1
+        if self._requested_counts[path] <= 0:
+            del self._requested_counts[path]
+            self._visited_paths.discard(path)
+
+
+class CompactDirectedGraph(DirectedGraph):
+    """A graph storing each edge once, as integer node indexes.
+
+    Whilst crawling, each node's children are an `array` of indexes. Once
+    frozen, the edges are packed into compressed sparse rows -- one array of
+    every child index, and one of where each node's children start -- which
+    are unpacked again if edges are later added. `adj` is a read-only view
+    giving lists of child nodes, so all the queries of `DirectedGraph` work.
+    """
+
+    def __init__(self, track_edges: bool = True):
+        super().__init__(track_edges=track_edges)
+        self.adj = CompactAdjacency(self)
+        self._edges: Dict[int, array] = {}
+        # the children of a node are added together, so only the targets of
+        # the node currently being added to are kept in a set
+        self._adding_from: Optional[int] = None
+        self._adding_targets: Set[int] = set()
+        # compressed sparse rows, once frozen
+        self._offsets: Optional[array] = None
+        self._targets: Optional[array] = None
+
+    @property
+    def frozen(self) -> bool:
+        return self._offsets is not None
+
+    def _clear_edges_from(self, node: Node):
+        position = self._positions.get(node.id)
+        if position is not None and self._child_indexes(position):
+            self._thaw()
+            self._edges.pop(position, None)
+            if position == self._adding_from:
+                self._adding_from = None
+
+    def add_edge(self, from_node: Node, to_node: Node):
+        if not self.track_edges:
+            return
+        with self.lock:
+            self._thaw()
+            from_position = self._positions[from_node.id]
+            to_position = self._positions[to_node.id]
+            targets = self._edges.get(from_position)
+            if targets is None:
+                targets = self._edges[from_position] = array('i')
+            if from_position != self._adding_from:
+                self._adding_from = from_position
+                self._adding_targets = set(targets)
+            if to_position not in self._adding_targets:
+                self._adding_targets.add(to_position)
+                targets.append(to_position)
+
+    def edges(self) -> Iterator[Tuple[Node, Node]]:
+        nodes = self._nodes_by_position
+        for from_position in self._positions_with_edges():
+            for to_position in self._child_indexes(from_position):
+                yield (nodes[from_position], nodes[to_position])
+
+    def freeze(self):
+        with self.lock:
+            if self.frozen:
+                return
+            offsets = array('i', [0])
+            targets = array('i')
+            for position in range(len(self._nodes_by_position)):
+                targets.extend(self._edges.get(position, ()))
+                offsets.append(len(targets))
+            self._offsets, self._targets = offsets, targets
+            self._edges = {}
+            self._adding_from = None
+            self._adding_targets = set()
+
+    def _thaw(self):
+        offsets, targets = self._offsets, self._targets
+        if offsets is None or targets is None:
+            return
+        self._edges = {
+            position: targets[offsets[position]:offsets[position + 1]]
+            for position in range(len(offsets) - 1)
+            if offsets[position + 1] > offsets[position]
+        }
+        self._offsets = self._targets = None
+
+    def _child_indexes(self, position: int):
+        offsets, targets = self._offsets, self._targets
+        if offsets is not None and targets is not None:
+            if position >= len(offsets) - 1:  # added since freezing
+                return ()
+            return targets[offsets[position]:offsets[position + 1]]
+        return self._edges.get(position, ())
+
+    def _positions_with_edges(self) -> List[int]:
+        offsets = self._offsets
+        if offsets is not None:
+            return [position for position in range(len(offsets) - 1) if offsets[position + 1] > offsets[position]]
+        return sorted(self._edges)
+
+
+class CompactAdjacency(Mapping):
+    """A read-only view of a compact graph's edges, as lists of child nodes by node id."""
+
+    def __init__(self, graph: CompactDirectedGraph):
+        self.graph = graph
+
+    def __getitem__(self, node_id: Tuple) -> List[Node]:
+        # like a defaultdict of lists, an unknown node has no children
+        position = self.graph._positions.get(node_id)
+        if position is None:
+            return []
+        nodes = self.graph._nodes_by_position
+        return [nodes[target] for target in self.graph._child_indexes(position)]
+
+    def __iter__(self) -> Iterator[Tuple]:
+        nodes = self.graph._nodes_by_position
+        return iter([nodes[position].id for position in self.graph._positions_with_edges()])
+
+    def __len__(self) -> int:
+        return len(self.graph._positions_with_edges())
+
+
+def remove_identical(nodes: List[Node], node: Node):
+    # equal nodes may be distinct objects, so compare identity
+    del nodes[next(index for (index, other) in enumerate(nodes) if other is node)]
+
+
+REGEX_SPECIAL_CHARS = set(".^$*+?{}[]\\|()")
+REGEX_QUANTIFIERS = set("*+?{")
+
+
+def literal_prefix(pattern: str) -> str:
+    """Return a literal prefix that any string matching a regex must start with."""
+    if '|' in pattern:
+        return ""
+    prefix = []
+    index = 1 if pattern.startswith('^') else 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '\\' and index + 1 < len(pattern) and not pattern[index + 1].isalnum():
+            char = pattern[index + 1]
+            index += 2
+        elif char in REGEX_SPECIAL_CHARS:
+            break
+        else:
+            index += 1
+        # a quantified character might not appear at all
+        if index < len(pattern) and pattern[index] in REGEX_QUANTIFIERS:
+            break
+        prefix.append(char)
+    return "".join(prefix)
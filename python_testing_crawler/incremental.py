@@ -0,0 +1,140 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import json
+import sqlite3
+
+from .cache import NodeTemplate
+from .checkpoint import node_key
+from .graph import Node
+from .parsers import BaseParser
+from .version import __version__
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash BLOB NOT NULL,
+    children TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class CrawlCacheEntry(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body_hash: bytes
+    children: List[NodeTemplate]
+
+
+def dump_templates(templates: List[NodeTemplate]) -> str:
+    return json.dumps([
+        (source, method, path, params, sorted(ignore_form_fields))
+        for (source, method, path, params, ignore_form_fields) in templates
+    ])
+
+
+def extraction_settings(
+    path_attrs: Iterable[str],
+    ignore_css_selectors: Iterable[str],
+    ignore_form_fields: Iterable[str],
+    parser: BaseParser,
+) -> str:
+    """Everything the extracted nodes depend on, besides the response body."""
+    parser_cls = type(parser)
+    return json.dumps({
+        'version': __version__,
+        'parser': f"{parser_cls.__module__}.{parser_cls.__qualname__}",
+        'path_attrs': list(path_attrs),
+        'ignore_css_selectors': sorted(ignore_css_selectors),
+        'ignore_form_fields': sorted(ignore_form_fields),
+    })
+
+
+def load_templates(data: str) -> List[NodeTemplate]:
+    return [
+        (source, method, path, params, frozenset(ignore_form_fields))
+        for (source, method, path, params, ignore_form_fields) in json.loads(data)
+    ]
+
+
+class CrawlCache:
+    """Remembers what was extracted from each page between crawl runs.
+
+    Entries are keyed by node identity and hold the validators (ETag and
+    Last-Modified) and body hash of the last response, along with the nodes
+    extracted from it. Entries are read at the start of a crawl and changes
+    are written back by `save`. Entries written with different extraction
+    `settings` (see `extraction_settings`) are discarded.
+    """
+
+    def __init__(self, path: str, settings: str = ""):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        stored = self.connection.execute("SELECT value FROM meta WHERE name = 'settings'").fetchone()
+        if stored is None or stored[0] != settings:
+            with self.connection:
+                self.connection.execute("DELETE FROM entries")
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('settings', ?)", (settings,))
+        self.entries: Dict[str, CrawlCacheEntry] = {
+            key: CrawlCacheEntry(etag, last_modified, body_hash, load_templates(children))
+            for (key, etag, last_modified, body_hash, children)
+            in self.connection.execute(
+                "SELECT key, etag, last_modified, body_hash, children FROM entries"
+            )
+        }
+        self.changed: Dict[str, CrawlCacheEntry] = {}
+        self.lock = Lock()
+
+        # statistics
+        self.not_modified = 0
+        self.unchanged = 0
+        self.modified = 0
+
+    def get(self, node: Node) -> Optional[CrawlCacheEntry]:
+        return self.entries.get(node_key(node))
+
+    def put(self, node: Node, entry: CrawlCacheEntry):
+        key = node_key(node)
+        with self.lock:
+            self.entries[key] = entry
+            self.changed[key] = entry
+
+    def record(self, outcome: str):
+        """Count a page as 'not_modified', 'unchanged' or 'modified'."""
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def conditional_headers(self, node: Node) -> Dict[str, str]:
+        entry = self.get(node)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def save(self):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (
+                    (key, entry.etag, entry.last_modified, entry.body_hash, dump_templates(entry.children))
+                    for (key, entry) in self.changed.items()
+                )
+            )
+            self.changed.clear()
+
+    def close(self):
+        self.save()
+        self.connection.close()
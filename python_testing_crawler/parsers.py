@@ -0,0 +1,258 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional
+from urllib.parse import urldefrag
+
+from bs4 import BeautifulSoup
+import soupsieve
+
+from .graph import Node
+from .constants import FORM, GET, INPUT
+
+
+class BaseParser:
+    """Extracts onward link and form nodes from an HTML document."""
+
+    name: Optional[str] = None
+    supports_css_selectors = True
+
+    def extract_nodes(
+        self,
+        content,
+        path: Optional[str],
+        attr_names: Iterable[str],
+        *,
+        ignore_selector: Optional[soupsieve.SoupSieve] = None,
+        ignore_form_fields: Iterable[str] = None,
+        links: bool = True,
+        forms: bool = True,
+    ) -> Iterator[Node]:
+        raise NotImplementedError
+
+
+def make_link_nodes(element_name: str, attrs: dict, attr_names: Iterable[str]) -> Iterator[Node]:
+    for attr_name in attr_names:
+        attr = attrs.get(attr_name)
+        if attr:
+            defragged_attr = urldefrag(attr)[0]
+            yield Node(source=element_name, path=defragged_attr)
+
+
+def make_form_node(attrs: dict, params: dict, path: str, ignore_form_fields) -> Node:
+    return Node(
+        source=FORM,
+        method=attrs.get('method', GET),
+        path=attrs.get('action', path),
+        params=params,
+        ignore_form_fields=ignore_form_fields
+    )
+
+
+class SoupParser(BaseParser):
+    """Builds a BeautifulSoup tree using the pure-Python "html.parser"."""
+
+    name = 'html.parser'
+    features = 'html.parser'
+
+    def parse(self, content):
+        return BeautifulSoup(content, self.features)
+
+    def extract_nodes(
+        self,
+        content,
+        path,
+        attr_names,
+        *,
+        ignore_selector=None,
+        ignore_form_fields=None,
+        links=True,
+        forms=True,
+    ):
+        soup = self.parse(content)
+
+        # prune ignored elements, along with everything inside them
+        if ignore_selector is not None:
+            for ignored_element in ignore_selector.select(soup):
+                ignored_element.extract()
+
+        for element in soup.find_all():
+            if links:
+                yield from make_link_nodes(element.name, element.attrs, attr_names)
+            if forms and element.name == FORM:
+                params = {
+                    input_element['name']: input_element.get('value', '')
+                    for input_element in element.find_all(INPUT, {'name': True})
+                }
+                yield make_form_node(element.attrs, params, path, ignore_form_fields)
+
+
+class LxmlParser(SoupParser):
+    """Builds a BeautifulSoup tree using the C-accelerated lxml parser.
+
+    Recovers from malformed HTML differently to "html.parser": the first of
+    duplicate attributes wins, the content of a `<textarea>` is text rather
+    than markup, and a `<form>` inside another closes the outer one.
+    """
+
+    name = 'lxml'
+    features = 'lxml'
+
+    def __init__(self):
+        try:
+            import lxml  # noqa: F401
+        except ImportError as e:
+            raise ValueError("The 'lxml' parser requires lxml to be installed") from e
+
+
+# elements without content, which html.parser reports no end tag for
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr',
+})
+
+
+class _PendingForm:
+
+    def __init__(self, attrs: dict):
+        self.attrs = attrs
+        self.params: dict = {}
+        self.node: Optional[Node] = None
+
+
+class _StreamingCollector(HTMLParser):
+
+    def __init__(self, path, attr_names, ignore_form_fields, links, forms):
+        super().__init__(convert_charrefs=True)
+        self.path = path
+        self.attr_names = tuple(attr_names)
+        self.ignore_form_fields = ignore_form_fields
+        self.links = links
+        self.forms = forms
+        self.output: List = []
+        # tags of the elements not yet closed, so forms close where a tree builder would
+        self.open_elements: List[str] = []
+        self.open_forms: List[_PendingForm] = []
+
+    def handle_starttag(self, tag, attrs):
+        # valueless attributes are reported as None
+        attrs = {name: '' if value is None else value for (name, value) in attrs}
+        if self.links:
+            self.output.extend(make_link_nodes(tag, attrs, self.attr_names))
+        if not self.forms:
+            return
+        if tag == INPUT and 'name' in attrs:
+            for pending_form in self.open_forms:
+                pending_form.params[attrs['name']] = attrs.get('value', '')
+        if tag in VOID_ELEMENTS:
+            return
+        self.open_elements.append(tag)
+        if tag == FORM:
+            pending_form = _PendingForm(attrs)
+            self.open_forms.append(pending_form)
+            self.output.append(pending_form)
+
+    def handle_endtag(self, tag):
+        # closes the most recent element with this tag, and any still open inside it
+        if not self.forms or tag not in self.open_elements:
+            return
+        while True:
+            open_tag = self.open_elements.pop()
+            if open_tag == FORM:
+                self.finish_form(self.open_forms.pop())
+            if open_tag == tag:
+                break
+
+    def finish_form(self, pending_form):
+        pending_form.node = make_form_node(
+            pending_form.attrs, pending_form.params, self.path, self.ignore_form_fields
+        )
+
+    def finish(self):
+        self.close()
+        while self.open_forms:
+            self.finish_form(self.open_forms.pop())
+
+    def drain(self) -> Iterator[Node]:
+        # forms are yielded in place once their closing tag has been seen
+        ready = 0
+        for item in self.output:
+            if isinstance(item, _PendingForm):
+                if item.node is None:
+                    break
+                yield item.node
+            else:
+                yield item
+            ready += 1
+        del self.output[:ready]
+
+
+class StreamingParser(BaseParser):
+    """Extracts nodes from html.parser events without building a tree.
+
+    Has no dependencies beyond the standard library, but cannot evaluate
+    CSS selectors. Recovers from malformed HTML as the "html.parser" tree
+    builder does: an input belongs to every form it is inside, a form is
+    closed along with any element enclosing it, the last of duplicate
+    attributes wins, and the content of a `<textarea>` is parsed as markup.
+    """
+
+    name = 'stream'
+    supports_css_selectors = False
+    chunk_size = 64 * 1024
+
+    def extract_nodes(
+        self,
+        content,
+        path,
+        attr_names,
+        *,
+        ignore_selector=None,
+        ignore_form_fields=None,
+        links=True,
+        forms=True,
+    ):
+        if ignore_selector is not None:
+            raise ValueError(f"The '{self.name}' parser does not support CSS selectors")
+
+        text = decode_content(content)
+        collector = _StreamingCollector(path, attr_names, ignore_form_fields, links, forms)
+        for start in range(0, len(text), self.chunk_size):
+            collector.feed(text[start:start + self.chunk_size])
+            yield from collector.drain()
+        collector.finish()
+        yield from collector.drain()
+
+
+def compile_css_selectors(selectors: Iterable[str]) -> Optional[soupsieve.SoupSieve]:
+    """Compile CSS selectors into a single selector list, or None if empty."""
+    selectors = list(selectors or [])
+    if not selectors:
+        return None
+    return soupsieve.compile(", ".join(selectors))
+
+
+def decode_content(content) -> str:
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('windows-1252', errors='replace')
+
+
+PARSERS = {
+    parser_class.name: parser_class
+    for parser_class in (SoupParser, LxmlParser, StreamingParser)
+}
+
+
+def get_parser(parser=None) -> BaseParser:
+    if parser is None:
+        return SoupParser()
+    if isinstance(parser, BaseParser):
+        return parser
+    if parser in PARSERS:
+        return PARSERS[parser]()
+    raise ValueError(f"Unknown parser: {parser}")
@@ -0,0 +1,140 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import Counter
+from time import monotonic
+from typing import Dict, Iterator, List, Optional, TextIO
+import json
+
+from .graph import Node
+from .routes import RouteTemplates
+from .timings import performance_summary
+from .utils import underlined
+
+
+def node_result(node: Node, exc: Optional[BaseException] = None) -> dict:
+    return {
+        'method': node.method,
+        'path': node.path,
+        'params': node.params,
+        'source': node.source,
+        'depth': node.depth,
+        'status_code': node.status_code,
+        'wall_time': node.wall_time,
+        'cpu_time': node.cpu_time,
+        'response_size': node.response_size,
+        'query_count': node.query_count,
+        'error': type(exc).__name__ if exc is not None else None,
+        'message': str(exc) if exc is not None else None,
+    }
+
+
+def result_node(result: dict) -> Node:
+    return Node(
+        path=result['path'],
+        method=result['method'],
+        params=result['params'],
+        source=result['source'],
+        requested=True,
+        status_code=result['status_code'],
+        depth=result['depth'],
+        wall_time=result['wall_time'],
+        cpu_time=result['cpu_time'],
+        response_size=result['response_size'],
+        query_count=result['query_count'],
+    )
+
+
+class ResultsWriter:
+    """Writes a JSON line per processed node as the crawl goes.
+
+    Registered as a listener on the crawl's events. Lines are buffered and
+    flushed at most every `flush_interval` seconds, and when closed, so the
+    file can be followed whilst crawling.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.file: Optional[TextIO] = None
+        self.count = 0
+        self._errors: Dict[tuple, BaseException] = {}
+        self._flushed_at = 0.0
+
+    def open(self, append: bool = False):
+        self.file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+        self._flushed_at = monotonic()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def error_captured(self, node, exc, tb):
+        # written along with the node once it is processed
+        self._errors[node.id] = exc
+
+    def node_processed(self, node):
+        exc = self._errors.pop(node.id, None)
+        if node.requested or exc is not None:
+            self.write(node, exc)
+
+    def write(self, node: Node, exc: Optional[BaseException] = None):
+        self.write_result(node_result(node, exc))
+
+    def write_result(self, result: dict):
+        if self.file is None:
+            raise RuntimeError("Results file is not open")
+        self.file.write(json.dumps(result, default=repr) + "\n")
+        self.count += 1
+        now = monotonic()
+        if now - self._flushed_at >= self.flush_interval:
+            self.file.flush()
+            self._flushed_at = now
+
+
+def read_results(path: str) -> Iterator[dict]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def results_summary(path: str, route_templates: Optional[RouteTemplates] = None, size: int = 10) -> List[str]:
+    """Rebuild the crawl summary from a results file, reading it line by line."""
+    statuses: Counter = Counter()
+    errors: Counter = Counter()
+    failed: List[str] = []
+    count = 0
+
+    def nodes():
+        nonlocal count
+        for result in read_results(path):
+            count += 1
+            statuses[result['status_code']] += 1
+            if result['error'] is not None:
+                errors[result['error']] += 1
+                if len(failed) < size:
+                    failed.append(f"{result['method']} {result['path']} => {result['error']}: {result['message']}")
+            yield result_node(result)
+
+    # read in full even when not listing any nodes, for the counts
+    performance_lines = performance_summary(nodes(), route_templates or RouteTemplates(), size)
+
+    lines = [underlined("Results of Testing Crawler"), ""]
+    lines.append(f"Processed {count} endpoints.")
+    lines.append("Status codes: " + ", ".join(
+        f"{status if status is not None else 'none'} x{number}"
+        for (status, number) in sorted(statuses.items(), key=lambda item: (item[0] is None, item[0] or 0))
+    ))
+    lines.append("")
+    if size and performance_lines:
+        lines += performance_lines + [""]
+    if errors:
+        lines.append(underlined(f"Summary of {sum(errors.values())} error(s)"))
+        for (error, number) in errors.most_common():
+            lines.append(f"{number:>6}  {error}")
+        lines.append("")
+        lines += failed
+    return lines
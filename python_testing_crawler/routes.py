@@ -0,0 +1,101 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import Counter
+from functools import lru_cache
+from threading import Lock
+from typing import Iterable, List, Pattern, Tuple
+from urllib.parse import urlsplit, urlunsplit
+import re
+
+from .graph import Node
+
+
+SKIPPED_BY_SAMPLING = 'sampling'
+
+# variable path segments and query values, in the order they are tried
+PLACEHOLDERS: List[Tuple[str, Pattern]] = [
+    ('{int}', re.compile(r'^-?\d+$')),
+    ('{uuid}', re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)),
+    ('{hex}', re.compile(r'^[0-9a-f]{16,}$', re.I)),
+    # hyphenated words including a digit, e.g. "post-42" or "2020-01-31"
+    ('{slug}', re.compile(r'^(?=[^/]*\d)[a-z0-9]+(?:-[a-z0-9]+)+$', re.I)),
+]
+
+
+def infer_segment(segment: str) -> str:
+    for placeholder, regex in PLACEHOLDERS:
+        if regex.match(segment):
+            return placeholder
+    return segment
+
+
+def infer_query(query: str) -> str:
+    params = []
+    for param in query.split('&'):
+        if not param:
+            continue
+        name, sep, value = param.partition('=')
+        params.append(f"{name}{sep}{infer_segment(value) if value else ''}")
+    return '&'.join(sorted(params))
+
+
+def compile_template(template: str) -> Pattern:
+    """Compile e.g. "/posts/{id}/edit", where a placeholder matches one segment."""
+    parts = re.split(r'({[^}/]*})', template)
+    return re.compile(''.join(
+        '[^/]+' if index % 2 else re.escape(part)
+        for (index, part) in enumerate(parts)
+    ) + '$')
+
+
+class RouteTemplates:
+    """Maps paths to the route template they are an instance of.
+
+    Paths matching one of the explicit `templates` (tried in order) take
+    that template. Otherwise the template is inferred by replacing numeric,
+    UUID, long hexadecimal and slug-with-digits path segments and query
+    values with placeholders, so "/posts/42?page=3" becomes
+    "/posts/{int}?page={int}". Results are memoized per path.
+    """
+
+    def __init__(self, templates: Iterable[str] = (), cache_size: int = 4096):
+        self.templates = [(template, compile_template(template)) for template in templates]
+        self._template_of = lru_cache(maxsize=cache_size)(self._compute_template)
+
+    def template_of(self, path: str) -> str:
+        return self._template_of(path)
+
+    def _compute_template(self, path: str) -> str:
+        url = urlsplit(path)
+        query = infer_query(url.query)
+        for template, regex in self.templates:
+            if regex.match(url.path):
+                return urlunsplit((url.scheme, url.netloc, template, query, ''))
+        url_path = '/'.join(infer_segment(segment) for segment in url.path.split('/'))
+        return urlunsplit((url.scheme, url.netloc, url_path, query, ''))
+
+
+class RouteSampler:
+    """Admits the first `samples_per_template` nodes of each (method, template).
+
+    Nodes are admitted in the order they are offered, which is the crawl
+    order, so a sequential crawl always samples the same nodes.
+    """
+
+    def __init__(self, samples_per_template: int, route_templates: RouteTemplates):
+        if samples_per_template < 1:
+            raise ValueError("Need at least one sample per template")
+        self.samples_per_template = samples_per_template
+        self.route_templates = route_templates
+        self.counts: Counter = Counter()
+        self.lock = Lock()
+
+    def sample(self, node: Node) -> bool:
+        key = (node.method, self.route_templates.template_of(node.path))
+        with self.lock:
+            if self.counts[key] >= self.samples_per_template:
+                return False
+            self.counts[key] += 1
+            return True
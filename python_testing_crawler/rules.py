@@ -3,7 +3,9 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import Dict, List, Iterable, Optional, Tuple, Type
+from collections import defaultdict
+from functools import lru_cache
 import re
 
 
@@ -26,6 +28,60 @@ class Allow(Action):
     status_codes: List[int] = field(default_factory=list)
 
 
+class Budget(Action):
+    """An upper limit on something measured about a response."""
+
+    unit: str = ''
+
+    @property
+    def limit(self) -> float:
+        raise NotImplementedError()
+
+    def measure(self, node) -> Optional[float]:
+        raise NotImplementedError()
+
+
+@dataclass
+class MaxLatency(Budget):
+    ms: float
+    unit = 'ms'
+
+    @property
+    def limit(self) -> float:
+        return self.ms
+
+    def measure(self, node) -> Optional[float]:
+        return node.wall_time * 1000 if node.wall_time is not None else None
+
+
+@dataclass
+class MaxResponseBytes(Budget):
+    max_bytes: int
+    unit = 'bytes'
+
+    @property
+    def limit(self) -> float:
+        return self.max_bytes
+
+    def measure(self, node) -> Optional[float]:
+        return node.response_size
+
+
+@dataclass
+class MaxQueries(Budget):
+    """Needs a client that can count database queries, i.e. Django's."""
+
+    max_queries: int
+    unit = 'queries'
+
+    @property
+    def limit(self) -> float:
+        return self.max_queries
+
+    def measure(self, node) -> Optional[float]:
+        return node.query_count
+
+
 @dataclass
 class Rule:
     source_pattern: str
@@ -33,9 +89,120 @@ class Rule:
     method: str
     action: Action
 
+    def __post_init__(self):
+        self._source_regex = re.compile(self.source_pattern)
+        self._path_regex = re.compile(self.path_pattern)
+
     def match(self, node):
-        return all((
-            (node.source is None or re.match(self.source_pattern, node.source)),
-            self.method == node.method,
-            re.match(self.path_pattern, node.path)
-        ))
+        return self.matches(node.source, node.method, node.path)
+
+    def matches(self, source: Optional[str], method: str, path: str) -> bool:
+        return bool(
+            (source is None or self._source_regex.match(source))
+            and self.method == method
+            and self._path_regex.match(path)
+        )
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    """The outcome of matching a RuleSet against a (source, method, path)."""
+
+    # last matching Request or Ignore rule, deciding whether to process
+    process: Optional[Rule] = None
+    # every matching Request rule, in rule order
+    requests: Tuple[Rule, ...] = ()
+    # every matching Allow rule, in rule order
+    allowances: Tuple[Rule, ...] = ()
+    # every matching Budget rule, in rule order
+    budgets: Tuple[Rule, ...] = ()
+
+    @property
+    def request(self) -> Optional[Rule]:
+        return self.requests[-1] if self.requests else None
+
+    def budget(self, budget_class: Type[Budget]) -> Optional[Rule]:
+        """The last matching rule with a budget of this type."""
+        for rule in reversed(self.budgets):
+            if isinstance(rule.action, budget_class):
+                return rule
+        return None
+
+    @property
+    def final_budgets(self) -> List[Rule]:
+        """The last matching rule of each type of budget."""
+        return list({type(rule.action): rule for rule in self.budgets}.values())
+
+
+class _MethodBucket:
+
+    def __init__(self):
+        self.requests: List[Tuple[int, Rule]] = []
+        self.ignores: List[Tuple[int, Rule]] = []
+        self.allowances: List[Rule] = []
+        self.budgets: List[Rule] = []
+
+
+class RuleSet:
+    """Rules compiled for matching against many nodes.
+
+    Rules are bucketed by method and action type, so a node is only tested
+    against rules that could apply to it, and the outcome is memoized per
+    (source, method, path) with least-recently-used eviction.
+    """
+
+    def __init__(self, rules: Iterable[Rule] = None, cache_size: int = 4096):
+        self.rules = list(rules or [])
+        self.buckets: Dict[str, _MethodBucket] = defaultdict(_MethodBucket)
+        for index, rule in enumerate(self.rules):
+            bucket = self.buckets[rule.method]
+            if isinstance(rule.action, Request):
+                bucket.requests.append((index, rule))
+            elif isinstance(rule.action, Ignore):
+                bucket.ignores.append((index, rule))
+            elif isinstance(rule.action, Allow):
+                bucket.allowances.append(rule)
+            elif isinstance(rule.action, Budget):
+                bucket.budgets.append(rule)
+        self._match = lru_cache(maxsize=cache_size)(self._compute_match)
+
+    def match(self, node) -> RuleMatch:
+        return self._match(node.source, node.method, node.path)
+
+    def cache_info(self):
+        return self._match.cache_info()
+
+    def _compute_match(self, source: Optional[str], method: str, path: str) -> RuleMatch:
+        bucket = self.buckets.get(method)
+        if bucket is None:
+            return RuleMatch()
+
+        requests = [
+            (index, rule) for (index, rule) in bucket.requests
+            if rule.matches(source, method, path)
+        ]
+
+        # last matching rule wins, so scan ignores from the end
+        last_ignore = next(
+            (
+                (index, rule) for (index, rule) in reversed(bucket.ignores)
+                if rule.matches(source, method, path)
+            ),
+            None
+        )
+        last_request = requests[-1] if requests else None
+        candidates = [entry for entry in (last_request, last_ignore) if entry]
+        process = max(candidates, key=lambda entry: entry[0])[1] if candidates else None
+
+        return RuleMatch(
+            process=process,
+            requests=tuple(rule for (_, rule) in requests),
+            allowances=tuple(
+                rule for rule in bucket.allowances
+                if rule.matches(source, method, path)
+            ),
+            budgets=tuple(
+                rule for rule in bucket.budgets
+                if rule.matches(source, method, path)
+            ),
+        )
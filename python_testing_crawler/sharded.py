@@ -0,0 +1,284 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import defaultdict
+from importlib import import_module
+from queue import Empty
+from typing import Any, Callable, Dict, List, Tuple, Union
+import multiprocessing
+import traceback
+import zlib
+
+from .crawler import Crawler
+from .graph import Node
+from .errors import portable_exception, portable_traceback
+from .exn import TooManyRequestsError
+from .events import Event
+from .results import node_result
+
+
+# messages between the coordinator and shard processes
+
+NODE = 'node'
+DONE = 'done'
+ERROR = 'error'
+STOP = 'stop'
+RESULT = 'result'
+
+
+def shard_of(node_id: Tuple, shards: int) -> int:
+    """Stable across processes and runs, unlike hash()."""
+    return zlib.crc32(repr(node_id).encode('utf-8')) % shards
+
+
+def resolve_factory(factory: Union[str, Callable]) -> Callable:
+    """Resolve "package.module:callable" import paths to the callable."""
+    if callable(factory):
+        return factory
+    module_name, sep, attr_path = factory.partition(':')
+    if not sep:
+        raise ValueError(f"Expected 'module:callable', got '{factory}'")
+    obj: Any = import_module(module_name)
+    for attr in attr_path.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class ShardCrawler(Crawler):
+    """Crawls the nodes owned by one shard, routing onward nodes elsewhere."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.children: Dict[Tuple, List[Node]] = defaultdict(list)
+        self.outgoing: List[Node] = []
+        self.routed_depths: Dict[Tuple, int] = {}
+
+    def add_children(self, node, potential_new_nodes):
+        for child_node in self.prepare_children(node, potential_new_nodes):
+            self.children[node.id].append(child_node)
+            self.route(child_node)
+
+    def route(self, node):
+        # again only if found by a shorter path, for its owner to lower its depth
+        routed_depth = self.routed_depths.get(node.id)
+        if routed_depth is None or node.depth < routed_depth:
+            self.routed_depths[node.id] = node.depth
+            self.outgoing.append(node)
+
+    def children_to_lower(self, node):
+        # children are owned by other shards, so route them again instead
+        for child_node in self.children.get(node.id, ()):
+            child_node.depth = node.depth + 1
+            self.route(child_node)
+        return ()
+
+    @property
+    def edges(self) -> List[Tuple[Tuple, Tuple]]:
+        return [
+            (from_id, child_node.id)
+            for (from_id, child_nodes) in self.children.items()
+            for child_node in child_nodes
+        ]
+
+
+def run_shard(shard: int, factory, crawler_kwargs: dict, inbox, outbox, send_results: bool = False):
+    crawler = ShardCrawler(client_factory=resolve_factory(factory), **crawler_kwargs)
+    crawler.check_crawl()
+    errors: Dict[Tuple, Exception] = {}
+
+    def error_captured(node, exc, tb):
+        errors[node.id] = exc
+
+    if send_results:
+        crawler.events.on(Event.ERROR_CAPTURED, error_captured)
+    while True:
+        message = inbox.get()
+        if message[0] == STOP:
+            break
+        node = message[1]
+        graph_node, added = crawler.graph.add_node_if_absent(node)
+        if not added:
+            # found again by a shorter path, which may bring it within max_depth
+            crawler.lower_depth(graph_node, node.depth)
+            if crawler.frontier.empty():
+                outbox.put((DONE, shard, False, crawler.outgoing, None))
+                crawler.outgoing = []
+                continue
+            graph_node = crawler.frontier.get()
+        node = graph_node
+        try:
+            crawler.process_node(node)
+        except Exception as e:
+            tb = traceback.TracebackException.from_exception(e)
+            outbox.put((ERROR, shard, portable_exception(e), portable_traceback(tb)))
+            return
+        # the node's result, for the coordinator to write
+        result = None
+        if send_results:
+            exc = errors.pop(node.id, None)
+            if node.requested or exc is not None:
+                result = node_result(node, exc)
+        outbox.put((DONE, shard, True, crawler.outgoing, result))
+        crawler.outgoing = []
+        if crawler.low_memory:
+            crawler.release_node(node)
+
+    outbox.put((
+        RESULT,
+        shard,
+        list(crawler.graph.map.values()),
+        crawler.edges,
+        [
+            (node, portable_exception(exc), portable_traceback(tb))
+            for (node, exc, tb) in crawler.tracebacks
+        ],
+        crawler.error_count,
+        [group.portable() for group in crawler.errors],
+        (dict(crawler.profiler.totals), dict(crawler.profiler.counts)) if crawler.profiler is not None else None,
+    ))
+
+
+class ShardedCrawler(Crawler):
+    """Crawls using a pool of processes, each owning a shard of the nodes.
+
+    Every process builds its own client by calling `client_factory`, which
+    must be picklable or given as a "package.module:callable" import path.
+    Nodes are owned by the shard given by a stable hash of their id; onward
+    nodes are routed to their owner, which alone processes them. The shard
+    graphs and captured errors are merged into this crawler at the end.
+    Handlers and rules must also be picklable.
+    """
+
+    poll_interval = 0.5
+
+    def __init__(
+        self,
+        client_factory: Union[str, Callable],
+        *,
+        processes: int = None,
+        start_method: str = 'spawn',
+        **kwargs
+    ):
+        if kwargs.get('checkpoint_path'):
+            raise ValueError("Checkpointing is not supported when crawling with multiple processes")
+        if kwargs.get('crawl_cache_path'):
+            raise ValueError("A crawl cache is not supported when crawling with multiple processes")
+        if kwargs.get('samples_per_template') is not None:
+            raise ValueError("Sampling is not supported when crawling with multiple processes")
+        super().__init__(client_factory=resolve_factory(client_factory), **kwargs)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.start_method = start_method
+        self._factory = client_factory
+        self._crawler_kwargs = dict(
+            kwargs,
+            output_summary=False,
+        )
+        self._crawler_kwargs.pop('max_requests', None)
+        # listeners see only the coordinator's events, but shards time their own phases
+        self._crawler_kwargs.pop('listeners', None)
+        self._crawler_kwargs.pop('results_path', None)
+
+    def crawl(self):
+        self.check_crawl()
+        self.logger.info("Starting crawl with %d processes...", self.processes)
+        if self.events.active:
+            self.events.emit(Event.CRAWL_STARTED)
+
+        context = multiprocessing.get_context(self.start_method)
+        outbox = context.Queue()
+        inboxes = [context.Queue() for _ in range(self.processes)]
+        workers = [
+            context.Process(
+                target=run_shard,
+                args=(
+                    shard, self._factory, self._crawler_kwargs, inboxes[shard], outbox,
+                    self.results_writer is not None,
+                ),
+                daemon=True,
+            )
+            for shard in range(self.processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        if self.results_writer is not None:
+            self.results_writer.open()
+        try:
+            self.coordinate(inboxes, outbox, workers)
+            results = self.collect_results(inboxes, outbox, workers)
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+            if self.results_writer is not None:
+                self.results_writer.close()
+
+        self.merge_results(results)
+        self.finish_crawl()
+
+    def coordinate(self, inboxes, outbox, workers):
+        outstanding = 0
+
+        def route(node):
+            nonlocal outstanding
+            inboxes[shard_of(node.id, self.processes)].put((NODE, node))
+            outstanding += 1
+
+        for node in self.initial_nodes():
+            route(node)
+
+        count = 0
+        while outstanding:
+            message = self.receive(outbox, workers)
+            if message[0] == ERROR:
+                _, shard, exc, tb = message
+                self.logger.info("Shard %d failed:\n%s", shard, ''.join(tb.format()))
+                raise exc
+            _, shard, processed, children, result = message
+            outstanding -= 1
+            if result is not None and self.results_writer is not None:
+                self.results_writer.write_result(result)
+            for child_node in children:
+                route(child_node)
+            if processed:
+                count += 1
+                if count == self.max_requests:
+                    raise TooManyRequestsError(count)
+
+    def collect_results(self, inboxes, outbox, workers) -> Dict[int, tuple]:
+        for inbox in inboxes:
+            inbox.put((STOP,))
+        results: Dict[int, tuple] = {}
+        while len(results) < len(workers):
+            message = self.receive(outbox, workers)
+            if message[0] == RESULT:
+                results[message[1]] = message[2:]
+        return results
+
+    def receive(self, outbox, workers):
+        while True:
+            try:
+                return outbox.get(timeout=self.poll_interval)
+            except Empty:
+                dead = [worker for worker in workers if not worker.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Crawler process exited unexpectedly: {dead}")
+
+    def merge_results(self, results: Dict[int, tuple]):
+        for shard in sorted(results):
+            nodes, _, tracebacks, error_count, error_groups, phase_times = results[shard]
+            for node in nodes:
+                self.graph.add_node(node)
+            retained = len(tracebacks) if self.max_errors is None else self.max_errors - len(self.tracebacks)
+            self.tracebacks.extend(tracebacks[:max(0, retained)])
+            self.error_count += error_count
+            for group in error_groups:
+                self.errors.merge(group)
+            if phase_times is not None and self.profiler is not None:
+                self.profiler.merge(*phase_times)
+        for shard in sorted(results):
+            _, edges, _, _, _, _ = results[shard]
+            for (from_id, to_id) in edges:
+                self.graph.add_edge(self.graph.map[from_id], self.graph.map[to_id])
@@ -0,0 +1,107 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import defaultdict
+from math import ceil
+from time import perf_counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+import heapq
+
+from .graph import Node
+from .routes import RouteTemplates
+from .utils import underlined
+
+try:
+    from time import thread_time
+except ImportError:  # Python 3.6
+    from time import process_time as thread_time
+
+
+Timer = Tuple[float, float]
+
+
+def start_timer() -> Timer:
+    return (perf_counter(), thread_time())
+
+
+def stop_timer(timer: Timer) -> Timer:
+    """Return the (wall clock, CPU) seconds elapsed since `start_timer`.
+
+    CPU time is that of the calling thread, so under `AsyncCrawler` it also
+    includes whatever else ran on the event loop in the meantime. Python 3.6
+    has no per-thread clock, so there it is that of the whole process.
+    """
+    (wall_start, cpu_start) = timer
+    return (perf_counter() - wall_start, thread_time() - cpu_start)
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    rank = max(1, ceil(len(sorted_values) * percent / 100))
+    return sorted_values[rank - 1]
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
+
+
+def describe(node: Node) -> str:
+    return f"{node.method} {node.path}"
+
+
+def performance_summary(nodes: Iterable[Node], route_templates: RouteTemplates, size: int) -> List[str]:
+    """Lines listing the slowest and largest responses and percentiles per route.
+
+    Nodes are read in a single pass, keeping only the slowest and largest
+    few and the response times per route template, so they can be streamed.
+    """
+    slowest: List[Tuple[float, int, float, Node]] = []
+    largest: List[Tuple[int, int, Node]] = []
+    sized = 0
+    times_by_template: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    timed = (
+        (node, node.wall_time, node.cpu_time) for node in nodes
+        if node.wall_time is not None and node.cpu_time is not None
+    )
+    for (position, (node, wall_time, cpu_time)) in enumerate(timed):
+        # earlier nodes first among equals, as a stable sort would have them
+        keep_largest(slowest, (wall_time, -position, cpu_time, node), size)
+        if node.response_size is not None:
+            sized += 1
+            keep_largest(largest, (node.response_size, -position, node), size)
+        times_by_template[(node.method, route_templates.template_of(node.path))].append(wall_time)
+    if not times_by_template:
+        return []
+
+    lines = [underlined(f"Slowest {min(size, position + 1)} endpoint(s)")]
+    for (wall_time, _, cpu_time, node) in sorted(slowest, reverse=True):
+        lines.append(f"{format_ms(wall_time):>12} (CPU {format_ms(cpu_time)})  {describe(node)}")
+
+    lines.append("")
+    lines.append(underlined(f"Largest {min(size, sized)} response(s)"))
+    for (_, _, node) in sorted(largest, reverse=True):
+        lines.append(f"{node.response_size:>10} bytes  {describe(node)}")
+
+    lines.append("")
+    lines.append(underlined(f"Response times of {min(size, len(times_by_template))} slowest route template(s)"))
+    lines.append(f"{'count':>6} {'p50':>12} {'p95':>12} {'p99':>12}  route")
+    by_p95 = sorted(
+        ((sorted(times), key) for (key, times) in times_by_template.items()),
+        key=lambda entry: percentile(entry[0], 95),
+        reverse=True,
+    )
+    for (times, (method, template)) in by_p95[:size]:
+        lines.append(
+            f"{len(times):>6} {format_ms(percentile(times, 50)):>12} {format_ms(percentile(times, 95)):>12}"
+            f" {format_ms(percentile(times, 99)):>12}  {method} {template}"
+        )
+    return lines
+
+
+def keep_largest(heap: list, entry: tuple, size: int):
+    """Push `entry` onto a min-heap holding at most the `size` largest entries."""
+    if len(heap) < size:
+        heapq.heappush(heap, entry)
+    elif size and entry > heap[0]:
+        heapq.heapreplace(heap, entry)
@@ -0,0 +1,91 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from typing import Callable, Iterable, Optional, Union
+from urllib.parse import unquote_plus, urljoin, urlsplit, urlunsplit
+
+from .graph import Node
+from .constants import USABLE_SCHEMES
+
+
+DEFAULT_ORIGINS = (
+    'http://testserver',
+    'http://localhost',
+)
+
+
+class Canonicalizer:
+    """Rewrites extracted paths so that equivalent URLs become one node.
+
+    - relative paths are resolved against the page they were found on
+    - absolute URLs on one of `origins` are rewritten as relative paths
+    - query parameters are sorted, and any named by `strip_params` (or for
+      which it returns True, if callable) are removed
+    - trailing slashes are removed, if `strip_trailing_slash`
+
+    Query strings are split and sorted without being decoded, so that their
+    encoding is preserved. URLs with non-HTTP schemes are left alone.
+    """
+
+    def __init__(
+        self,
+        *,
+        resolve_relative: bool = True,
+        origins: Iterable[str] = DEFAULT_ORIGINS,
+        sort_query: bool = True,
+        strip_params: Union[Iterable[str], Callable[[str], bool]] = (),
+        strip_trailing_slash: bool = False,
+    ):
+        self.resolve_relative = resolve_relative
+        self.origins = {origin.rstrip('/').lower() for origin in origins}
+        self.sort_query = sort_query
+        if callable(strip_params):
+            self.should_strip_param = strip_params
+        else:
+            stripped = frozenset(strip_params)
+            self.should_strip_param = stripped.__contains__
+        self.strip_trailing_slash = strip_trailing_slash
+
+    def canonicalize(self, path: str, base_path: Optional[str] = None) -> str:
+        if self.resolve_relative and base_path is not None:
+            path = urljoin(base_path, path)
+
+        url = urlsplit(path)
+        if url.scheme and url.scheme not in USABLE_SCHEMES:
+            return path
+
+        scheme, netloc = url.scheme, url.netloc
+        if netloc and f"{scheme or 'http'}://{netloc}".lower() in self.origins:
+            scheme, netloc = '', ''
+
+        url_path = url.path
+        if netloc and not url_path:
+            url_path = '/'
+        if self.strip_trailing_slash and len(url_path) > 1:
+            url_path = url_path.rstrip('/') or '/'
+        if not netloc and not url_path:
+            url_path = '/'
+
+        return urlunsplit((scheme, netloc, url_path, self.canonicalize_query(url.query), ''))
+
+    def canonicalize_query(self, query: str) -> str:
+        params = [
+            param for param in query.split('&')
+            if param and not self.should_strip_param(unquote_plus(param.partition('=')[0]))
+        ]
+        if self.sort_query:
+            params.sort()
+        return '&'.join(params)
+
+    def canonicalize_node(self, node: Node, parent: Optional[Node] = None) -> Node:
+        path = self.canonicalize(node.path, parent.path if parent is not None else None)
+        if path == node.path:
+            return node
+        return Node(
+            path=path,
+            method=node.method,
+            params=node.params,
+            source=node.source,
+            ignore_form_fields=node.ignore_form_fields,
+        )
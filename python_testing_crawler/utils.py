@@ -2,6 +2,9 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+from typing import Optional
+import sys
+
 from .constants import HTML_CONTENT_TYPES
 
 
@@ -11,3 +14,18 @@ def acceptable_content_type(content_type: str) -> bool:
 
 def underlined(text: str) -> str:
     return text + "\n" + "-" * len(text)
+
+
+def peak_rss(who: str = 'self') -> Optional[int]:
+    """Peak resident set size in bytes, of this process or its largest child."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # kilobytes on Linux, bytes on macOS
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def format_megabytes(size: Optional[int]) -> str:
+    return f"{size / 2 ** 20:.1f} MiB" if size is not None else "-"
@@ -3,21 +3,29 @@ import setuptools
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+version = {}
+with open("python_testing_crawler/version.py", "r") as fh:
+    exec(fh.read(), version)
+
 setuptools.setup(
     name="python-testing-crawler",
-    version="0.2.2",
+    version=version["__version__"],
     author="Chris Wood",
     description="Python Test Crawler",
     long_description=long_description,
     long_description_content_type="text/markdown",
     keywords="python testing crawler",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*']),
     python_requires='>=3.6',
     install_requires=[
         'bs4',
         'soupsieve',
         'dataclasses;python_version<"3.7"',  # backport
     ],
+    extras_require={
+        'lxml': ['lxml'],
+        'networkx': ['networkx'],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
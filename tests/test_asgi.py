@@ -0,0 +1,240 @@
+import asyncio
+
+import flask
+import pytest
+
+from tests.webapps.asgi.app import create_app, SLOW_PAGE_COUNT
+
+from python_testing_crawler import AsyncCrawler, Crawler, Rule, Request
+from python_testing_crawler.clients import AsgiClient, AsgiResponse
+from python_testing_crawler.graph import Node
+from python_testing_crawler.exn import HttpStatusError, TooManyRequestsError
+from python_testing_crawler.constants import ANCHOR, FORM, LINK
+from python_testing_crawler.constants import GET, POST
+from .example_rules import PERMISSIVE_HYPERLINKS_ONLY_RULE_SET, HYPERLINKS_ONLY_RULE_SET
+from .test_flask_test_app import SHORTCUT_LINKS, assert_shortest_depths
+
+
+EXPECTED_PATHS = {
+    '/',
+    '/page-a',
+    '/page-b',
+    '/abort/with/500',
+    '/search',
+    *(f'/slow/{i}' for i in range(SLOW_PAGE_COUNT)),
+}
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+def test_crawl_all(app):
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + [
+            Rule(FORM, '.*', POST, Request()),
+            Rule(LINK, '.*', 'GET', Request()),
+        ],
+        concurrency=8,
+    )
+    crawler.crawl()
+    assert crawler.graph.visited_paths == EXPECTED_PATHS | {'/style.css'}
+    assert crawler.graph.get_nodes_by_path('/abort/with/500')[0].status_code == 500
+    assert ('POST', '/search', [('q', 'spiders')]) in app.request_log
+    assert '/not-html' not in crawler.graph.encountered_paths
+
+
+class ShortcutApp:
+    """Serves the pages of SHORTCUT_LINKS, with "/delayed" slow to respond."""
+
+    async def __call__(self, scope, receive, send):
+        await receive()
+        if scope['path'] == '/delayed':
+            await asyncio.sleep(0.3)
+        body = ' '.join(f'<a href="{link}">{link}</a>' for link in SHORTCUT_LINKS[scope['path']])
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/html; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': body.encode()})
+
+
+def test_client_must_match_crawler(app):
+    with pytest.raises(ValueError, match="AsgiClient is asynchronous"):
+        Crawler(client=AsgiClient(app))
+    with pytest.raises(ValueError, match="AsyncCrawler needs an asynchronous client"):
+        AsyncCrawler(client=flask.Flask(__name__).test_client())
+
+
+def test_max_depth_concurrently_uses_shortest_path():
+    crawler = AsyncCrawler(
+        client=AsgiClient(ShortcutApp()),
+        initial_paths=['/'],
+        rules=[Rule(ANCHOR, '/.*', GET, Request())],
+        max_depth=3,
+        concurrency=4,
+    )
+    crawler.crawl()
+    assert_shortest_depths(crawler)
+
+
+def test_samples_per_template(app):
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        samples_per_template=2,
+    )
+    crawler.crawl()
+    slow_nodes = crawler.graph.get_nodes_by_path_pattern('/slow/')
+    assert [node.path for node in slow_nodes if node.requested] == ['/slow/0', '/slow/1']
+    assert all(node.skipped == 'sampling' for node in slow_nodes[2:])
+    assert '/page-a' in crawler.graph.visited_paths
+
+
+def test_timings_and_sizes_recorded(app, capfd):
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+    )
+    crawler.crawl()
+    for node in crawler.graph.get_nodes_by_path_pattern('/slow/'):
+        assert node.wall_time >= app.delay
+        assert node.response_size > 0
+    home = crawler.graph.get_nodes_by_path('/')[0]
+    assert home.response_size == len(app.render('/').encode())
+    out, _ = capfd.readouterr()
+    assert "Slowest 9 endpoint(s)" in out
+    assert f"{SLOW_PAGE_COUNT:>6}" in out.split("GET /slow/{int}")[0].splitlines()[-1]
+
+
+def test_requests_in_flight_concurrently(app):
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        concurrency=SLOW_PAGE_COUNT,
+    )
+    crawler.crawl()
+    assert app.max_in_flight > 1
+
+
+def test_sequential_when_concurrency_is_one(app):
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        concurrency=1,
+    )
+    crawler.crawl()
+    assert app.max_in_flight == 1
+
+
+def test_capture_exceptions(app, capfd):
+    app.failure_paths = {'/page-a', '/slow/1'}
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+    assert {node.path for (node, exc, tb) in crawler.tracebacks} == app.failure_paths
+    out, err = capfd.readouterr()
+    for path in app.failure_paths:
+        assert f"Exception: Instructed to fail at {path}" in out
+
+
+def test_fail_fast(app):
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=HYPERLINKS_ONLY_RULE_SET,
+        capture_exceptions=False,
+    )
+    with pytest.raises(HttpStatusError) as excinfo:
+        crawler.crawl()
+    assert excinfo.value.status_code == 500
+
+
+def test_max_requests(app):
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        max_requests=3,
+    )
+    with pytest.raises(TooManyRequestsError):
+        crawler.crawl()
+
+
+@pytest.mark.parametrize('frontier, expected_paths', [
+    ('bfs', ['/', '/page-a', '/page-b', '/slow/0', '/slow/1', '/slow/2']),
+    ('best-first', ['/', '/page-a', '/page-b', '/slow/0', '/abort/with/500']),
+])
+def test_frontier_order_within_max_requests(frontier, expected_paths):
+    app = create_app(delay=0)
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        frontier=frontier,
+        max_requests=6,
+        concurrency=1,
+    )
+    with pytest.raises(TooManyRequestsError):
+        crawler.crawl()
+    assert [path for (_, path, _) in app.request_log] == expected_paths
+
+
+def test_extraction_cache_skips_identical_bodies(app):
+    rules = PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + [Rule(FORM, '.*', POST, Request())]
+    uncached_crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=rules,
+        extraction_cache_size=0,
+    )
+    uncached_crawler.crawl()
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=rules,
+        concurrency=1,
+    )
+    crawler.crawl()
+
+    # '/', '/page-a' and the slow pages share a body
+    assert crawler.extraction_cache.hits == SLOW_PAGE_COUNT + 1
+    assert crawler.extraction_cache.misses == 3  # '/', '/page-b' and '/search'
+    assert set(crawler.graph.map) == set(uncached_crawler.graph.map)
+
+
+def test_extraction_cache_resolves_default_form_action(app):
+    crawler = AsyncCrawler(client=AsgiClient(app), initial_paths=['/'], rules=HYPERLINKS_ONLY_RULE_SET)
+    body = b'<form method="post"><input name="q"></form><form action="/fixed"></form>'
+    response = AsgiResponse(200, [(b'content-type', b'text/html')], body)
+    for path in ['/first', '/second']:
+        forms = crawler.extract_from(Node(path=path), response)
+        assert [form.path for form in forms] == [path, '/fixed']
+    assert crawler.extraction_cache.hits == 1
+
+
+def test_asgi_client_discards_unwanted_body(app):
+    client = AsgiClient(app)
+
+    def not_css(response):
+        return response.content_type != 'text/css'
+
+    loop = asyncio.get_event_loop()
+    response = loop.run_until_complete(client.get('/style.css', keep_content=not_css))
+    assert response.status_code == 200
+    assert response.content == b''
+    assert response.discarded_length == len('<a href="/not-html">not html</a>')
+    response = loop.run_until_complete(client.get('/', keep_content=not_css))
+    assert response.discarded_length is None and response.content
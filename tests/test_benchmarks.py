@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from benchmarks.harness import Suite, format_comparison, main
+from benchmarks.micro import suite
+from benchmarks.macro import format_results, run, run_mode
+from benchmarks.synthetic import SiteSpec, Site, flask_client
+
+
+def test_micro_benchmarks_run():
+    report = suite.run(scale=0.001, repeat=2)
+    names = [result['name'] for result in report['results']]
+    assert names == list(suite.benchmarks)
+    for result in report['results']:
+        assert 0 < result['min'] <= result['median']
+        assert result['units'] >= 1
+
+
+def test_suite_selection_and_json_output(tmp_path, capsys):
+    toy = Suite('toy')
+
+    @toy.benchmark('sum.small')
+    def sum_small(scale):
+        values = list(range(int(100 * scale)))
+        return (lambda: sum(values)), len(values)
+
+    @toy.benchmark('other')
+    def other(scale):
+        return (lambda: None), 1
+
+    with pytest.raises(ValueError):
+        toy.benchmark('other')(other)
+    assert toy.select(['sum.*']) == ['sum.small']
+
+    path = tmp_path / 'results.json'
+    main(toy, ['sum.*', '--repeat', '2', '--json', str(path)])
+    report = json.loads(path.read_text())
+    assert report['suite'] == 'toy'
+    assert [result['name'] for result in report['results']] == ['sum.small']
+    assert 'sum.small' in capsys.readouterr().out
+
+    assert "1.00" in format_comparison(report, report)
+
+
+def test_synthetic_site_is_deterministic():
+    spec = SiteSpec(pages=50, links_per_page=5, page_bytes=2000, latency_ms=10, latency_distribution='lognormal')
+    site, same_site = Site(spec), Site(spec)
+    assert site.links(7) == same_site.links(7)
+    assert site.links(7)[0] == 8 and len(site.links(7)) == 5
+    assert site.latency('page-7') == same_site.latency('page-7') > 0
+    assert Site(SiteSpec(latency_ms=10, seed=1)).latency('page-7') != site.latency('page-7')
+
+    client = flask_client(SiteSpec(pages=5, page_bytes=2000))
+    assert 1900 <= len(client.get('/page/4').data) <= 2100
+    assert client.post('/page/4/form/0').status_code == 200
+    assert client.get('/page/5').status_code == 404
+
+    with pytest.raises(ValueError):
+        SiteSpec(latency_distribution='normal')
+
+
+def test_macro_benchmark_crawls_whole_site():
+    spec = SiteSpec(pages=30, forms_per_page=2, page_bytes=1000)
+    for mode in ['sequential', 'threads', 'processes']:
+        result = run_mode('flask', spec, mode, workers=2)
+        assert result['requests'] == spec.requests == 91
+        assert 0 < result['parse_share'] < 1
+
+
+def test_macro_benchmark_in_fresh_processes():
+    # Django is configured in the child process only
+    report = run(['django'], SiteSpec(pages=10, page_bytes=1000), ['sequential'], workers=1)
+    [result] = report['results']
+    assert result['requests'] == 21
+    assert result['peak_rss_bytes'] is None or result['peak_rss_bytes'] > 0
+    assert 'django' in format_results(report)
@@ -0,0 +1,166 @@
+from collections import Counter
+
+import pytest
+
+from tests.webapps.flask.app import create_app
+
+from python_testing_crawler import Crawler
+from python_testing_crawler.checkpoint import CheckpointStore
+from python_testing_crawler.errors import RestoredException
+from python_testing_crawler.graph import Node
+from python_testing_crawler.exn import TooManyRequestsError
+from .example_rules import PERMISSIVE_HYPERLINKS_ONLY_RULE_SET, SUBMIT_GET_FORMS_RULE_SET
+from .test_flask_test_app import DIRECTLY_ACCESSIBLE_URLS
+
+
+RULES = PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + SUBMIT_GET_FORMS_RULE_SET
+
+
+@pytest.fixture
+def app():
+    flask_app = create_app()
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / 'crawl.sqlite')
+
+
+def test_resume_after_interruption(app, checkpoint_path):
+    crawler = Crawler(
+        client=app.test_client(),
+        initial_paths=['/'],
+        rules=RULES,
+        max_requests=5,
+        checkpoint_path=checkpoint_path,
+        checkpoint_interval=2,
+    )
+    with pytest.raises(TooManyRequestsError):
+        crawler.crawl()
+    first_visited = set(crawler.graph.visited_paths)
+
+    resumed_crawler = Crawler(
+        client=app.test_client(),
+        initial_paths=['/'],
+        rules=RULES,
+        checkpoint_path=checkpoint_path,
+        resume=True,
+    )
+    resumed_crawler.crawl()
+    assert first_visited <= resumed_crawler.graph.visited_paths
+    assert DIRECTLY_ACCESSIBLE_URLS <= resumed_crawler.graph.visited_paths
+    assert resumed_crawler.processed_count == len(resumed_crawler.graph.map)
+
+    # nothing was requested twice
+    requests = Counter((entry.path, entry.method, entry.params) for entry in app.request_log)
+    assert max(requests.values()) == 1
+
+    # graph state, including edges, survived
+    root = resumed_crawler.graph.get_nodes_by_path('/')[0]
+    assert root.requested and root.status_code == 200
+    assert '/page-a' in {child.path for child in resumed_crawler.graph.adj[root.id]}
+
+
+def test_resume_completed_crawl_restores_errors(app, checkpoint_path, capfd):
+    app.config['FAILURE_PATHS'] = {'/page-c'}
+    crawler = Crawler(
+        client=app.test_client(),
+        initial_paths=['/'],
+        rules=RULES,
+        checkpoint_path=checkpoint_path,
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+    requests_made = len(app.request_log)
+    out, err = capfd.readouterr()
+    failures_reported = out.count("Exception: Instructed to fail at /page-c")
+    assert failures_reported
+
+    resumed_crawler = Crawler(
+        client=app.test_client(),
+        initial_paths=['/'],
+        rules=RULES,
+        checkpoint_path=checkpoint_path,
+        resume=True,
+    )
+    with pytest.raises(AssertionError):
+        resumed_crawler.crawl()
+    assert len(app.request_log) == requests_made
+    assert len(resumed_crawler.tracebacks) == len(crawler.tracebacks)
+    node, exc, tb = resumed_crawler.tracebacks[0]
+    assert isinstance(exc, RestoredException)
+    assert repr(exc) == repr(crawler.tracebacks[0][1])
+    out, err = capfd.readouterr()
+    assert out.count("Exception: Instructed to fail at /page-c") == failures_reported
+
+
+def test_resume_low_memory_crawl(app, checkpoint_path):
+    crawler = Crawler(
+        client=app.test_client(),
+        initial_paths=['/'],
+        rules=RULES,
+        max_requests=8,
+        checkpoint_path=checkpoint_path,
+        checkpoint_interval=3,
+        low_memory=True,
+    )
+    with pytest.raises(TooManyRequestsError):
+        crawler.crawl()
+
+    resumed_crawler = Crawler(
+        client=app.test_client(),
+        initial_paths=['/'],
+        rules=RULES,
+        checkpoint_path=checkpoint_path,
+        resume=True,
+        low_memory=True,
+    )
+    resumed_crawler.crawl()
+    assert DIRECTLY_ACCESSIBLE_URLS <= resumed_crawler.graph.visited_paths
+
+    # params dropped from processed nodes were saved first
+    requests = Counter((entry.path, entry.method, entry.params) for entry in app.request_log)
+    assert max(requests.values()) == 1
+    assert any(params for (path, method, params) in requests)
+
+
+def test_without_resume_starts_afresh(app, checkpoint_path):
+    requests_made = []
+    for _ in range(2):
+        crawler = Crawler(
+            client=app.test_client(),
+            initial_paths=['/'],
+            rules=RULES,
+            checkpoint_path=checkpoint_path,
+        )
+        crawler.crawl()
+        requests_made.append(len(app.request_log))
+    assert requests_made[1] == 2 * requests_made[0]
+
+
+def test_requeued_node_is_pending_again(checkpoint_path):
+    store = CheckpointStore(checkpoint_path)
+    root, deep = Node(path='/'), Node(path='/deep', depth=4)
+    store.add_nodes([root])
+    store.record_processed(root, [deep])
+    deep.skipped = 'depth'
+    store.record_processed(deep, [])
+    store.flush()
+    (_, pending, _, _) = store.load()
+    assert pending == []
+
+    # found again by a shorter path
+    deep.depth = 2
+    deep.skipped = None
+    store.record_requeued(deep)
+    store.flush()
+    (nodes, pending, _, _) = store.load()
+    assert [(node.path, node.depth, node.skipped) for node in pending] == [('/deep', 2, None)]
+
+    # and processed once it is processed again
+    store.record_requeued(deep)
+    store.record_processed(deep, [])
+    store.flush()
+    assert store.load()[1] == []
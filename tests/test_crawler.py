@@ -1,8 +1,12 @@
 
+from types import SimpleNamespace
+
 import pytest
 
 from python_testing_crawler import Crawler
-from python_testing_crawler.clients import DummyClient
+from python_testing_crawler.clients import DummyClient, FlaskClientWrapper
+from python_testing_crawler.constants import ANCHOR, FORM, HREF
+from python_testing_crawler.constants import GET, POST
 
 
 def test_valid_css_selectors():
@@ -18,3 +22,41 @@ def test_invalid_css_selectors():
             client=DummyClient(),
             ignore_css_selectors=['£$%RT']
         )
+
+
+def test_client_or_client_factory():
+    with pytest.raises(ValueError):
+        Crawler()
+    with pytest.raises(ValueError):
+        Crawler(client=DummyClient(), client_factory=DummyClient)
+    with pytest.raises(ValueError):
+        Crawler(client=DummyClient(), workers=2)
+    Crawler(client_factory=DummyClient, workers=2)
+
+
+def test_extract_nodes_parses_once(monkeypatch):
+    html = b"""
+        <a href="/a#frag">A</a>
+        <form action="/search"><input name="q" value="x"><a href="/b">B</a></form>
+        <form method="post"><input name="n"></form>
+    """
+    wrapper = FlaskClientWrapper(client=None)
+    response = SimpleNamespace(data=html)
+
+    parse_count = 0
+    original_parse = wrapper.parser.parse
+
+    def counting_parse(response):
+        nonlocal parse_count
+        parse_count += 1
+        return original_parse(response)
+    monkeypatch.setattr(wrapper.parser, 'parse', counting_parse)
+
+    nodes = list(wrapper.extract_nodes('/page', response, (HREF,)))
+    assert parse_count == 1
+    assert [(node.source, node.method, node.path, node.params) for node in nodes] == [
+        (ANCHOR, GET, '/a', {}),
+        (FORM, GET, '/search', {'q': 'x'}),
+        (ANCHOR, GET, '/b', {}),
+        (FORM, POST, '/page', {'n': ''}),
+    ]
@@ -1,13 +1,18 @@
 import os
 
+import pytest
 import django
 from django.conf import settings
 from django.test.utils import get_runner
 from django.test.client import Client
+from django.test.utils import override_settings
 
 from tests.webapps.django import tutorial_mysite
 
-from python_testing_crawler import Crawler
+from python_testing_crawler import Crawler, Rule, MaxQueries
+from python_testing_crawler.exn import BudgetExceededError
+from python_testing_crawler.constants import ANCHOR
+from python_testing_crawler.constants import GET
 from .example_rules import (
     PERMISSIVE_ALL_ELEMENTS_RULE_SET,
     SUBMIT_GET_FORMS_RULE_SET,
@@ -15,7 +20,8 @@ from .example_rules import (
 )
 
 
-def test_crawl_all(monkeypatch):
+@pytest.fixture
+def mysite(monkeypatch):
     path = tutorial_mysite.__path__[0]
     with monkeypatch.context() as patch:
         patch.chdir(path)
@@ -29,22 +35,74 @@ def test_crawl_all(monkeypatch):
 
         TestRunner = get_runner(settings)
         test_runner = TestRunner()
-        client = Client()
-
-        crawler = Crawler(
-            client=client,
-            initial_paths=['/', '/polls'],
-            rules=(
-                PERMISSIVE_ALL_ELEMENTS_RULE_SET +
-                SUBMIT_GET_FORMS_RULE_SET +
-                SUBMIT_POST_FORMS_RULE_SET
-            ),
-            ignore_form_fields={'csrfmiddlewaretoken'},
-            capture_exceptions=False,
-        )
+        yield
+
+
+def test_crawl_all(mysite):
+    client = Client()
+
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/', '/polls'],
+        rules=(
+            PERMISSIVE_ALL_ELEMENTS_RULE_SET +
+            SUBMIT_GET_FORMS_RULE_SET +
+            SUBMIT_POST_FORMS_RULE_SET
+        ),
+        ignore_form_fields={'csrfmiddlewaretoken'},
+        capture_exceptions=False,
+    )
+    crawler.crawl()
+
+    # check urls
+    for i in range(1, 4):
+        assert f"/polls/{i}/" in crawler.graph.visited_paths
+        assert f"/polls/{i}/vote" in crawler.graph.visited_paths
+
+
+def test_max_queries(mysite):
+    crawler = Crawler(
+        client=Client(),
+        initial_paths=['/polls'],
+        rules=PERMISSIVE_ALL_ELEMENTS_RULE_SET + [
+            Rule(ANCHOR, r'/polls/\d+/$', GET, MaxQueries(0)),
+        ],
+    )
+    with pytest.raises(AssertionError):
         crawler.crawl()
+    failures = {node.path: exc for (node, exc, tb) in crawler.tracebacks}
+    assert set(failures) == {f"/polls/{i}/" for i in range(1, 4)}
+    for path, exc in failures.items():
+        assert isinstance(exc, BudgetExceededError)
+        assert crawler.graph.get_nodes_by_path(path)[0].query_count == exc.measured > 0
+
+
+def test_streaming_responses(mysite):
+    from django.http import StreamingHttpResponse
+    from python_testing_crawler.clients import DjangoClientWrapper
+
+    wrapper = DjangoClientWrapper(Client(), None)
+    response = wrapper.read_streamed(StreamingHttpResponse(iter([b'ab', b'cde'])), lambda response: False)
+    assert wrapper.get_content_length(response) == 5
+
+    response = wrapper.read_streamed(StreamingHttpResponse(iter([b'<p>', b'hi</p>'])), lambda response: True)
+    assert wrapper.get_content(response) == b'<p>hi</p>'
+    assert wrapper.get_content_length(response) == 9
+
+
+def test_conditional_get_round_trip(mysite):
+    from python_testing_crawler.clients import DjangoClientWrapper
+
+    middleware = settings.MIDDLEWARE + ['django.middleware.http.ConditionalGetMiddleware']
+    with override_settings(MIDDLEWARE=middleware):
+        wrapper = DjangoClientWrapper(Client(), None)
 
-        # check urls
-        for i in range(1, 4):
-            assert f"/polls/{i}/" in crawler.graph.visited_paths
-            assert f"/polls/{i}/vote" in crawler.graph.visited_paths
+        # ETags are added by the middleware, Last-Modified by the results view
+        response = wrapper.get('/polls/1/results/')
+        assert response.status_code == 200
+        validators = [
+            {'If-None-Match': wrapper.get_header(response, 'ETag')},
+            {'If-Modified-Since': wrapper.get_header(response, 'Last-Modified')},
+        ]
+        for headers in validators:
+            assert wrapper.get('/polls/1/results/', headers=headers).status_code == 304
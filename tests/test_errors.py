@@ -0,0 +1,86 @@
+import pickle
+import traceback
+
+from python_testing_crawler.errors import (
+    ErrorAggregator, RestoredException, exception_only, fingerprint, portable_exception, portable_traceback,
+)
+from python_testing_crawler.exn import HttpStatusError
+from python_testing_crawler.graph import Node
+
+
+def render(name):
+    raise KeyError(f"missing {name}")
+
+
+def render_other(name):
+    raise KeyError(f"missing {name}")
+
+
+def captured(fn, *args):
+    try:
+        fn(*args)
+    except Exception as e:
+        return e, traceback.TracebackException.from_exception(e)
+
+
+def test_fingerprint_ignores_message_but_not_location():
+    exc_a, tb_a = captured(render, 'a')
+    exc_b, tb_b = captured(render, 'b')
+    exc_c, tb_c = captured(render_other, 'a')
+    assert fingerprint(exc_a, tb_a) == fingerprint(exc_b, tb_b)
+    assert fingerprint(exc_a, tb_a) != fingerprint(exc_c, tb_c)
+    key = fingerprint(exc_a, tb_a)
+    assert key[0] == 'KeyError'
+    assert key[-1][2] == 'render'
+
+
+def check_status(status_code):
+    raise HttpStatusError(status_code)
+
+
+def test_fingerprint_tells_status_codes_apart():
+    exc_a, tb_a = captured(check_status, 404)
+    exc_b, tb_b = captured(check_status, 404)
+    exc_c, tb_c = captured(check_status, 500)
+    assert fingerprint(exc_a, tb_a) == fingerprint(exc_b, tb_b)
+    assert fingerprint(exc_a, tb_a) != fingerprint(exc_c, tb_c)
+    assert fingerprint(exc_c, tb_c)[:2] == ('HttpStatusError', (500,))
+
+
+def test_fingerprint_of_restored_traceback_matches():
+    exc, tb = captured(render, 'a')
+    restored_exc = RestoredException(repr(exc))
+    assert fingerprint(restored_exc, portable_traceback(tb)) == fingerprint(exc, tb)
+    assert exception_only(portable_traceback(tb)) == exception_only(tb) == "KeyError: 'missing a'"
+
+
+def test_aggregator_groups_and_samples():
+    errors = ErrorAggregator(sample_size=2)
+    for i in range(5):
+        errors.add(Node(path=f'/posts/{i}'), *captured(render, i))
+    errors.add(Node(path='/other'), *captured(render_other, 'x'))
+    groups = list(errors)
+    assert [group.count for group in groups] == [5, 1]
+    assert errors.count == 6
+    assert [node.path for (node, message) in groups[0].sample] == ['/posts/0', '/posts/1']
+    assert groups[0].sample[1][1] == "KeyError: 'missing 1'"
+    assert groups[0].node.path == '/posts/0'
+    assert groups[0].location.endswith("in render")
+
+
+def test_portable_groups_merge():
+    errors = ErrorAggregator(sample_size=3)
+    errors.add(Node(path='/a'), *captured(render, 'a'))
+    other_errors = ErrorAggregator(sample_size=3)
+    for path in ('/b', '/c', '/d'):
+        other_errors.add(Node(path=path), *captured(render, path))
+    for group in other_errors:
+        errors.merge(pickle.loads(pickle.dumps(group.portable())))
+    (group,) = errors
+    assert group.count == 4
+    assert [node.path for (node, message) in group.sample] == ['/a', '/b', '/c']
+
+
+def test_portable_exception_keeps_picklable_exceptions():
+    exc, _ = captured(render, 'a')
+    assert portable_exception(exc) is exc
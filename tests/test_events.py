@@ -0,0 +1,165 @@
+import flask
+import pytest
+
+from python_testing_crawler import Crawler, Rule, Request
+from python_testing_crawler.constants import ANCHOR, GET
+from python_testing_crawler.events import Event, EventDispatcher, PhaseProfiler
+from python_testing_crawler.graph import Node
+
+from tests.webapps.flask.app import create_app
+from .example_rules import PERMISSIVE_HYPERLINKS_ONLY_RULE_SET
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['FAILURE_PATHS'] = {'/page-c'}
+    return app.test_client()
+
+
+class Recorder:
+
+    def __init__(self):
+        self.events = []
+
+    def crawl_started(self):
+        self.events.append(('crawl_started',))
+
+    def crawl_finished(self):
+        self.events.append(('crawl_finished',))
+
+    def node_enqueued(self, node):
+        self.events.append(('node_enqueued', node.path))
+
+    def request_started(self, node):
+        self.events.append(('request_started', node.path))
+
+    def request_finished(self, node, response):
+        self.events.append(('request_finished', node.path, response and response.status_code))
+
+    def extraction_finished(self, node, children):
+        self.events.append(('extraction_finished', node.path, len(children)))
+
+    def error_captured(self, node, exc, tb):
+        self.events.append(('error_captured', node.path, type(exc).__name__))
+
+
+def test_dispatcher_inactive_without_listeners():
+    events = EventDispatcher()
+    assert not events.active
+    events.listen(object())
+    assert not events.active
+    calls = []
+    events.on(Event.NODE_ENQUEUED, calls.append)
+    assert events.active
+    events.emit(Event.NODE_ENQUEUED, 'node')
+    events.emit(Event.REQUEST_STARTED, 'node')
+    assert calls == ['node']
+
+
+def test_listener_sees_crawl_events(client):
+    recorder = Recorder()
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        listeners=[recorder],
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+
+    events = recorder.events
+    assert events[0] == ('crawl_started',)
+    assert events[1] == ('node_enqueued', '/')
+    assert events[-1] == ('crawl_finished',)
+    assert events[2:4] == [('request_started', '/'), ('request_finished', '/', 200)]
+    assert ('error_captured', '/page-c', 'Exception') in events
+    requested = {event[1] for event in events if event[0] == 'request_finished'}
+    assert requested == crawler.graph.visited_paths
+    enqueued = [event[1] for event in events if event[0] == 'node_enqueued']
+    assert len(enqueued) == len(crawler.graph.map)
+
+
+class PhaseRecorder:
+
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, name):
+        if name.startswith(('rules_', 'handlers_')):
+            return lambda node: self.events.append((name, node.path))
+        raise AttributeError(name)
+
+
+def test_phases_finish_when_checks_fail():
+    app = flask.Flask(__name__)
+
+    @app.route('/')
+    def index():
+        return '<a href="/missing">Missing</a> <a href="/unexpected">Unexpected</a>'
+
+    @app.route('/unexpected')
+    def unexpected():
+        return 'Unexpected'
+
+    recorder = PhaseRecorder()
+    crawler = Crawler(
+        client=app.test_client(),
+        initial_paths=['/'],
+        rules=[Rule(ANCHOR, '/.*', GET, Request())],
+        check_response_handlers=[lambda node, response: node.path != '/unexpected'],
+        listeners=[recorder],
+    )
+    with pytest.raises(AssertionError, match="Encountered 2 exception"):
+        crawler.crawl()
+
+    # a 404 fails the rules phase, and the handler fails the handlers phase
+    for path in ('/', '/missing', '/unexpected'):
+        phases = [name for (name, event_path) in recorder.events if event_path == path]
+        for phase in ('rules', 'handlers'):
+            assert phases.count(f'{phase}_started') == phases.count(f'{phase}_finished')
+    assert ('rules_finished', '/missing') in recorder.events
+    assert recorder.events[-2:] == [('handlers_started', '/unexpected'), ('handlers_finished', '/unexpected')]
+
+
+def test_profiler_summary(client, capsys):
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        should_process_handlers=[lambda node: True],
+        profile=True,
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+
+    profiler = crawler.profiler
+    requests = len(crawler.graph.visited_paths)
+    assert profiler.counts['request'] == requests
+    assert profiler.counts['parsing'] == profiler.counts['graph'] > 0
+    assert profiler.counts['rules'] > requests
+    assert profiler.counts['handlers'] > 0
+    assert sum(profiler.totals.values()) <= profiler.crawl_seconds
+    out = capsys.readouterr().out
+    assert "Time by phase" in out
+    assert "request " in out and "parsing " in out and "total " in out
+
+
+def test_profiler_pairs_phases_per_node():
+    profiler = PhaseProfiler()
+    events = EventDispatcher()
+    profiler.register(events)
+    a, b = Node(path='/a'), Node(path='/b')
+    events.emit(Event.CRAWL_STARTED)
+    events.emit(Event.REQUEST_STARTED, a)
+    events.emit(Event.REQUEST_STARTED, b)
+    events.emit(Event.REQUEST_FINISHED, b, None)
+    events.emit(Event.REQUEST_FINISHED, a, None)
+    events.emit(Event.REQUEST_FINISHED, a, None)
+    events.emit(Event.CRAWL_FINISHED)
+    assert profiler.counts['request'] == 2
+    assert profiler.counts['parsing'] == 0
+    lines = profiler.summary()
+    assert lines[1].split()[0] == 'request'
+    assert lines[-1].split()[0] == 'total'
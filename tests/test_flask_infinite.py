@@ -53,3 +53,17 @@ def test_crawl_fails_after_too_many_requests(app, client):
 
     with pytest.raises(TooManyRequestsError):
         crawler.crawl()
+
+
+@pytest.mark.parametrize('factory_cls', [FlaskTestClientFactory, WebTestClientFactory])
+def test_concurrent_crawl_fails_after_too_many_requests(app, factory_cls):
+    crawler = Crawler(
+        client_factory=factory_cls(app).get_client,
+        workers=4,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        max_requests=10,
+    )
+
+    with pytest.raises(TooManyRequestsError):
+        crawler.crawl()
@@ -1,12 +1,15 @@
 
+import time
+
 import pytest
 import webtest
 import flask
 
 from tests.webapps.flask.app import create_app, lookup_requests
 
-from python_testing_crawler import Crawler, Rule, Request, Ignore, Allow
-from python_testing_crawler.exn import HttpStatusError, UnexpectedResponseError
+from python_testing_crawler import Crawler, Canonicalizer, Rule, Request, Ignore, Allow
+from python_testing_crawler import MaxLatency, MaxQueries, MaxResponseBytes
+from python_testing_crawler.exn import BudgetExceededError, HttpStatusError, UnexpectedResponseError
 from python_testing_crawler.constants import GET, POST
 from python_testing_crawler.constants import ANCHOR, FORM
 from python_testing_crawler.constants import HREF, SRC
@@ -66,6 +69,12 @@ def client(request, app):  # request = fixture request
     return client
 
 
+@pytest.fixture(params=[FlaskTestClientFactory, WebTestClientFactory])
+def client_factory(request, app):  # request = fixture request
+    factory_cls = request.param
+    return factory_cls(app).get_client
+
+
 DIRECTLY_ACCESSIBLE_URLS = {
     '/',
     '/abort/with/400',
@@ -104,6 +113,140 @@ def test_crawl_all(app, client):
         assert crawler.graph.get_nodes_by_path(path)[0].status_code == status_code
 
 
+@pytest.mark.parametrize('parser', ['html.parser', 'lxml', 'stream'])
+def test_crawl_all_with_parser(app, client, parser):
+    if parser == 'lxml':
+        pytest.importorskip('lxml')
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + SUBMIT_GET_FORMS_RULE_SET,
+        parser=parser,
+    )
+    crawler.crawl()
+    assert DIRECTLY_ACCESSIBLE_URLS <= crawler.graph.visited_paths
+    assert '/form-submitted-by-get-onward-link' in crawler.graph.visited_paths
+
+
+def test_crawl_all_canonicalized(app, client):
+    crawler = Crawler(
+        client=client,
+        initial_paths=['http://localhost/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        canonicalizer=Canonicalizer(strip_params=['query']),
+    )
+    crawler.crawl()
+    assert crawler.graph.visited_paths == DIRECTLY_ACCESSIBLE_URLS - {'/page-c?query=foo'}
+
+
+def test_max_depth(app, client):
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        max_depth=1,
+    )
+    crawler.crawl()
+    assert crawler.graph.visited_paths == {'/', '/page-a', '/page-b', '/page-c', '/page-d', '/page-gallery'}
+    skipped_node = crawler.graph.get_nodes_by_path('/abort/with/500')[0]
+    assert (skipped_node.depth, skipped_node.skipped) == (2, 'depth')
+
+
+# "/delayed" links to "/y" directly, but only after "/y" has been reached,
+# through "/quick", at a depth from which "/z" is too deep
+SHORTCUT_LINKS = {
+    '/': ['/quick', '/delayed'],
+    '/quick': ['/quick/2'],
+    '/quick/2': ['/y'],
+    '/delayed': ['/y'],
+    '/y': ['/z'],
+    '/z': [],
+}
+
+
+def create_shortcut_app(delay=0.3):
+    shortcut_app = flask.Flask(__name__)
+
+    @shortcut_app.route('/', defaults={'path': ''})
+    @shortcut_app.route('/<path:path>')
+    def page(path):
+        if path == 'delayed':
+            time.sleep(delay)
+        return ' '.join(f'<a href="{link}">{link}</a>' for link in SHORTCUT_LINKS['/' + path])
+
+    return shortcut_app
+
+
+def assert_shortest_depths(crawler):
+    depths = {node.path: (node.depth, node.skipped) for node in crawler.graph.map.values()}
+    assert depths == {
+        '/': (0, None),
+        '/quick': (1, None),
+        '/delayed': (1, None),
+        '/quick/2': (2, None),
+        '/y': (2, None),
+        '/z': (3, None),
+    }
+    assert crawler.graph.visited_paths == set(SHORTCUT_LINKS)
+
+
+def test_max_depth_concurrently_uses_shortest_path():
+    shortcut_app = create_shortcut_app()
+    crawler = Crawler(
+        client_factory=shortcut_app.test_client,
+        workers=4,
+        initial_paths=['/'],
+        rules=[Rule(ANCHOR, '/.*', GET, Request())],
+        max_depth=3,
+    )
+    crawler.crawl()
+    assert_shortest_depths(crawler)
+
+
+def create_repetitive_app():
+    repetitive_app = flask.Flask(__name__)
+    nav = ' '.join(f'<a href="{path}">{path}</a>' for path in ['/', '/a', '/b', '/c', '/d'])
+
+    @repetitive_app.route('/')
+    @repetitive_app.route('/a')
+    @repetitive_app.route('/b')
+    def plain():
+        return nav
+
+    @repetitive_app.route('/c')
+    @repetitive_app.route('/d')
+    def with_form():
+        # the form submits to whichever page it is on
+        return nav + '<form><input name="q" value="x"></form>'
+
+    return repetitive_app
+
+
+@pytest.mark.parametrize('factory_cls', [FlaskTestClientFactory, WebTestClientFactory])
+def test_extraction_cache(factory_cls):
+    crawlers = [
+        Crawler(
+            client=factory_cls(create_repetitive_app()).get_client(),
+            initial_paths=['/'],
+            rules=[Rule(ANCHOR, '/.*', GET, Request()), Rule(FORM, '.*', GET, Request())],
+            extraction_cache_size=extraction_cache_size,
+        )
+        for extraction_cache_size in (0, 256)
+    ]
+    for crawler in crawlers:
+        crawler.crawl()
+    (uncached_crawler, crawler) = crawlers
+
+    # '/', '/a' and '/b' share a body, as do '/c', '/d' and their forms' submissions
+    assert uncached_crawler.extraction_cache is None
+    assert (crawler.extraction_cache.hits, crawler.extraction_cache.misses) == (5, 2)
+    assert ('GET', '/d', 'x') in crawler.graph.map
+    assert list(crawler.graph.map) == list(uncached_crawler.graph.map)
+    assert [(a.id, b.id) for (a, b) in crawler.graph.edges()] == [
+        (a.id, b.id) for (a, b) in uncached_crawler.graph.edges()
+    ]
+
+
 def test_inclusion(app, client):
     wanted_urls = {'/', '/page-a'}
     crawler = Crawler(
@@ -381,6 +524,200 @@ def test_capture_exceptions(app, client, capfd):
         assert f"Exception: Instructed to fail at {path}" in out
 
 
+def test_low_memory(app, client, capfd):
+    app.config['FAILURE_PATHS'] = {'/page-c'}
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + SUBMIT_GET_FORMS_RULE_SET,
+        low_memory=True,
+        max_errors=1,
+    )
+    with pytest.raises(AssertionError, match="Encountered 2 exception"):
+        crawler.crawl()
+    assert crawler.error_count == 2
+    assert len(crawler.tracebacks) == 1
+
+    # params are dropped once processed, but identities are kept
+    (form_node,) = [node for node in crawler.graph.get_nodes_by_source(FORM) if node.requested]
+    assert form_node.params == {}
+    assert len(form_node.id) > 2
+    root = crawler.graph.get_nodes_by_path('/')[0]
+    children = crawler.graph.adj[root.id]
+    assert len(children) == len({child.id for child in children})
+
+    out, err = capfd.readouterr()
+    # errors beyond max_errors are still grouped
+    assert "Summary of 2 error(s), in 1 group(s)" in out
+    assert [group.count for group in crawler.errors] == [2]
+    assert "Peak memory: " in out
+
+
+def test_low_memory_options():
+    with pytest.raises(ValueError):
+        Crawler(client=flask.Flask(__name__).test_client(), max_errors=-1)
+    with pytest.raises(ValueError):
+        Crawler(client=flask.Flask(__name__).test_client(), checkpoint_path='crawl.sqlite', track_edges=False)
+
+
+def test_every_traceback_kept_by_default():
+    failing_app = flask.Flask(__name__)
+
+    @failing_app.route('/')
+    def index():
+        return ' '.join(f'<a href="/missing/{i}">{i}</a>' for i in range(150))
+
+    def crawl(**kwargs):
+        crawler = Crawler(
+            client=failing_app.test_client(),
+            initial_paths=['/'],
+            rules=[Rule(ANCHOR, '/.*', GET, Request())],
+            output_summary=False,
+            **kwargs,
+        )
+        with pytest.raises(AssertionError, match="Encountered 150 exception"):
+            crawler.crawl()
+        return crawler
+
+    assert len(crawl().tracebacks) == 150
+    assert len(crawl(low_memory=True).tracebacks) == 100
+    assert len(crawl(low_memory=True, max_errors=120).tracebacks) == 120
+
+
+def test_http_status_errors_grouped_by_status_code(capfd):
+    status_app = flask.Flask(__name__)
+
+    @status_app.route('/')
+    def index():
+        paths = [f'/missing/{i}' for i in range(10)] + ['/gone', '/broken']
+        return ' '.join(f'<a href="{path}">{path}</a>' for path in paths)
+
+    @status_app.route('/gone')
+    def gone():
+        flask.abort(410)
+
+    @status_app.route('/broken')
+    def broken():
+        flask.abort(500)
+
+    crawler = Crawler(
+        client=status_app.test_client(),
+        initial_paths=['/'],
+        rules=[Rule(ANCHOR, '/.*', GET, Request())],
+        max_errors=2,
+    )
+    with pytest.raises(AssertionError, match="Encountered 12 exception"):
+        crawler.crawl()
+    assert len(crawler.tracebacks) == 2
+    assert sorted((group.exc.status_code, group.count) for group in crawler.errors) == [(404, 10), (410, 1), (500, 1)]
+
+    out, err = capfd.readouterr()
+    assert "Summary of 12 error(s), in 3 group(s)" in out
+    assert "10 x HttpStatusError (404)" in out
+    assert "GET /broken => python_testing_crawler.exn.HttpStatusError: 500" in out
+    assert "GET /gone => python_testing_crawler.exn.HttpStatusError: 410" in out
+
+
+def create_download_app(served):
+    download_app = flask.Flask(__name__)
+
+    @download_app.route('/')
+    def index():
+        return '<a href="/export.csv">Export</a> <a href="/report">Report</a>'
+
+    @download_app.route('/export.csv')
+    def export():
+        def rows():
+            for i in range(100):
+                served.append(i)
+                yield f"{i},row\n"
+        return flask.Response(rows(), mimetype='text/csv')
+
+    @download_app.route('/report')
+    def report():
+        return '<a href="/never">Never</a>'
+
+    return download_app
+
+
+DOWNLOAD_RULES = [
+    Rule(ANCHOR, '.*', GET, Request()),
+    Rule(ANCHOR, '/report', GET, Request(only=True)),
+]
+
+
+class RecordResponses:
+
+    def __init__(self):
+        self.responses = {}
+
+    def request_finished(self, node, response):
+        self.responses[node.path] = response
+
+
+def test_responses_not_extracted_are_discarded():
+    served = []
+    recorder = RecordResponses()
+    crawler = Crawler(
+        client=create_download_app(served).test_client(),
+        initial_paths=['/'],
+        rules=DOWNLOAD_RULES,
+        listeners=[recorder],
+    )
+    crawler.crawl()
+    assert served == list(range(100))
+    export = crawler.graph.get_nodes_by_path('/export.csv')[0]
+    assert export.response_size == sum(len(f"{i},row\n") for i in range(100))
+    assert recorder.responses['/export.csv'].discarded_length == export.response_size
+    assert recorder.responses['/export.csv'].data == b''
+    assert recorder.responses['/report'].discarded_length > 0
+    assert '/never' not in crawler.graph.encountered_paths
+    assert getattr(recorder.responses['/'], 'discarded_length', None) is None
+
+
+def test_responses_kept_for_check_response_handlers():
+    recorder = RecordResponses()
+    crawler = Crawler(
+        client=create_download_app([]).test_client(),
+        initial_paths=['/'],
+        rules=DOWNLOAD_RULES,
+        listeners=[recorder],
+        check_response_handlers=[lambda node, response: response.data is not None],
+    )
+    crawler.crawl()
+    assert recorder.responses['/export.csv'].data.startswith(b"0,row\n1,row\n")
+
+
+def test_budgets(app, client):
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + [
+            Rule(ANCHOR, '/.*', GET, MaxResponseBytes(10 ** 6)),
+            Rule(ANCHOR, '/page-a', GET, MaxResponseBytes(10)),
+            Rule(ANCHOR, '/.*', GET, MaxLatency(60 * 1000)),
+        ],
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+    assert len(crawler.tracebacks) == 1
+    node, exc, _ = crawler.tracebacks[0]
+    assert node.path == '/page-a'
+    assert isinstance(exc, BudgetExceededError)
+    assert exc.measured == node.response_size
+    assert str(exc) == f"MaxResponseBytes: {node.response_size} bytes exceeds 10 bytes"
+
+
+def test_max_queries_needs_query_counting_client(app, client):
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + [Rule(ANCHOR, '/.*', GET, MaxQueries(10))],
+    )
+    with pytest.raises(ValueError):
+        crawler.crawl()
+
+
 def test_check_response_handler_positive_case(app, client):
     def only_page_a_recommends(node, response):
         return (
@@ -408,3 +745,48 @@ def test_check_response_handler_negative_case(app, client):
     )
     with pytest.raises(UnexpectedResponseError):
         crawler.crawl()
+
+
+def test_crawl_all_concurrently(app, client_factory):
+    crawler = Crawler(
+        client_factory=client_factory,
+        workers=4,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + SUBMIT_GET_FORMS_RULE_SET + SUBMIT_POST_FORMS_RULE_SET,
+    )
+    crawler.crawl()
+    assert DIRECTLY_ACCESSIBLE_URLS <= crawler.graph.visited_paths
+    assert '/form-submitted-by-get-onward-link' in crawler.graph.visited_paths
+    assert '/form-submitted-by-post-onward-link' in crawler.graph.visited_paths
+    assert crawler.graph.get_nodes_by_path('/abort/with/500')[0].status_code == 500
+
+
+def test_capture_exceptions_concurrently(app, client_factory, capfd):
+    failure_paths = {'/page-c', '/page-d'}
+    app.config['FAILURE_PATHS'] = failure_paths
+    crawler = Crawler(
+        client_factory=client_factory,
+        workers=4,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+    assert {node.path.split('?')[0] for (node, exc, tb) in crawler.tracebacks} == failure_paths
+    assert {'/', '/page-a', '/page-b', '/page-gallery'} <= crawler.graph.visited_paths
+
+
+def test_fail_fast_concurrently(app, client_factory):
+    crawler = Crawler(
+        client_factory=client_factory,
+        workers=4,
+        initial_paths=['/'],
+        capture_exceptions=False,
+        rules=[
+            Rule(ANCHOR, ".*", GET, Request()),
+            Rule(ANCHOR, ".*", GET, Allow([500]))
+        ]
+    )
+    with pytest.raises(HttpStatusError) as excinfo:
+        crawler.crawl()
+    assert excinfo.value.status_code == 400
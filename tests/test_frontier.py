@@ -0,0 +1,59 @@
+import pytest
+
+from python_testing_crawler.frontier import (
+    BestFirstFrontier, BreadthFirstFrontier, DepthFirstFrontier, SynchronizedFrontier, get_frontier
+)
+from python_testing_crawler.routes import RouteTemplates
+from python_testing_crawler.graph import Node
+from python_testing_crawler.constants import POST
+
+
+def drain(frontier):
+    paths = []
+    while not frontier.empty():
+        node = frontier.get()
+        paths.append((node.method, node.path))
+    return paths
+
+
+def fill(frontier):
+    for (path, method, depth) in [
+        ('/posts/1', 'GET', 1),
+        ('/posts/2', 'GET', 1),
+        ('/form', POST, 1),
+        ('/about', 'GET', 2),
+        ('/form', 'GET', 1),
+    ]:
+        frontier.put(Node(path=path, method=method, depth=depth))
+    return frontier
+
+
+def test_breadth_first():
+    frontier = fill(BreadthFirstFrontier(RouteTemplates()))
+    assert len(frontier) == 5
+    assert [path for (_, path) in drain(frontier)] == ['/posts/1', '/posts/2', '/form', '/about', '/form']
+
+
+def test_depth_first():
+    frontier = fill(DepthFirstFrontier(RouteTemplates()))
+    assert [path for (_, path) in drain(frontier)] == ['/form', '/about', '/form', '/posts/2', '/posts/1']
+
+
+def test_best_first_prefers_unseen_templates_then_shallow_then_get():
+    frontier = fill(BestFirstFrontier(RouteTemplates()))
+    assert drain(frontier) == [
+        ('GET', '/posts/1'),
+        ('GET', '/form'),
+        (POST, '/form'),
+        ('GET', '/about'),
+        ('GET', '/posts/2'),
+    ]
+
+
+def test_get_frontier():
+    assert isinstance(get_frontier(None, RouteTemplates()), BreadthFirstFrontier)
+    frontier = get_frontier('best-first', RouteTemplates(), synchronized=True)
+    assert isinstance(frontier, SynchronizedFrontier)
+    assert isinstance(frontier.frontier, BestFirstFrontier)
+    with pytest.raises(ValueError):
+        get_frontier('random', RouteTemplates())
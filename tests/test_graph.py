@@ -0,0 +1,228 @@
+import pickle
+import re
+from time import perf_counter
+
+import pytest
+
+from python_testing_crawler.graph import CompactDirectedGraph, DirectedGraph, Node, literal_prefix
+from python_testing_crawler.constants import ANCHOR, FORM, LINK
+from python_testing_crawler.constants import POST
+
+
+@pytest.fixture(params=[DirectedGraph, CompactDirectedGraph])
+def graph(request):
+    graph = request.param()
+    for i in range(20):
+        graph.add_node(Node(path=f'/posts/{i}', source=ANCHOR))
+        graph.add_node(Node(path=f'/users/{i}/edit', source=FORM, method=POST, params={'id': str(i)}))
+    graph.add_node(Node(path='/style.css', source=LINK))
+    graph.add_node(Node(path='/', source=None))
+    return graph
+
+
+def brute_force(graph, attr, pattern):
+    return [node for node in graph.map.values() if re.match(pattern, getattr(node, attr) or "")]
+
+
+@pytest.mark.parametrize('pattern', [
+    '/posts/1', '^/posts/1$', r'/posts/\d$', '/users/.*/edit', '/user?s', '.*css', '/', '', '/posts|/users',
+])
+def test_path_pattern_matches_linear_scan(graph, pattern):
+    assert graph.get_nodes_by_path_pattern(pattern) == brute_force(graph, 'path', pattern)
+
+
+@pytest.mark.parametrize('pattern', ['a', 'f.*', '.*', '^$', 'link|form'])
+def test_source_pattern_matches_linear_scan(graph, pattern):
+    assert graph.get_nodes_by_source_pattern(pattern) == brute_force(graph, 'source', pattern)
+
+
+def test_lookup_by_path_and_source(graph):
+    assert [node.path for node in graph.get_nodes_by_path('/posts/3')] == ['/posts/3']
+    assert len(graph.get_nodes_by_source(FORM)) == 20
+    assert graph.get_nodes_by_source(None)[0].path == '/'
+    assert graph.get_nodes_by_path('/missing') == []
+
+
+def test_visited_paths_follow_requested_transitions(graph):
+    assert len(graph.encountered_paths) == 42
+    assert graph.visited_paths == set()
+    node = graph.get_nodes_by_path('/posts/1')[0]
+    node.requested = True
+    assert graph.visited_paths == {'/posts/1'}
+    node.requested = False
+    assert graph.visited_paths == set()
+
+
+def test_path_sets_are_snapshots(graph):
+    visited_paths = graph.visited_paths
+    with pytest.raises(AttributeError):
+        visited_paths.add('/posts/1')
+    graph.get_nodes_by_path('/posts/1')[0].requested = True
+    assert visited_paths == set()
+    assert graph.visited_paths == {'/posts/1'}
+    with pytest.raises(AttributeError):
+        graph.encountered_paths.discard('/posts/1')
+    assert '/posts/1' in graph.encountered_paths
+
+
+def test_re_adding_node_replaces_index_entries(graph):
+    old_node = graph.get_nodes_by_path('/posts/1')[0]
+    new_node = Node(path='/posts/1', source=ANCHOR, requested=True)
+    graph.add_node(new_node)
+    assert graph.get_nodes_by_path('/posts/1') == [new_node]
+    assert graph.get_nodes_by_path('/posts/1')[0] is new_node
+    assert graph.visited_paths == {'/posts/1'}
+    old_node.requested = True  # no longer indexed
+    assert graph.get_nodes_by_path('/posts/1')[0] is new_node
+
+
+def test_path_pattern_sees_nodes_added_after_a_lookup(graph):
+    assert len(graph.get_nodes_by_path_pattern('/posts/')) == 20
+    graph.add_node(Node(path='/posts/new', source=ANCHOR))
+    graph.add_node(Node(path='/posts/1', source=FORM, method=POST))
+    assert len(graph.get_nodes_by_path_pattern('/posts/')) == 22
+    assert graph.get_nodes_by_path_pattern('/posts/new') == graph.get_nodes_by_path('/posts/new')
+
+
+def test_adding_nodes_scales_linearly():
+    def seconds_per_node(count):
+        # paths in descending order, the worst case for a sorted index kept on every add
+        nodes = [Node(path=f'/{i:07d}') for i in reversed(range(count))]
+        timings = []
+        for _ in range(3):
+            graph = DirectedGraph()
+            start = perf_counter()
+            for node in nodes:
+                graph.add_node(node)
+            timings.append(perf_counter() - start)
+        return min(timings) / count
+
+    assert seconds_per_node(100000) < 3 * seconds_per_node(5000)
+
+
+def test_compact_edges_are_deduplicated():
+    graph = CompactDirectedGraph()
+    parent, child, other = Node(path='/'), Node(path='/a'), Node(path='/b')
+    for node in (parent, child, other):
+        graph.add_node(node)
+    for _ in range(3):
+        graph.add_edge(parent, child)
+    graph.add_edge(parent, other)
+    assert graph.adj[parent.id] == [child, other]
+    assert graph.adj.get(child.id) == []
+    assert list(graph.adj) == [parent.id]
+
+    # still deduplicated when edges from other nodes come in between
+    graph.add_edge(other, child)
+    graph.add_edge(parent, other)
+    graph.freeze()
+    graph.add_edge(parent, child)
+    assert graph.adj[parent.id] == [child, other]
+    assert graph.adj[other.id] == [child]
+
+    # a re-added node keeps its edges from others, but loses its own
+    new_child = Node(path='/a', requested=True)
+    graph.add_node(new_child)
+    assert graph.adj[parent.id][0] is new_child
+    new_parent = Node(path='/')
+    graph.add_node(new_parent)
+    assert graph.adj[parent.id] == []
+    graph.add_edge(new_parent, new_child)
+    assert graph.adj[parent.id] == [new_child]
+
+
+@pytest.mark.parametrize('freeze', [False, True])
+def test_compact_graph_edges_match(freeze):
+    graphs = [DirectedGraph(), CompactDirectedGraph()]
+    nodes = [Node(path=f'/{i}') for i in range(10)]
+    for graph in graphs:
+        for node in nodes:
+            graph.add_node(node)
+        for i in range(10):
+            graph.add_edge(nodes[i], nodes[(i * 3) % 10])
+            graph.add_edge(nodes[i], nodes[(i + 1) % 10])
+        if freeze:
+            graph.freeze()
+    graph, compact_graph = graphs
+    assert [(a.id, b.id) for (a, b) in compact_graph.edges()] == [(a.id, b.id) for (a, b) in graph.edges()]
+    for node in nodes:
+        assert compact_graph.adj[node.id] == graph.adj[node.id]
+        assert compact_graph.node_at(compact_graph.index_of(node.id)) is node
+    assert compact_graph.frozen == freeze
+    assert len(compact_graph.adj) == 10
+
+
+def test_compact_graph_thaws_when_added_to():
+    graph = CompactDirectedGraph()
+    a, b, c = Node(path='/a'), Node(path='/b'), Node(path='/c')
+    graph.add_node(a)
+    graph.add_node(b)
+    graph.add_edge(a, b)
+    graph.freeze()
+    assert graph.frozen and graph.adj[a.id] == [b]
+    graph.add_node(c)
+    assert graph.frozen and graph.adj[c.id] == []
+    graph.add_edge(c, a)
+    assert not graph.frozen
+    assert graph.adj[a.id] == [b] and graph.adj[c.id] == [a]
+
+
+def test_edges_not_tracked():
+    for graph in (DirectedGraph(track_edges=False), CompactDirectedGraph(track_edges=False)):
+        parent, child = Node(path='/'), Node(path='/a')
+        graph.add_node(parent)
+        graph.add_node(child)
+        graph.add_edge(parent, child)
+        assert graph.adj.get(parent.id, []) == []
+        assert list(graph.edges()) == []
+
+
+def test_to_networkx(graph):
+    networkx = pytest.importorskip('networkx')
+    a, b = graph.get_nodes_by_path('/posts/1')[0], graph.get_nodes_by_path('/posts/2')[0]
+    graph.add_edge(a, b)
+    graph.freeze()
+    digraph = graph.to_networkx()
+    assert isinstance(digraph, networkx.DiGraph)
+    assert digraph.number_of_nodes() == len(graph.map)
+    assert list(digraph.edges()) == [(a.id, b.id)]
+    assert digraph.nodes[a.id]['node'] is a
+
+
+@pytest.mark.parametrize('pattern, prefix', [
+    ('/posts/.*', '/posts/'),
+    ('^/posts$', '/posts'),
+    ('/posts?', '/post'),
+    (r'/a\.b', '/a.b'),
+    (r'/\d+', '/'),
+    ('a|b', ''),
+    ('(?i)/posts', ''),
+])
+def test_literal_prefix(pattern, prefix):
+    assert literal_prefix(pattern) == prefix
+
+
+def test_node_id_fixed_at_construction():
+    node = Node(path='/form', method='post', params={'a': '1', 'csrf': 'x'}, ignore_form_fields={'csrf'})
+    assert node.method == POST
+    assert node.id == (POST, '/form', '1')
+    node.params = {}
+    assert node.id == (POST, '/form', '1')
+
+
+def test_node_is_compact():
+    node = Node(path='/page', source=ANCHOR)
+    assert not hasattr(node, '__dict__')
+    assert node.path is Node(path=''.join(['/pa', 'ge'])).path
+    assert node.ignore_form_fields is Node(path='/other').ignore_form_fields
+
+
+def test_node_equality_and_pickling(graph):
+    node = graph.get_nodes_by_path('/posts/1')[0]
+    node.requested = True
+    copied = pickle.loads(pickle.dumps(node))
+    assert copied == node
+    assert copied.id == node.id
+    assert copied.requested
+    assert copied._graph is None
+    assert node != Node(path='/posts/1', source=ANCHOR)
@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+
+import flask
+import pytest
+import webtest
+
+from tests.webapps.asgi.app import create_app as create_asgi_app
+from tests.webapps.flask.app import create_app as create_flask_app
+
+from python_testing_crawler import AsyncCrawler, Crawler, Rule, Request
+from python_testing_crawler.clients import AsgiClient, FlaskClientWrapper, WebTestClientWrapper
+from python_testing_crawler.constants import FORM, HREF, SRC
+from python_testing_crawler.constants import POST
+from .example_rules import PERMISSIVE_HYPERLINKS_ONLY_RULE_SET, SUBMIT_GET_FORMS_RULE_SET
+
+
+@pytest.fixture
+def crawl_cache_path(tmp_path):
+    return str(tmp_path / 'crawl-cache.sqlite')
+
+
+def crawl_asgi(app, crawl_cache_path):
+    crawler = AsyncCrawler(
+        client=AsgiClient(app),
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + [Rule(FORM, '.*', POST, Request())],
+        crawl_cache_path=crawl_cache_path,
+        extraction_cache_size=0,
+    )
+    crawler.crawl()
+    return crawler
+
+
+def test_conditional_requests_reuse_cached_children(crawl_cache_path):
+    app = create_asgi_app(etags=True)
+    first_crawler = crawl_asgi(app, crawl_cache_path)
+    assert first_crawler.crawl_cache.modified == len(first_crawler.graph.visited_paths) - 1
+    assert first_crawler.crawl_cache.not_modified == 0
+
+    second_crawler = crawl_asgi(app, crawl_cache_path)
+    assert second_crawler.crawl_cache.modified == 0
+    assert second_crawler.crawl_cache.unchanged == 1  # the POSTed form, not sent conditionally
+    assert second_crawler.crawl_cache.not_modified == first_crawler.crawl_cache.modified - 1
+    assert set(second_crawler.graph.map) == set(first_crawler.graph.map)
+    assert second_crawler.graph.visited_paths == first_crawler.graph.visited_paths
+    assert second_crawler.graph.get_nodes_by_path('/page-a')[0].status_code == 304
+
+
+def test_unchanged_bodies_reuse_cached_children(crawl_cache_path):
+    def crawl():
+        app = create_flask_app()
+        app.config['TESTING'] = True
+        crawler = Crawler(
+            client=app.test_client(),
+            initial_paths=['/'],
+            rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + SUBMIT_GET_FORMS_RULE_SET,
+            crawl_cache_path=crawl_cache_path,
+        )
+        crawler.crawl()
+        return crawler
+
+    first_crawler = crawl()
+    second_crawler = crawl()
+    assert first_crawler.crawl_cache.unchanged == 0
+    assert second_crawler.crawl_cache.modified == 0
+    assert second_crawler.crawl_cache.unchanged == first_crawler.crawl_cache.modified
+    assert set(second_crawler.graph.map) == set(first_crawler.graph.map)
+    assert second_crawler.graph.visited_paths == first_crawler.graph.visited_paths
+
+
+def test_changed_extraction_settings_discard_cached_children(crawl_cache_path):
+    def crawl(**kwargs):
+        app = create_flask_app()
+        app.config['TESTING'] = True
+        crawler = Crawler(
+            client=app.test_client(),
+            initial_paths=['/'],
+            rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+            crawl_cache_path=crawl_cache_path,
+            **kwargs,
+        )
+        crawler.crawl()
+        return crawler
+
+    crawl(path_attrs=(HREF,))
+    crawler = crawl(path_attrs=(HREF, SRC))
+    assert crawler.crawl_cache.unchanged == 0
+    assert '/image.png' in crawler.graph.encountered_paths
+
+    crawler = crawl(path_attrs=(HREF, SRC))
+    assert crawler.crawl_cache.modified == 0
+    assert '/image.png' in crawler.graph.encountered_paths
+
+    crawler = crawl(path_attrs=(HREF, SRC), parser='lxml')
+    assert crawler.crawl_cache.unchanged == 0
+
+
+def create_conditional_app():
+    conditional_app = flask.Flask(__name__)
+
+    @conditional_app.route('/')
+    def index():
+        response = flask.make_response('<a href="/">Home</a>')
+        response.set_etag('v1')
+        response.last_modified = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        return response.make_conditional(flask.request)
+
+    return conditional_app
+
+
+@pytest.mark.parametrize('make_wrapper, get_kwargs', [
+    (lambda app: FlaskClientWrapper(app.test_client()), {}),
+    (lambda app: FlaskClientWrapper(app.test_client()), {'keep_content': lambda response: True}),
+    (lambda app: WebTestClientWrapper(webtest.TestApp(app)), {}),
+])
+def test_conditional_get_round_trip(make_wrapper, get_kwargs):
+    wrapper = make_wrapper(create_conditional_app())
+    response = wrapper.get('/', **get_kwargs)
+    assert response.status_code == 200
+    validators = [
+        {'If-None-Match': wrapper.get_header(response, 'ETag')},
+        {'If-Modified-Since': wrapper.get_header(response, 'Last-Modified')},
+    ]
+    for headers in validators:
+        assert wrapper.get('/', headers=headers, **get_kwargs).status_code == 304
@@ -0,0 +1,171 @@
+import pytest
+
+from python_testing_crawler import Crawler
+from python_testing_crawler.clients import DummyClient
+from python_testing_crawler.parsers import PARSERS, SoupParser, StreamingParser
+from python_testing_crawler.parsers import compile_css_selectors, get_parser
+from python_testing_crawler.constants import FORM, HREF, SRC
+
+
+DOCUMENT = """<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Conformance &amp; friends</title>
+  <link href="/style.css" rel="stylesheet">
+  <script src="/app.js"></script>
+</head>
+<body>
+  <ul>
+    <li><A HrEf="/page-a" class="menu">Page A</A></li>
+    <li><a href="/page-b#section">Page B</a></li>
+    <li><a href="/search?q=caf&eacute;&amp;page=2">Search</a></li>
+    <li><a href="">Empty</a></li>
+    <li><a name="anchor-only">No href</a></li>
+    <li><a href="https://example.com/">External</a></li>
+  </ul>
+  <img src="/image.png" alt="image">
+  <map name="map">
+    <area shape="rect" coords="0,0,1,1" href="/image-map-target">
+  </map>
+  <form action="/search" method="get" id="form-get">
+    <div><input type="text" name="q" value="default"></div>
+    <input type="hidden" name="token" value="abc">
+    <input type="submit" value="Go">
+    <a href="/inside-form">Inside</a>
+  </form>
+  <form method="post">
+    <input name="empty">
+    <input name="flag" value>
+    <input name="dup" value="first">
+    <input name="dup" value="second">
+    <textarea name="ignored"></textarea>
+  </form>
+  <p>Caf&eacute; &lt;a href="/not-a-link"&gt;</p>
+</body>
+</html>
+"""
+
+
+# malformed documents, with the forms and links found by "html.parser" and,
+# where it recovers differently, by lxml
+MALFORMED_DOCUMENTS = {
+    'nested forms': (
+        '<form action="/outer"><input name="a" value="1">'
+        '<form action="/inner"><input name="b" value="2"></form>'
+        '<input name="c" value="3"></form>',
+        [('/outer', {'a': '1', 'b': '2', 'c': '3'}), ('/inner', {'b': '2'})],
+        [('/outer', {'a': '1'}), ('/inner', {'b': '2'})],
+    ),
+    'misnested form': (
+        '<p><form action="/form"><input name="a" value="1"></p>'
+        '<input name="b" value="2"></form><input name="c" value="3">',
+        [('/form', {'a': '1'})],
+        [('/form', {'a': '1', 'b': '2'})],
+    ),
+    'unclosed forms': (
+        '<form action="/first"><input name="a" value="1"><form action="/second"><input name="b" value="2">',
+        [('/first', {'a': '1', 'b': '2'}), ('/second', {'b': '2'})],
+        [('/first', {'a': '1'}), ('/second', {'b': '2'})],
+    ),
+    'stray end tags': (
+        '</form><form action="/form"><input name="a" value="1"></form></form><input name="b" value="2">',
+        [('/form', {'a': '1'})],
+        None,
+    ),
+    'duplicate attributes': (
+        '<a href="/first" href="/second">Link</a>'
+        '<form action="/first" action="/second"><input name="a" value="1" value="2"></form>',
+        [('/second', {}), ('/second', {'a': '2'})],
+        [('/first', {}), ('/first', {'a': '1'})],
+    ),
+    'markup in a textarea': (
+        '<form action="/form"><textarea name="t"><input name="a" value="1"><a href="/link">Link</a></textarea>'
+        '<input name="b" value="2"></form>',
+        [('/form', {'a': '1', 'b': '2'}), ('/link', {})],
+        [('/form', {'b': '2'})],
+    ),
+}
+
+
+def available_parsers():
+    for name in PARSERS:
+        try:
+            get_parser(name)
+        except ValueError:
+            continue
+        yield name
+
+
+def describe(nodes):
+    return [
+        (node.source, node.method, node.path, node.params, node.ignore_form_fields)
+        for node in nodes
+    ]
+
+
+@pytest.mark.parametrize('name', list(available_parsers()))
+@pytest.mark.parametrize('content', [DOCUMENT, DOCUMENT.encode('utf-8')])
+def test_parsers_conform(name, content):
+    expected = describe(SoupParser().extract_nodes(
+        content, '/page', (HREF, SRC), ignore_form_fields={'token'}
+    ))
+    assert expected
+    actual = describe(get_parser(name).extract_nodes(
+        content, '/page', (HREF, SRC), ignore_form_fields={'token'}
+    ))
+    assert actual == expected
+
+
+@pytest.mark.parametrize('name', list(available_parsers()))
+@pytest.mark.parametrize('case', list(MALFORMED_DOCUMENTS))
+def test_parsers_recover_from_malformed_documents(name, case):
+    document, expected, lxml_expected = MALFORMED_DOCUMENTS[case]
+    if name == 'lxml' and lxml_expected is not None:
+        expected = lxml_expected
+    nodes = get_parser(name).extract_nodes(document, '/page', (HREF,))
+    assert [(node.path, node.params) for node in nodes] == expected
+
+
+@pytest.mark.parametrize('name', list(available_parsers()))
+def test_parsers_conform_on_links_or_forms_only(name):
+    parser = get_parser(name)
+    links = describe(parser.extract_nodes(DOCUMENT, '/page', (HREF,), forms=False))
+    forms = describe(parser.extract_nodes(DOCUMENT, '/page', (HREF,), links=False))
+    assert links == describe(SoupParser().extract_nodes(DOCUMENT, '/page', (HREF,), forms=False))
+    assert forms == describe(SoupParser().extract_nodes(DOCUMENT, '/page', (HREF,), links=False))
+
+
+def test_streaming_parser_yields_across_chunks():
+    parser = StreamingParser()
+    parser.chunk_size = 7
+    assert describe(parser.extract_nodes(DOCUMENT, '/page', (HREF, SRC))) == \
+        describe(SoupParser().extract_nodes(DOCUMENT, '/page', (HREF, SRC)))
+
+
+def test_unknown_parser():
+    with pytest.raises(ValueError):
+        Crawler(client=DummyClient(), parser='nonesuch')
+
+
+def test_streaming_parser_rejects_css_selectors():
+    with pytest.raises(ValueError):
+        Crawler(client=DummyClient(), parser='stream', ignore_css_selectors=['a.class'])
+
+
+def test_ignore_selector_prunes_subtrees():
+    ignore_selector = compile_css_selectors(['ul', 'form#form-get'])
+    nodes = describe(SoupParser().extract_nodes(
+        DOCUMENT, '/page', (HREF,), ignore_selector=ignore_selector
+    ))
+    paths = [path for (source, method, path, params, fields) in nodes]
+    assert '/page-a' not in paths  # inside the ignored list
+    assert '/inside-form' not in paths  # inside the ignored form
+    assert '/search' not in paths
+    assert '/image-map-target' in paths
+    assert [source for (source, *_) in nodes].count(FORM) == 1
+
+
+def test_compile_css_selectors():
+    assert compile_css_selectors([]) is None
+    assert compile_css_selectors(['a.class', 'form#id']).pattern == 'a.class, form#id'
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from python_testing_crawler import Crawler
+from python_testing_crawler.graph import Node
+from python_testing_crawler.results import ResultsWriter, read_results, results_summary
+
+from tests.webapps.flask.app import create_app
+from .example_rules import PERMISSIVE_HYPERLINKS_ONLY_RULE_SET
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['FAILURE_PATHS'] = {'/page-c'}
+    return app.test_client()
+
+
+def test_results_written_per_processed_node(client, tmp_path):
+    results_path = tmp_path / 'results.jsonl'
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        results_path=str(results_path),
+        output_summary=False,
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+
+    results = list(read_results(str(results_path)))
+    assert [result['path'] for result in results][0] == '/'
+    assert {result['path'] for result in results} == crawler.graph.visited_paths
+    by_path = {result['path']: result for result in results}
+    assert by_path['/']['status_code'] == 200
+    assert by_path['/']['wall_time'] > 0
+    assert by_path['/']['response_size'] > 0
+    assert by_path['/abort/with/500']['status_code'] == 500
+    assert by_path['/page-c']['error'] == 'Exception'
+    assert by_path['/page-c']['message'] == 'Instructed to fail at /page-c'
+    assert by_path['/page-a']['error'] is None
+
+
+def test_results_summary(client, tmp_path):
+    results_path = str(tmp_path / 'results.jsonl')
+    crawler = Crawler(
+        client=client,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        results_path=results_path,
+        output_summary=False,
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+
+    text = "\n".join(results_summary(results_path, size=3))
+    assert f"Processed {len(crawler.graph.visited_paths)} endpoints." in text
+    assert "500 x1" in text
+    assert "Slowest 3 endpoint(s)" in text
+    assert f"Summary of {len(crawler.tracebacks)} error(s)" in text
+    assert "GET /page-c => Exception: Instructed to fail at /page-c" in text
+
+
+def test_writer_buffers_until_flush_interval(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    writer = ResultsWriter(str(path), flush_interval=3600)
+    writer.open()
+    writer.node_processed(Node(path='/not-requested'))
+    writer.node_processed(Node(path='/', params={'q': 'x'}, requested=True, status_code=200))
+    assert path.read_text() == ""
+    writer.close()
+    (line,) = path.read_text().splitlines()
+    assert json.loads(line)['params'] == {'q': 'x'}
+    assert writer.count == 1
+
+    # appending carries on from earlier results
+    writer.open(append=True)
+    writer.write(Node(path='/more', requested=True), ValueError("bad"))
+    writer.close()
+    results = list(read_results(str(path)))
+    assert [(result['path'], result['error']) for result in results] == [('/', None), ('/more', 'ValueError')]
@@ -0,0 +1,49 @@
+import pytest
+
+from python_testing_crawler.routes import RouteSampler, RouteTemplates
+from python_testing_crawler.graph import Node
+from python_testing_crawler.constants import ANCHOR, FORM
+from python_testing_crawler.constants import POST
+
+
+@pytest.mark.parametrize('path, template', [
+    ('/posts/42', '/posts/{int}'),
+    ('/posts/42/comments/-1', '/posts/{int}/comments/{int}'),
+    ('/users/123e4567-e89b-12d3-a456-426614174000', '/users/{uuid}'),
+    ('/files/0123456789abcdef0123', '/files/{hex}'),
+    ('/blog/2020-01-31/post-42', '/blog/{slug}/{slug}'),
+    ('/about-us', '/about-us'),
+    ('/list?page=3&sort=name', '/list?page={int}&sort=name'),
+    ('/list?sort=name&page=3&flag', '/list?flag&page={int}&sort=name'),
+    ('http://example.com/posts/7', 'http://example.com/posts/{int}'),
+    ('/', '/'),
+])
+def test_inferred_templates(path, template):
+    assert RouteTemplates().template_of(path) == template
+
+
+def test_explicit_templates_tried_first():
+    route_templates = RouteTemplates(['/users/{name}', '/users/{name}/posts/{id}'])
+    assert route_templates.template_of('/users/alice') == '/users/{name}'
+    assert route_templates.template_of('/users/bob/posts/about?page=2') == '/users/{name}/posts/{id}?page={int}'
+    assert route_templates.template_of('/users/bob/settings') == '/users/bob/settings'
+
+
+def test_sampler_admits_first_n_per_method_and_template():
+    sampler = RouteSampler(2, RouteTemplates())
+    admitted = [
+        sampler.sample(Node(path=path, method=method, source=source))
+        for (path, method, source) in [
+            ('/posts/1', 'GET', ANCHOR),
+            ('/posts/2', 'GET', ANCHOR),
+            ('/posts/3', 'GET', ANCHOR),
+            ('/posts/3', POST, FORM),
+            ('/posts/4?page=1', 'GET', ANCHOR),
+        ]
+    ]
+    assert admitted == [True, True, False, True, True]
+
+
+def test_sampler_needs_a_sample():
+    with pytest.raises(ValueError):
+        RouteSampler(0, RouteTemplates())
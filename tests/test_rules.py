@@ -0,0 +1,70 @@
+from python_testing_crawler.rules import Rule, RuleSet, Request, Ignore, Allow
+from python_testing_crawler.rules import MaxLatency, MaxQueries, MaxResponseBytes
+from python_testing_crawler.graph import Node
+from python_testing_crawler.constants import ANCHOR, FORM
+from python_testing_crawler.constants import GET, POST
+
+
+def test_last_matching_rule_wins():
+    rule_set = RuleSet([
+        Rule(ANCHOR, '/.*', GET, Request()),
+        Rule(ANCHOR, '/private.*', GET, Ignore()),
+        Rule(ANCHOR, '/private/ok', GET, Request(only=True)),
+    ])
+    assert isinstance(rule_set.match(Node(path='/page', source=ANCHOR)).process.action, Request)
+    assert isinstance(rule_set.match(Node(path='/private/x', source=ANCHOR)).process.action, Ignore)
+    match = rule_set.match(Node(path='/private/ok', source=ANCHOR))
+    assert match.process.action.only
+    assert match.request is match.process
+    assert len(match.requests) == 2
+
+
+def test_rules_bucketed_by_method():
+    rule_set = RuleSet([
+        Rule(FORM, '.*', GET, Request()),
+        Rule(FORM, '.*', POST, Allow([400])),
+    ])
+    get_match = rule_set.match(Node(path='/form', method=GET, source=FORM))
+    post_match = rule_set.match(Node(path='/form', method=POST, source=FORM))
+    assert get_match.process and not get_match.allowances
+    assert not post_match.process and post_match.allowances
+
+
+def test_source_none_matches_any_source_pattern():
+    rule_set = RuleSet([Rule(ANCHOR, '/', GET, Request())])
+    assert rule_set.match(Node(path='/', source=None)).process
+
+
+def test_matches_are_memoized_with_bounded_cache():
+    rule_set = RuleSet([Rule(ANCHOR, '/.*', GET, Request())], cache_size=2)
+    for path in ['/a', '/a', '/b', '/c', '/a']:
+        rule_set.match(Node(path=path, source=ANCHOR))
+    info = rule_set.cache_info()
+    assert info.hits == 1
+    assert info.misses == 4
+    assert info.currsize == 2
+
+
+def test_last_matching_budget_of_each_type_wins():
+    rule_set = RuleSet([
+        Rule(ANCHOR, '/.*', GET, Request()),
+        Rule(ANCHOR, '/.*', GET, MaxLatency(100)),
+        Rule(ANCHOR, '/.*', GET, MaxResponseBytes(1000)),
+        Rule(ANCHOR, '/reports/.*', GET, MaxLatency(2000)),
+    ])
+    match = rule_set.match(Node(path='/reports/annual', source=ANCHOR))
+    assert match.budget(MaxLatency).action == MaxLatency(2000)
+    assert match.budget(MaxQueries) is None
+    assert [rule.action for rule in match.final_budgets] == [MaxLatency(2000), MaxResponseBytes(1000)]
+    assert match.process.action == Request()
+
+    match = rule_set.match(Node(path='/page', source=ANCHOR))
+    assert match.budget(MaxLatency).action.limit == 100
+
+
+def test_budget_measures():
+    node = Node(path='/', wall_time=0.25, response_size=512, query_count=3)
+    assert MaxLatency(100).measure(node) == 250
+    assert MaxResponseBytes(100).measure(node) == 512
+    assert MaxQueries(1).measure(node) == 3
+    assert MaxLatency(100).measure(Node(path='/')) is None
@@ -0,0 +1,162 @@
+import pytest
+
+from tests.webapps.flask.app import create_app
+from tests.webapps.flask_infinite.app import create_app as create_infinite_app
+
+from python_testing_crawler import ShardedCrawler, Rule, Request, Allow
+from python_testing_crawler.results import read_results
+from python_testing_crawler.sharded import shard_of
+from python_testing_crawler.exn import HttpStatusError, TooManyRequestsError
+from python_testing_crawler.constants import ANCHOR, GET
+from .example_rules import PERMISSIVE_HYPERLINKS_ONLY_RULE_SET, SUBMIT_GET_FORMS_RULE_SET
+from .test_flask_test_app import DIRECTLY_ACCESSIBLE_URLS, assert_shortest_depths, create_shortcut_app
+
+
+# client factories, imported by path in each crawler process
+
+def make_client():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def make_failing_client():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['FAILURE_PATHS'] = {'/page-c', '/page-d'}
+    return app.test_client()
+
+
+def make_infinite_client():
+    app = create_infinite_app()
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def make_shortcut_client():
+    return create_shortcut_app().test_client()
+
+
+def test_shard_of_is_stable():
+    node_id = ('GET', '/page-a')
+    assert shard_of(node_id, 16) == shard_of(('GET', '/page-a'), 16)
+    assert {shard_of(('GET', f'/{i}'), 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+def test_crawl_all():
+    crawler = ShardedCrawler(
+        client_factory='tests.test_sharded:make_client',
+        processes=2,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET + SUBMIT_GET_FORMS_RULE_SET,
+    )
+    crawler.crawl()
+    assert DIRECTLY_ACCESSIBLE_URLS <= crawler.graph.visited_paths
+    assert '/form-submitted-by-get-onward-link' in crawler.graph.visited_paths
+    assert crawler.graph.get_nodes_by_path('/abort/with/500')[0].status_code == 500
+
+    # edges are merged onto the canonical nodes
+    root = crawler.graph.get_nodes_by_path('/')[0]
+    children = crawler.graph.adj[root.id]
+    assert {child.path for child in children} >= {'/page-a', '/page-d'}
+    for child in children:
+        assert crawler.graph.get_node_by_id(child.id) is child
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'checkpoint_path': 'crawl.sqlite'},
+    {'crawl_cache_path': 'cache.sqlite'},
+    {'samples_per_template': 2},
+])
+def test_unsupported_options(kwargs):
+    with pytest.raises(ValueError):
+        ShardedCrawler(client_factory='tests.test_sharded:make_client', **kwargs)
+
+
+def test_max_depth_uses_shortest_path():
+    crawler = ShardedCrawler(
+        client_factory='tests.test_sharded:make_shortcut_client',
+        processes=2,
+        initial_paths=['/'],
+        rules=[Rule(ANCHOR, '/.*', GET, Request())],
+        max_depth=3,
+    )
+    crawler.crawl()
+    assert_shortest_depths(crawler)
+
+
+def test_capture_exceptions(capfd):
+    crawler = ShardedCrawler(
+        client_factory=make_failing_client,
+        processes=2,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+    assert {node.path.split('?')[0] for (node, exc, tb) in crawler.tracebacks} == {'/page-c', '/page-d'}
+    assert [group.count for group in crawler.errors] == [crawler.error_count]
+    out, err = capfd.readouterr()
+    assert "Exception: Instructed to fail at /page-c" in out
+
+
+def test_fail_fast():
+    crawler = ShardedCrawler(
+        client_factory='tests.test_sharded:make_client',
+        processes=2,
+        initial_paths=['/'],
+        capture_exceptions=False,
+        rules=[
+            Rule(ANCHOR, ".*", GET, Request()),
+            Rule(ANCHOR, ".*", GET, Allow([500]))
+        ]
+    )
+    with pytest.raises(HttpStatusError) as excinfo:
+        crawler.crawl()
+    assert excinfo.value.status_code == 400
+
+
+def test_max_requests():
+    crawler = ShardedCrawler(
+        client_factory=make_infinite_client,
+        processes=2,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        max_requests=10,
+    )
+    with pytest.raises(TooManyRequestsError):
+        crawler.crawl()
+
+
+def test_results_path(tmp_path, capfd):
+    results_path = tmp_path / 'results.jsonl'
+    crawler = ShardedCrawler(
+        client_factory='tests.test_sharded:make_failing_client',
+        processes=2,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        results_path=str(results_path),
+    )
+    with pytest.raises(AssertionError):
+        crawler.crawl()
+    results = list(read_results(str(results_path)))
+    assert {result['path'] for result in results} == crawler.graph.visited_paths
+    assert {result['path'].split('?')[0] for result in results if result['error']} == {'/page-c', '/page-d'}
+
+
+def test_profile_adds_up_shard_phases(capfd):
+    crawler = ShardedCrawler(
+        client_factory='tests.test_sharded:make_client',
+        processes=2,
+        initial_paths=['/'],
+        rules=PERMISSIVE_HYPERLINKS_ONLY_RULE_SET,
+        profile=True,
+    )
+    crawler.crawl()
+    requests = len([node for node in crawler.graph.map.values() if node.requested])
+    assert crawler.profiler.counts['request'] == requests
+    assert crawler.profiler.counts['parsing'] > 0
+    assert crawler.profiler.totals['parsing'] > 0
+
+    out, err = capfd.readouterr()
+    assert "Time by phase" in out
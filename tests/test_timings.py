@@ -0,0 +1,41 @@
+from python_testing_crawler.timings import percentile, performance_summary, start_timer, stop_timer
+from python_testing_crawler.routes import RouteTemplates
+from python_testing_crawler.graph import Node
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([1, 2], 0) == 1
+
+
+def test_timer_measures_elapsed_time():
+    wall_time, cpu_time = stop_timer(start_timer())
+    assert wall_time >= 0 and cpu_time >= 0
+
+
+def test_performance_summary():
+    nodes = [
+        Node(path=f'/posts/{i}', wall_time=i / 1000, cpu_time=0.0005, response_size=100 * i, requested=True)
+        for i in range(1, 21)
+    ] + [
+        Node(path='/huge', wall_time=0.005, cpu_time=0.001, response_size=10 ** 6, requested=True),
+        Node(path='/never-requested'),
+    ]
+    lines = performance_summary(nodes, RouteTemplates(), size=2)
+    text = "\n".join(lines)
+    assert "Slowest 2 endpoint(s)" in text
+    assert lines[1].split() == ['20.0', 'ms', '(CPU', '0.5', 'ms)', 'GET', '/posts/20']
+    assert "Largest 2 response(s)" in text
+    assert "1000000 bytes  GET /huge" in text
+    assert ['20', '10.0', 'ms', '19.0', 'ms', '20.0', 'ms', 'GET', '/posts/{int}'] in [
+        line.split() for line in lines
+    ]
+    assert "/never-requested" not in text
+
+
+def test_performance_summary_without_requests():
+    assert performance_summary([Node(path='/')], RouteTemplates(), size=10) == []
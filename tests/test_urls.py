@@ -0,0 +1,59 @@
+from python_testing_crawler.urls import Canonicalizer
+from python_testing_crawler.graph import Node
+from python_testing_crawler.constants import ANCHOR, FORM
+from python_testing_crawler.constants import POST
+
+
+def test_relative_paths_resolved_against_source_page():
+    canonicalizer = Canonicalizer()
+    assert canonicalizer.canonicalize('b', '/dir/a') == '/dir/b'
+    assert canonicalizer.canonicalize('../b', '/dir/sub/a') == '/dir/b'
+    assert canonicalizer.canonicalize('?page=2', '/list') == '/list?page=2'
+    assert canonicalizer.canonicalize('#top', '/list') == '/list'
+    assert Canonicalizer(resolve_relative=False).canonicalize('b', '/dir/a') == 'b'
+
+
+def test_query_params_sorted_without_reencoding():
+    canonicalizer = Canonicalizer()
+    assert canonicalizer.canonicalize('/a?y=2&x=1') == '/a?x=1&y=2'
+    assert canonicalizer.canonicalize('/a?q=a%20b&&b=+') == '/a?b=+&q=a%20b'
+    assert Canonicalizer(sort_query=False).canonicalize('/a?y=2&x=1') == '/a?y=2&x=1'
+
+
+def test_same_origin_absolute_urls_made_relative():
+    canonicalizer = Canonicalizer(origins=['http://testserver/'])
+    assert canonicalizer.canonicalize('http://testserver/a?b=1') == '/a?b=1'
+    assert canonicalizer.canonicalize('http://TESTSERVER') == '/'
+    assert canonicalizer.canonicalize('//testserver/a', '/') == '/a'
+    assert canonicalizer.canonicalize('https://testserver/a') == 'https://testserver/a'
+    assert canonicalizer.canonicalize('http://example.com/a?y&x') == 'http://example.com/a?x&y'
+
+
+def test_unusable_schemes_left_alone():
+    canonicalizer = Canonicalizer()
+    assert canonicalizer.canonicalize('mailto:dummy@example.com', '/a') == 'mailto:dummy@example.com'
+
+
+def test_strip_params_by_name_or_callable():
+    assert Canonicalizer(strip_params=['sid']).canonicalize('/a?sid=1&b=2') == '/a?b=2'
+    canonicalizer = Canonicalizer(strip_params=lambda name: name.startswith('utm_'))
+    assert canonicalizer.canonicalize('/a?utm_source=x&utm%5Fmedium=y') == '/a'
+
+
+def test_strip_trailing_slash():
+    canonicalizer = Canonicalizer(strip_trailing_slash=True)
+    assert canonicalizer.canonicalize('/a/') == '/a'
+    assert canonicalizer.canonicalize('/') == '/'
+    assert Canonicalizer().canonicalize('/a/') == '/a/'
+
+
+def test_canonicalize_node_keeps_other_fields():
+    canonicalizer = Canonicalizer()
+    parent = Node(path='/dir/page', source=ANCHOR)
+    node = Node(path='submit?b=2&a=1', method=POST, params={'x': '1'}, source=FORM)
+    canonical_node = canonicalizer.canonicalize_node(node, parent)
+    assert canonical_node.path == '/dir/submit?a=1&b=2'
+    assert (canonical_node.method, canonical_node.params, canonical_node.source) == (POST, {'x': '1'}, FORM)
+
+    unchanged = Node(path='/a', source=ANCHOR)
+    assert canonicalizer.canonicalize_node(unchanged, parent) is unchanged
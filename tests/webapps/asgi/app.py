@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+from urllib.parse import parse_qsl
+
+
+PAGE = """<!doctype html>
+<html>
+<body>
+  <ul>
+    <li><a href="/">Home</a></li>
+    <li><a href="/page-a">Page A</a></li>
+    <li><a href="/page-b">Page B</a></li>
+    {slow_links}
+  </ul>
+  {content}
+</body>
+</html>
+"""
+
+SLOW_PAGE_COUNT = 5
+
+
+class App:
+    """A bare ASGI application, without any framework."""
+
+    def __init__(self, delay=0.05, etags=False):
+        self.delay = delay
+        self.etags = etags
+        self.failure_paths = set()
+        self.request_log = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        assert scope['type'] == 'http'
+        message = await receive()
+        params = parse_qsl(scope['query_string'].decode()) + parse_qsl(message['body'].decode())
+        self.request_log.append((scope['method'], scope['path'], params))
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            status, body, content_type = await self.route(scope['path'], params)
+        finally:
+            self.in_flight -= 1
+
+        headers = [(b'content-type', content_type.encode())]
+        if self.etags and status == 200:
+            etag = '"{}"'.format(hashlib.sha1(body.encode()).hexdigest()).encode()
+            headers.append((b'etag', etag))
+            if (b'if-none-match', etag) in scope['headers']:
+                status, body = 304, ''
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def route(self, path, params):
+        if path in self.failure_paths:
+            raise Exception(f"Instructed to fail at {path}")
+        if path in {'/', '/page-a', '/page-b'}:
+            return 200, self.render(path), 'text/html; charset=utf-8'
+        if path.startswith('/slow/'):
+            await asyncio.sleep(self.delay)
+            return 200, self.render(path), 'text/html; charset=utf-8'
+        if path == '/search':
+            return 200, self.render(path, f"<p>Searched {params}</p>"), 'text/html; charset=utf-8'
+        if path == '/style.css':
+            return 200, '<a href="/not-html">not html</a>', 'text/css'
+        if path == '/abort/with/500':
+            return 500, 'Internal Server Error', 'text/plain'
+        return 404, 'Not Found', 'text/plain'
+
+    def render(self, path, content=None):
+        if content is None and path == '/page-b':
+            content = """
+                <form action="/search" method="post">
+                  <input name="q" value="spiders">
+                </form>
+                <a href="/abort/with/500">Broken</a>
+                <link href="/style.css">
+            """
+        slow_links = "\n".join(
+            f'<li><a href="/slow/{i}">Slow {i}</a></li>' for i in range(SLOW_PAGE_COUNT)
+        )
+        return PAGE.format(slow_links=slow_links, content=content or "")
+
+
+def create_app(**kwargs):
+    return App(**kwargs)
@@ -1,7 +1,9 @@
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponseRedirect, Http404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import last_modified
 
 from .models import Question, Choice
 
@@ -18,6 +20,11 @@ class DetailView(generic.DetailView):
     template_name = 'polls/detail.html'
 
 
+def question_published(request, pk):
+    return Question.objects.filter(pk=pk).values_list('pub_date', flat=True).first()
+
+
+@method_decorator(last_modified(question_published), name='dispatch')
 class ResultsView(generic.DetailView):
     model = Question
     template_name = 'polls/results.html'